@@ -0,0 +1,248 @@
+'''
+Responses served by the benchmark server.
+
+The fixtures are generated from a fixed seed in the shape and at the size of
+the responses Cryptsy and BTC-e return for a busy account, so runs are
+comparable. Recorded responses can be used instead, see load().
+'''
+import os
+import random
+import datetime
+
+SEED = 1
+
+CRYPTSY_MARKETS = 250
+CRYPTSY_RECENT_TRADES = 100
+CRYPTSY_ORDERS = 100
+CRYPTSY_MY_TRADES = 2000
+CRYPTSY_MY_ORDERS = 200
+
+BTCE_PAIRS = ['btc_usd', 'btc_rur', 'btc_eur', 'ltc_btc', 'ltc_usd',
+              'ltc_rur', 'ltc_eur', 'nmc_btc', 'nmc_usd', 'nvc_btc',
+              'nvc_usd', 'usd_rur', 'eur_usd', 'trc_btc', 'ppc_btc',
+              'ppc_usd', 'ftc_btc', 'xpm_btc']
+BTCE_DEPTH = 2000
+BTCE_MY_TRADES = 1000
+BTCE_MY_ORDERS = 100
+
+# the requests the benchmarks make, see benchmarks.run
+BTCE_DEPTH_PAIR = 'ltc_btc'
+
+EPOCH = datetime.datetime(1970, 1, 1)
+START = 1388534400  # 2014-01-01 00:00:00
+
+
+def _amount(rng, low=0.001, high=100.0):
+    return '%.8f' % rng.uniform(low, high)
+
+
+def _cryptsy_time(timestamp):
+    return (EPOCH + datetime.timedelta(seconds=timestamp)).strftime(
+        '%Y-%m-%d %H:%M:%S')
+
+
+def _currency_codes(count):
+    codes = []
+    for i in range(count):
+        code = ''
+        i += 26 * 26
+        while i:
+            i, letter = divmod(i, 26)
+            code = chr(ord('A') + letter) + code
+        codes.append(code)
+    return codes
+
+
+def _cryptsy_markets():
+    primaries = _currency_codes(CRYPTSY_MARKETS)
+    secondaries = ['BTC', 'LTC', 'XPM']
+    return [(str(i + 1), primaries[i], secondaries[i % len(secondaries)])
+            for i in range(CRYPTSY_MARKETS)]
+
+
+def _cryptsy_orders(rng, price):
+    sell = [{'price': '%.8f' % (price * (1 + 0.001 * i)),
+             'quantity': _amount(rng),
+             'total': _amount(rng)}
+            for i in range(CRYPTSY_ORDERS)]
+    buy = [{'price': '%.8f' % (price * (1 - 0.001 * i)),
+            'quantity': _amount(rng),
+            'total': _amount(rng)}
+           for i in range(CRYPTSY_ORDERS)]
+    return sell, buy
+
+
+def cryptsy(rng):
+    markets = _cryptsy_markets()
+    getmarkets = []
+    market_data = {}
+    order_data = {}
+    for market_id, primary, secondary in markets:
+        label = '%s/%s' % (primary, secondary)
+        price = rng.uniform(0.00001, 0.1)
+        getmarkets.append({
+            'marketid': market_id,
+            'label': label,
+            'primary_currency_code': primary,
+            'primary_currency_name': primary.title(),
+            'secondary_currency_code': secondary,
+            'secondary_currency_name': secondary.title(),
+            'current_volume': _amount(rng, 1, 100000),
+            'last_trade': '%.8f' % price,
+            'high_trade': '%.8f' % (price * 1.1),
+            'low_trade': '%.8f' % (price * 0.9),
+            'created': _cryptsy_time(START - 86400 * 100),
+        })
+        sell, buy = _cryptsy_orders(rng, price)
+        common = {
+            'marketid': market_id,
+            'label': label,
+            'primaryname': primary.title(),
+            'primarycode': primary,
+            'secondaryname': secondary.title(),
+            'secondarycode': secondary,
+            'sellorders': sell,
+            'buyorders': buy,
+        }
+        order_data[label] = dict(common)
+        market_data[label] = dict(
+            common,
+            lasttradeprice='%.8f' % price,
+            volume=_amount(rng, 1, 100000),
+            lasttradetime=_cryptsy_time(START),
+            recenttrades=[{
+                'id': str(i),
+                # trades come in bursts, several share a second
+                'time': _cryptsy_time(START - i // 3 * 60),
+                'price': '%.8f' % price,
+                'quantity': _amount(rng),
+                'total': _amount(rng),
+            } for i in range(CRYPTSY_RECENT_TRADES)],
+        )
+
+    my_trades = [{
+        'tradeid': str(1000000 + i),
+        'tradetype': rng.choice(['Buy', 'Sell']),
+        'datetime': _cryptsy_time(START - i * 300),
+        'tradeprice': _amount(rng, 0.00001, 0.1),
+        'quantity': _amount(rng),
+        'fee': _amount(rng, 0.00000001, 0.001),
+        'total': _amount(rng),
+        'initiate_ordertype': rng.choice(['Buy', 'Sell']),
+        'order_id': str(2000000 + i),
+        'marketid': rng.choice(markets)[0],
+    } for i in range(CRYPTSY_MY_TRADES)]
+
+    my_orders = [{
+        'orderid': str(3000000 + i),
+        'marketid': rng.choice(markets)[0],
+        'created': _cryptsy_time(START - i * 600),
+        'ordertype': rng.choice(['Buy', 'Sell']),
+        'price': _amount(rng, 0.00001, 0.1),
+        'quantity': _amount(rng),
+        'orig_quantity': _amount(rng),
+        'total': _amount(rng),
+    } for i in range(CRYPTSY_MY_ORDERS)]
+
+    return {
+        'getinfo': {'success': '1', 'return': {
+            'balances_available': dict(
+                (primary, _amount(rng)) for _, primary, _ in markets),
+            'servertimezone': 'EST',
+            'servertimestamp': START,
+            'openordercount': CRYPTSY_MY_ORDERS,
+        }},
+        'getmarkets': {'success': '1', 'return': getmarkets},
+        'allmytrades': {'success': '1', 'return': my_trades},
+        'allmyorders': {'success': '1', 'return': my_orders},
+        'marketdatav2': {'success': 1, 'return': {'markets': market_data}},
+        'orderdata': {'success': 1, 'return': order_data},
+    }
+
+
+def _btce_depth(rng):
+    price = rng.uniform(0.01, 0.03)
+    return {
+        'asks': [[round(price * (1 + 0.0005 * i), 8),
+                  round(rng.uniform(0.01, 500), 8)]
+                 for i in range(BTCE_DEPTH)],
+        'bids': [[round(price * (1 - 0.0004 * i), 8),
+                  round(rng.uniform(0.01, 500), 8)]
+                 for i in range(BTCE_DEPTH)],
+    }
+
+
+def btce(rng):
+    ticker = {}
+    for pair in BTCE_PAIRS:
+        last = round(rng.uniform(0.01, 1000), 5)
+        ticker[pair] = {
+            'high': round(last * 1.05, 5),
+            'low': round(last * 0.95, 5),
+            'avg': last,
+            'vol': round(rng.uniform(1000, 1000000), 5),
+            'vol_cur': round(rng.uniform(10, 10000), 5),
+            'last': last,
+            'buy': round(last * 1.001, 5),
+            'sell': round(last * 0.999, 5),
+            'updated': START,
+        }
+
+    my_trades = {}
+    for i in range(BTCE_MY_TRADES):
+        my_trades[str(5000000 + i)] = {
+            'pair': rng.choice(BTCE_PAIRS),
+            'type': rng.choice(['buy', 'sell']),
+            'amount': round(rng.uniform(0.01, 100), 8),
+            'rate': round(rng.uniform(0.01, 1000), 5),
+            'order_id': 6000000 + i,
+            'is_your_order': rng.randint(0, 1),
+            'timestamp': START - i * 300,
+        }
+
+    my_orders = {}
+    for i in range(BTCE_MY_ORDERS):
+        my_orders[str(7000000 + i)] = {
+            'pair': rng.choice(BTCE_PAIRS),
+            'type': rng.choice(['buy', 'sell']),
+            'amount': round(rng.uniform(0.01, 100), 8),
+            'rate': round(rng.uniform(0.01, 1000), 5),
+            'timestamp_created': START - i * 600,
+            'status': 0,
+        }
+
+    return {
+        'info': {'server_time': START, 'pairs': dict(
+            (pair, {'decimal_places': 5, 'min_price': 0.0001,
+                    'max_price': 10000, 'min_amount': 0.01, 'hidden': 0,
+                    'fee': 0.2})
+            for pair in BTCE_PAIRS)},
+        'ticker/%s' % '-'.join(BTCE_PAIRS): ticker,
+        'depth/%s' % BTCE_DEPTH_PAIR: {BTCE_DEPTH_PAIR: _btce_depth(rng)},
+        'TradeHistory': {'success': 1, 'return': my_trades},
+        'ActiveOrders': {'success': 1, 'return': my_orders},
+    }
+
+
+def generate(seed=SEED):
+    '''
+    Route -> response object, see benchmarks.server for the routes
+    '''
+    rng = random.Random(seed)
+    responses = cryptsy(rng)
+    responses.update(btce(rng))
+    return responses
+
+
+def load(directory, responses):
+    '''
+    Replaces responses with recorded ones from directory, a file
+    "<route>.json" per route where "/" in the route is written as "__"
+    (e.g. "depth__ltc_btc.json")
+    '''
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            route = name[:-len('.json')].replace('__', '/')
+            with open(os.path.join(directory, name)) as f:
+                responses[route] = f.read()
+    return responses
@@ -0,0 +1,101 @@
+'''
+Measures the cold start of cryptex: every statement runs in a fresh
+interpreter, so nothing is cached in sys.modules between runs.
+
+    python -m benchmarks.imports [--repeat N] [--json FILE]
+
+For each statement the median over the runs is reported of
+    import ms  wall time of the statement, not counting the startup of
+               the interpreter
+    requests   whether requests was imported
+    pytz       whether pytz was imported
+
+The "eager" row imports what `import cryptex.exchange` used to import, as
+the reference to compare the lazy imports against.
+'''
+from __future__ import print_function
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+STATEMENTS = (
+    ('cryptex.common', 'import cryptex.common'),
+    ('cryptex.exchange', 'import cryptex.exchange'),
+    ('BTCE', 'from cryptex.exchange import BTCE'),
+    ('Cryptsy', 'from cryptex.exchange import Cryptsy'),
+    ('SimulatedExchange', 'from cryptex.exchange import SimulatedExchange'),
+    ('BTCE()', "from cryptex.exchange import BTCE; BTCE('key', 'secret')"),
+    ('eager', 'import cryptex.exchange.cryptsy, cryptex.exchange.btce, '
+              'requests, pytz'),
+)
+
+# run in the child: times the statement and reports what it loaded
+_PROBE = '''
+import sys
+from timeit import default_timer as clock
+start = clock()
+exec(sys.argv[1])
+elapsed = clock() - start
+print('%r' % ((elapsed, 'requests' in sys.modules, 'pytz' in sys.modules),))
+'''
+
+
+def run(statement):
+    '''
+    (seconds, requests imported, pytz imported) of statement in a new
+    interpreter
+    '''
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [p for p in [env.get('PYTHONPATH')] if p])
+    output = subprocess.check_output(
+        [sys.executable, '-c', _PROBE, statement], env=env)
+    return eval(output.decode('ascii'))
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(statement, repeat):
+    runs = [run(statement) for _ in range(repeat)]
+    return {
+        'import_ms': _median([r[0] for r in runs]) * 1000,
+        'requests': runs[-1][1],
+        'pytz': runs[-1][2],
+    }
+
+
+def report(results, out=sys.stdout):
+    width = max(len(name) for name, _ in results)
+    print('%-*s %10s %10s %10s' % (width, 'statement', 'import ms',
+                                   'requests', 'pytz'), file=out)
+    for name, result in results:
+        print('%-*s %10.2f %10s %10s' % (
+            width, name, result['import_ms'],
+            'yes' if result['requests'] else 'no',
+            'yes' if result['pytz'] else 'no'), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument('--json', metavar='FILE',
+                        help='also write the results to FILE')
+    args = parser.parse_args(argv)
+
+    results = [(name, measure(statement, args.repeat))
+               for name, statement in STATEMENTS]
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results), f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
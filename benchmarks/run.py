@@ -0,0 +1,295 @@
+'''
+Benchmarks the public methods of the exchanges against a local
+FixtureServer, so no network access or API keys are needed.
+
+    python -m benchmarks.run [--repeat N] [--fixtures DIR] [--json FILE]
+
+For each method the median over the runs is reported of
+    request    time until the response body is downloaded
+    decode     time spent decoding json
+    construct  everything else: timestamps, Trade/Order objects, ...
+    total      wall time of the call
+    peak       growth of the peak resident memory during one call
+    result     size of the returned objects
+
+Streaming methods decode while they download, for them everything after the
+response headers counts as construct. The peak memory includes the response
+body and everything decoded from it, which is what streaming and lazy
+decoding save even when the result is as large. It is measured in a forked
+process per method before any method is timed, so memory that earlier
+calls freed does not hide it, and is not available without fork.
+'''
+from __future__ import print_function
+
+import os
+import sys
+import json
+import gc
+import argparse
+from timeit import default_timer as clock
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from cryptex.exchange.btce import BTCE
+from cryptex.exchange.cryptsy import Cryptsy, CryptsyPublic
+from cryptex.exchange.transport import Transport, SessionTransport
+from cryptex import fixedpoint
+
+from benchmarks import fixtures
+from benchmarks.server import FixtureServer, BTCE_PUBLIC_ROOT
+
+
+class _TimedResponse(object):
+    def __init__(self, response, timing):
+        self.response = response
+        self.timing = timing
+
+    def json(self, **kwargs):
+        start = clock()
+        content = self.response.json(**kwargs)
+        self.timing.decode_time += clock() - start
+        return content
+
+    def iter_content(self, chunk_size=1):
+        return self.response.iter_content(chunk_size)
+
+
+class TimingTransport(Transport):
+    '''
+    Wraps a transport and adds up the time spent in requests and in
+    decoding their responses
+    '''
+    def __init__(self, transport):
+        self.transport = transport
+        self.reset()
+
+    def reset(self):
+        self.request_time = 0.0
+        self.decode_time = 0.0
+
+    def _timed(self, request, *args):
+        start = clock()
+        response = request(*args)
+        self.request_time += clock() - start
+        return _TimedResponse(response, self)
+
+    def get(self, url, params=None, stream=False):
+        return self._timed(self.transport.get, url, params, stream)
+
+    def post(self, url, data=None, headers=None):
+        return self._timed(self.transport.post, url, data, headers)
+
+    def close(self):
+        self.transport.close()
+
+
+def deep_size(obj, seen=None):
+    '''
+    Approximate number of bytes held by obj and everything it references
+    '''
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_size(item, seen)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += deep_size(obj.__dict__, seen)
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(obj, name):
+                    size += deep_size(getattr(obj, name), seen)
+    return size
+
+
+def _consume(iterable):
+    return list(iterable)
+
+
+def benchmarks(server, transport, numeric):
+    '''
+    Yields (name, call) for every benchmarked method
+    '''
+    cryptsy_public = CryptsyPublic(transport=transport)
+    cryptsy_public.API_ENDPOINT = server.url('/api.php')
+    cryptsy = Cryptsy('key', 'secret', transport=transport, numeric=numeric)
+    cryptsy.API_ENDPOINT = server.url('/api')
+    cryptsy.public.API_ENDPOINT = server.url('/api.php')
+    btce = BTCE('key', 'secret', transport=transport, numeric=numeric)
+    btce.API_ENDPOINT = server.url('/tapi')
+    btce.public.API_ENDPOINT = server.url(BTCE_PUBLIC_ROOT)
+
+    # fetched once by the clients, not part of the measured calls
+    cryptsy.refresh_markets()
+    cryptsy._get_timezone()
+
+    yield 'CryptsyPublic.get_market_data', cryptsy_public.get_market_data
+    yield ('CryptsyPublic.get_market_data(lazy)',
+           lambda: cryptsy_public.get_market_data(lazy=True))
+    yield ('CryptsyPublic.iter_market_data',
+           lambda: _consume(cryptsy_public.iter_market_data()))
+    yield 'CryptsyPublic.get_order_data', cryptsy_public.get_order_data
+    yield 'Cryptsy.refresh_markets', cryptsy.refresh_markets
+    yield 'Cryptsy.get_my_trades', cryptsy.get_my_trades
+    yield ('Cryptsy.get_my_trades(columnar)',
+           lambda: cryptsy.get_my_trades(columnar=True))
+    yield 'Cryptsy.get_my_open_orders', cryptsy.get_my_open_orders
+    yield ('Cryptsy.get_ticker',
+           lambda: cryptsy.get_ticker(cryptsy.get_markets()[:20]))
+    yield 'BTCEPublic.get_info', btce.public.get_info
+    yield ('BTCEPublic.get_ticker',
+           lambda: btce.public.get_ticker(fixtures.BTCE_PAIRS))
+    yield ('BTCEPublic.get_depth',
+           lambda: btce.public.get_depth(fixtures.BTCE_DEPTH_PAIR,
+                                         fixtures.BTCE_DEPTH))
+    yield 'BTCE.get_my_trades', btce.get_my_trades
+    yield ('BTCE.get_my_trades(columnar)',
+           lambda: btce.get_my_trades(columnar=True))
+    yield 'BTCE.get_my_open_orders', btce.get_my_open_orders
+    yield ('BTCE.get_ticker',
+           lambda: btce.get_ticker([BTCE._pair_to_market(pair)
+                                    for pair in fixtures.BTCE_PAIRS]))
+    yield ('BTCE.get_order_book',
+           lambda: btce.get_order_book(
+               BTCE._pair_to_market(fixtures.BTCE_DEPTH_PAIR),
+               fixtures.BTCE_DEPTH))
+
+
+def _max_rss():
+    '''
+    Peak resident memory of the process in KiB
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # bytes instead of KiB
+        peak /= 1024.0
+    return peak
+
+
+def peak_memory(call, transport):
+    '''
+    KiB the peak resident memory grows by while call runs once in a forked
+    process, None where that can not be measured
+    '''
+    if resource is None or not hasattr(os, 'fork'):
+        return None
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        peak = float('nan')
+        try:
+            # own connection, so the pooled one of the parent stays usable
+            transport.transport = SessionTransport(pool_size=1)
+            gc.collect()
+            before = _max_rss()
+            call()
+            peak = _max_rss() - before
+        finally:
+            os.write(write_end, repr(float(peak)).encode('ascii'))
+            os._exit(0)
+    os.close(write_end)
+    try:
+        with os.fdopen(read_end, 'rb') as f:
+            peak = float(f.read() or 'nan')
+    finally:
+        os.waitpid(pid, 0)
+    return peak
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(call, transport, repeat):
+    runs = []
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        transport.reset()
+        start = clock()
+        result = call()
+        total = clock() - start
+        runs.append((transport.request_time, transport.decode_time,
+                     total - transport.request_time - transport.decode_time,
+                     total))
+    request, decode, construct, total = [_median(column)
+                                         for column in zip(*runs)]
+    return {
+        'request_ms': request * 1000,
+        'decode_ms': decode * 1000,
+        'construct_ms': construct * 1000,
+        'total_ms': total * 1000,
+        'result_kib': deep_size(result) / 1024.0,
+    }
+
+
+COLUMNS = ('request_ms', 'decode_ms', 'construct_ms', 'total_ms',
+           'peak_kib', 'result_kib')
+
+
+def _kib(value):
+    return '-' if value is None else '%.1f' % value
+
+
+def report(results, out=sys.stdout):
+    width = max(len(name) for name, _ in results)
+    print('%-*s %10s %10s %10s %10s %10s %10s' % (
+        (width, 'method', 'request ms', 'decode ms', 'construct',
+         'total ms', 'peak KiB', 'result KiB')), file=out)
+    for name, result in results:
+        print('%-*s %10.2f %10.2f %10.2f %10.2f %10s %10.1f' % (
+            (width, name) + tuple(result[column] for column in COLUMNS[:4]) +
+            (_kib(result['peak_kib']), result['result_kib'])), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help='recorded responses to use instead of the '
+                             'generated ones, see benchmarks.fixtures.load')
+    parser.add_argument('--numeric', default=fixedpoint.DECIMAL,
+                        choices=(fixedpoint.DECIMAL, fixedpoint.FIXED))
+    parser.add_argument('--only', metavar='TEXT',
+                        help='only run methods whose name contains TEXT')
+    parser.add_argument('--json', metavar='FILE',
+                        help='also write the results to FILE')
+    args = parser.parse_args(argv)
+
+    responses = fixtures.generate()
+    if args.fixtures:
+        fixtures.load(args.fixtures, responses)
+
+    transport = TimingTransport(SessionTransport(pool_size=1))
+    results = []
+    with FixtureServer(responses) as server:
+        calls = [(name, call) for name, call
+                 in benchmarks(server, transport, args.numeric)
+                 if not args.only or args.only in name]
+        # before any call, so no method finds the memory of another freed
+        peaks = [peak_memory(call, transport) for _, call in calls]
+        for (name, call), peak in zip(calls, peaks):
+            result = measure(call, transport, args.repeat)
+            result['peak_kib'] = peak
+            results.append((name, result))
+    transport.close()
+
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results), f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
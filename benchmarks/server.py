@@ -0,0 +1,101 @@
+'''
+Local stand-in for the Cryptsy and BTC-e APIs that replays fixtures.
+
+A request is routed like cryptex.exchange.transport.FakeTransport routes
+it: by its "method" parameter if it has one, otherwise by its path below the
+BTC-e public API root (e.g. "depth/ltc_btc"), falling back to the first
+segment of that path (e.g. "info").
+'''
+import json
+import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+
+BTCE_PUBLIC_ROOT = '/api/3/'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, like the real APIs
+    protocol_version = 'HTTP/1.1'
+    # send headers and body in one write, without waiting for acks, so
+    # localhost latency is not dominated by delayed acks
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _route(self, params):
+        if 'method' in params:
+            return params['method'][0]
+        path = urlparse(self.path).path
+        if path.startswith(BTCE_PUBLIC_ROOT):
+            path = path[len(BTCE_PUBLIC_ROOT):]
+        path = path.strip('/')
+        if path in self.server.bodies:
+            return path
+        return path.split('/')[0]
+
+    def _respond(self, params):
+        body = self.server.bodies.get(self._route(params))
+        if body is None:
+            self.send_response(404)
+            body = json.dumps({'success': 0, 'error': 'no fixture'})
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._respond(parse_qs(self.rfile.read(length)))
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FixtureServer(object):
+    '''
+    Serves responses on localhost from a background thread
+
+    >>> with FixtureServer(fixtures.generate()) as server:
+    ...     public = BTCEPublic()
+    ...     public.API_ENDPOINT = server.url(BTCE_PUBLIC_ROOT)
+
+    :param responses: route -> response object or raw json text
+    :param port: 0 picks a free port
+    '''
+    def __init__(self, responses, host='127.0.0.1', port=0):
+        self.server = _Server((host, port), _Handler)
+        self.server.bodies = dict(
+            (route, body if isinstance(body, str) else json.dumps(body))
+            for route, body in responses.items())
+        self.thread = None
+
+    def url(self, path=''):
+        host, port = self.server.server_address
+        return 'http://%s:%d%s' % (host, port, path)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
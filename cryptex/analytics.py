@@ -0,0 +1,304 @@
+'''
+Cost basis, profit and loss, volume and fee totals of a trade history.
+
+>>> stats = analyze(exchange.get_my_trades(columnar=True), method=FIFO,
+...                 bucket=datetime.timedelta(days=1))
+>>> day = stats[(('LTC', 'BTC'), datetime.datetime(2014, 1, 6, tzinfo=pytz.utc))]
+>>> day.realized_pnl, day.position, day.fees
+(Decimal('0.00310000'), Decimal('12.50000000'), {'BTC': Decimal('0.00012000')})
+
+Trades of both exchanges are taken as lists or as cryptex.batch.TradeBatch,
+whose columns are read without building Trade objects. The history is
+converted to columns once and computed in integers of 1e-8 units, which
+gives the same results as Decimal arithmetic rounded like
+cryptex.common.multiply. Datetimes without a timezone are taken as UTC.
+
+Buys add lots to the position and sells realize them, FIFO or at the
+average cost. Fees paid in the counter currency are part of the cost or
+reduce the proceeds, fees paid in the base currency reduce the amount
+bought or add to the amount sold.
+'''
+import datetime
+
+from cryptex import fixedpoint
+from cryptex.fixedpoint import to_fixed
+from cryptex.batch import TradeBatch
+from cryptex.trade import Buy
+from cryptex.timestamp import get_epoch, utc_from_timestamp
+
+FIFO = 'fifo'
+AVERAGE = 'average'
+
+
+class Stats(object):
+    '''
+    Trading in one market during one time bucket
+
+    Amounts are Decimal. position, cost_basis and unrealized_pnl are those
+    at the end of the bucket, including the trades of earlier buckets.
+
+    :ivar bought: amount of base currency bought
+    :ivar sold: amount of base currency sold
+    :ivar bought_total: counter currency spent, before fees
+    :ivar sold_total: counter currency received, before fees
+    :ivar fees: {currency: amount}
+    :ivar realized_pnl: in counter currency, after fees
+    :ivar unrealized_pnl: of the position marked at the last price of the
+        bucket, or at the price passed to analyze for the last bucket
+    :ivar unmatched: amount sold beyond the known position, which has no
+        cost basis and is left out of the realized profit
+    '''
+    __slots__ = ('market', 'start', 'trades', 'bought', 'sold',
+                 'bought_total', 'sold_total', 'fees', 'position',
+                 'cost_basis', 'realized_pnl', 'unrealized_pnl', 'unmatched',
+                 'last_price')
+
+    def __init__(self, market, start):
+        self.market = market
+        self.start = start
+        self.trades = 0
+        self.bought = self.sold = 0
+        self.bought_total = self.sold_total = 0
+        self.fees = {}
+        self.position = self.cost_basis = 0
+        self.realized_pnl = self.unrealized_pnl = 0
+        self.unmatched = 0
+        self.last_price = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in Stats.__slots__}
+
+
+def _scale(value, numerator, denominator):
+    if value < 0:
+        return -(-value * numerator // denominator)
+    return value * numerator // denominator
+
+
+class _FifoBasis(object):
+    def __init__(self):
+        self.lots = []
+        self.first = 0
+        self.position = self.cost = 0
+
+    def add(self, amount, cost):
+        self.lots.append([amount, cost])
+        self.position += amount
+        self.cost += cost
+
+    def remove(self, amount):
+        '''
+        Takes amount from the oldest lots, returns (amount taken, its cost)
+        '''
+        lots = self.lots
+        taken = cost = 0
+        while amount > taken and self.first < len(lots):
+            lot = lots[self.first]
+            take = min(amount - taken, lot[0])
+            if take == lot[0]:
+                part = lot[1]
+                self.first += 1
+            else:
+                part = _scale(lot[1], take, lot[0])
+                lot[0] -= take
+                lot[1] -= part
+            taken += take
+            cost += part
+        self.position -= taken
+        self.cost -= cost
+        return taken, cost
+
+
+class _AverageBasis(object):
+    def __init__(self):
+        self.position = self.cost = 0
+
+    def add(self, amount, cost):
+        self.position += amount
+        self.cost += cost
+
+    def remove(self, amount):
+        taken = min(amount, self.position)
+        if taken == self.position:
+            cost = self.cost
+        else:
+            cost = _scale(self.cost, taken, self.position)
+        self.position -= taken
+        self.cost -= cost
+        return taken, cost
+
+
+def _columns(trades):
+    '''
+    (markets, datetimes, is_buy, amounts, prices, base fees, counter fees)
+    with amounts, prices and fees as integers of 1e-8 units
+    '''
+    if isinstance(trades, TradeBatch):
+        types = trades.types
+        column = trades.column
+        bases = column('base_currency')
+        counters = column('counter_currency')
+        datetimes = column('datetime')
+        amounts = column('amount')
+        prices = column('price')
+        fees = column('fee')
+        fee_currencies = column('fee_currency')
+    else:
+        types = [type(t) for t in trades]
+        bases = [t.base_currency for t in trades]
+        counters = [t.counter_currency for t in trades]
+        datetimes = [t.datetime for t in trades]
+        amounts = [t.amount for t in trades]
+        prices = [t.price for t in trades]
+        fees = [t.fee for t in trades]
+        fee_currencies = [t.fee_currency for t in trades]
+
+    base_fees = []
+    counter_fees = []
+    for fee, fee_currency, base in zip(fees, fee_currencies, bases):
+        fee = to_fixed(fee) if fee else 0
+        if fee and fee_currency == base:
+            base_fees.append(fee)
+            counter_fees.append(0)
+        else:
+            base_fees.append(0)
+            counter_fees.append(fee)
+    utc = get_epoch().tzinfo
+    datetimes = [dt if dt.tzinfo is not None else dt.replace(tzinfo=utc)
+                 for dt in datetimes]
+    return (list(zip(bases, counters)), datetimes,
+            [t.trade_type == Buy.trade_type for t in types],
+            [to_fixed(a) for a in amounts], [to_fixed(p) for p in prices],
+            base_fees, counter_fees)
+
+
+def _chronological(trades, datetimes):
+    '''
+    Indexes of the trades oldest first. Timestamps have whole seconds, so
+    trades of the same second are ordered by their trade ids, as numbers if
+    all of them are numeric and as text otherwise.
+    '''
+    if isinstance(trades, TradeBatch):
+        trade_ids = trades.column('trade_id')
+    else:
+        trade_ids = [t.trade_id for t in trades]
+    try:
+        ties = [int(trade_id) for trade_id in trade_ids]
+    except (TypeError, ValueError):
+        ties = [str(trade_id) for trade_id in trade_ids]
+    return sorted(range(len(datetimes)),
+                  key=lambda i: (datetimes[i], ties[i]))
+
+
+def _bucket_starts(datetimes, bucket):
+    if bucket is None:
+        return [None] * len(datetimes)
+    seconds = bucket.total_seconds() if isinstance(
+        bucket, datetime.timedelta) else bucket
+    epoch = get_epoch()
+    starts = {}
+    result = []
+    for dt in datetimes:
+        offset = (dt - epoch).total_seconds()
+        start = offset - offset % seconds
+        value = starts.get(start)
+        if value is None:
+            value = starts[start] = utc_from_timestamp(start)
+        result.append(value)
+    return result
+
+
+def analyze(trades, method=FIFO, bucket=None, prices=None):
+    '''
+    Returns {(market, bucket start): Stats} for the trades, a list of
+    cryptex.trade.Trade or a cryptex.batch.TradeBatch in any order
+
+    :param method: FIFO or AVERAGE cost basis
+    :param bucket: datetime.timedelta or seconds per bucket, aligned to
+        the unix epoch; None for a single bucket per market, whose start is
+        None
+    :param prices: {market: price} to mark the final position of markets
+        at, by default their last traded price
+    '''
+    basis_type = _FifoBasis if method == FIFO else _AverageBasis
+
+    markets, datetimes, is_buy, amounts, trade_prices, base_fees, \
+        counter_fees = _columns(trades)
+    starts = _bucket_starts(datetimes, bucket)
+    order = _chronological(trades, datetimes)
+
+    totals = [fixedpoint.multiply(a, p)
+              for a, p in zip(amounts, trade_prices)]
+
+    stats = {}
+    bases = {}
+    for i in order:
+        market = markets[i]
+        key = (market, starts[i])
+        current = stats.get(key)
+        if current is None:
+            current = stats[key] = Stats(market, starts[i])
+        basis = bases.get(market)
+        if basis is None:
+            basis = bases[market] = basis_type()
+
+        base_fee = base_fees[i]
+        counter_fee = counter_fees[i]
+        if is_buy[i]:
+            basis.add(amounts[i] - base_fee, totals[i] + counter_fee)
+        else:
+            amount = amounts[i] + base_fee
+            proceeds = totals[i] - counter_fee
+            taken, cost = basis.remove(amount)
+            if taken != amount:
+                current.unmatched += amount - taken
+                proceeds = _scale(proceeds, taken, amount)
+            current.realized_pnl += proceeds - cost
+        _add_totals(current, is_buy[i], amounts[i], totals[i], base_fee,
+                    counter_fee)
+        current.position = basis.position
+        current.cost_basis = basis.cost
+        current.last_price = trade_prices[i]
+
+    return _finish(stats, prices or {})
+
+
+def _add_totals(stats, is_buy, amount, total, base_fee, counter_fee):
+    stats.trades += 1
+    if is_buy:
+        stats.bought += amount
+        stats.bought_total += total
+    else:
+        stats.sold += amount
+        stats.sold_total += total
+    base, counter = stats.market
+    if base_fee:
+        stats.fees[base] = stats.fees.get(base, 0) + base_fee
+    if counter_fee:
+        stats.fees[counter] = stats.fees.get(counter, 0) + counter_fee
+
+
+def _finish(stats, prices):
+    '''
+    Marks the positions and converts the amounts for output
+    '''
+    last_bucket = {}
+    for market, start in stats:
+        if market not in last_bucket or start > last_bucket[market]:
+            last_bucket[market] = start
+
+    for (market, start), current in stats.items():
+        mark = current.last_price
+        if market in prices and start == last_bucket[market]:
+            mark = to_fixed(prices[market])
+        current.unrealized_pnl = fixedpoint.multiply(current.position, mark) \
+            - current.cost_basis
+
+        for name in ('bought', 'sold', 'bought_total', 'sold_total',
+                     'position', 'cost_basis', 'realized_pnl',
+                     'unrealized_pnl', 'unmatched', 'last_price'):
+            setattr(current, name,
+                    fixedpoint.to_decimal(getattr(current, name)))
+        current.fees = dict((currency, fixedpoint.to_decimal(amount))
+                            for currency, amount in current.fees.items())
+    return stats
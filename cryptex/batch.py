@@ -0,0 +1,56 @@
+class Batch(object):
+    '''
+    Columnar list of trades or orders.
+
+    Rows are stored as parallel tuples, one per field, and the objects are
+    only built when a row is indexed or iterated. A row is the class of the
+    object followed by the arguments of its constructor, in order.
+    '''
+    COLUMNS = ()
+
+    def __init__(self, rows=()):
+        columns = list(zip(*rows))
+        if not columns:
+            columns = [()] * (len(self.COLUMNS) + 1)
+        self.types = columns[0]
+        self.columns = dict(zip(self.COLUMNS, columns[1:]))
+
+    def column(self, name):
+        '''
+        Tuple of the values of one field, e.g. batch.column('amount')
+        '''
+        return self.columns[name]
+
+    def row(self, index):
+        return (self.types[index],) + tuple(
+            self.columns[name][index] for name in self.COLUMNS)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self.row(index)
+        return row[0](*row[1:])
+
+    def __iter__(self):
+        for row in zip(self.types, *[self.columns[name]
+                                     for name in self.COLUMNS]):
+            yield row[0](*row[1:])
+
+
+class TradeBatch(Batch):
+    '''
+    Columnar list of cryptex.trade.Trade
+    '''
+    COLUMNS = ('trade_id', 'base_currency', 'counter_currency', 'datetime',
+               'order_id', 'amount', 'price', 'fee', 'fee_currency')
+
+
+class OrderBatch(Batch):
+    '''
+    Columnar list of cryptex.order.Order
+    '''
+    COLUMNS = ('order_id', 'base_currency', 'counter_currency', 'datetime',
+               'amount', 'price')
@@ -0,0 +1,105 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class _Flight(object):
+    '''
+    A fetch in progress that concurrent identical requests wait for
+    '''
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.exception = None
+
+
+class ResponseCache(object):
+    '''
+    Thread-safe LRU cache for API responses with a time to live per entry.
+
+    Concurrent requests for a key that is not cached share a single fetch
+    instead of each performing their own request.
+
+    :param ttl: default time to live in seconds
+    :param maxsize: maximum number of cached responses, the least recently
+        used response is evicted first
+    :param ttls: dict of time to live per API method, overriding the
+        defaults of the endpoint (e.g. {'depth': 1, 'info': 300})
+    '''
+    def __init__(self, ttl=2, maxsize=256, ttls=None, clock=time.time):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.ttls = ttls or {}
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def ttl_for(self, name, default=None):
+        '''
+        Time to live for the API method name
+        '''
+        if name in self.ttls:
+            return self.ttls[name]
+        if default is not None:
+            return default
+        return self.ttl
+
+    def get(self, key, fetch, ttl=None):
+        '''
+        Returns the cached value for key, calling fetch() to get it if there
+        is no fresh entry. Exceptions raised by fetch are not cached.
+        '''
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] > self.clock():
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.value
+
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.exception = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (self.clock() + ttl, flight.value)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'size': len(self._entries),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
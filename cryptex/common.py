@@ -1,11 +1,49 @@
 import decimal
 
-decimal.DefaultContext.rounding = decimal.ROUND_DOWN
-decimal.DefaultContext.traps = decimal.ExtendedContext.traps.copy()
-decimal.DefaultContext.traps[decimal.InvalidOperation] = 1
-decimal.setcontext(decimal.DefaultContext)
+import cryptex.fixedpoint as fixedpoint
+
+# Context for the arithmetic of cryptex itself, so the decimal context of the
+# importing application (and of its threads) is left alone
+CONTEXT = decimal.Context(rounding=decimal.ROUND_DOWN,
+	traps=[decimal.InvalidOperation])
 
 DECIMAL_PRECISION = decimal.Decimal(10) ** -8
 
 def quantize(decimal_value):
-	return decimal_value.quantize(DECIMAL_PRECISION)
+	return decimal_value.quantize(DECIMAL_PRECISION, context=CONTEXT)
+
+def _is_decimal(a, b):
+	'''
+	Whether a and b are Decimal amounts, raises TypeError if one of them is
+	Decimal and the other fixed-point
+	'''
+	a_decimal = isinstance(a, decimal.Decimal)
+	b_decimal = isinstance(b, decimal.Decimal)
+	if (a_decimal and isinstance(b, fixedpoint.Units)) or \
+			(b_decimal and isinstance(a, fixedpoint.Units)):
+		raise TypeError('Can not mix Decimal and fixed-point amounts')
+	return a_decimal or b_decimal
+
+def multiply(a, b):
+	'''
+	Quantized product of two Decimal or two fixed-point amounts
+	'''
+	if _is_decimal(a, b):
+		return quantize(CONTEXT.multiply(a, b))
+	return fixedpoint.multiply(a, b)
+
+def subtract(a, b):
+	'''
+	Quantized difference of two Decimal or two fixed-point amounts
+	'''
+	if _is_decimal(a, b):
+		return quantize(CONTEXT.subtract(a, b))
+	return fixedpoint.Units(a - b)
+
+def as_decimal(value):
+	'''
+	Decimal of an amount, converting fixed-point amounts exactly
+	'''
+	if isinstance(value, decimal.Decimal):
+		return value
+	return fixedpoint.to_decimal(value)
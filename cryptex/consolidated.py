@@ -0,0 +1,265 @@
+'''
+One order book for a market traded on several exchanges.
+
+>>> book = ConsolidatedBook({'cryptsy': cryptsy, 'btce': btce}, ('LTC', 'BTC'))
+>>> book.refresh()
+set(['btce', 'cryptsy'])
+>>> book.best_ask()
+(Decimal('0.02458'), Decimal('3.1'), 'btce')
+>>> book.cost_to_buy(100)
+Decimal('2.4613')
+
+The order books of the exchanges are fetched concurrently and their levels
+are merged into one sorted list per side, every level tagged with the
+exchange (venue) offering it. A refresh re-merges only the venues whose book
+changed: their old levels are filtered out and their new levels merged with
+the rest, which is already sorted.
+'''
+import heapq
+from bisect import bisect_left
+from decimal import Decimal
+
+from cryptex.pool import RequestPool, gather
+
+
+def _merge(runs, descending):
+    '''
+    k-way merge of runs of (price, amount, venue), each sorted best first,
+    into parallel lists. Levels at the same price are ordered by venue.
+    '''
+    heap = []
+    for index, run in enumerate(runs):
+        if run:
+            price, _, venue = run[0]
+            heap.append((-price if descending else price, venue, index, 0))
+    heapq.heapify(heap)
+    prices = []
+    amounts = []
+    venues = []
+    while heap:
+        _, venue, index, position = heap[0]
+        run = runs[index]
+        price, amount, _ = run[position]
+        prices.append(price)
+        amounts.append(amount)
+        venues.append(venue)
+        position += 1
+        if position < len(run):
+            price, _, venue = run[position]
+            heapq.heapreplace(
+                heap, (-price if descending else price, venue, index,
+                       position))
+        else:
+            heapq.heappop(heap)
+    return prices, amounts, venues
+
+
+class ConsolidatedSide(object):
+    '''
+    One side of a ConsolidatedBook as parallel lists of prices, amounts and
+    venues, best price first, with cumulative amounts and totals for fill
+    queries that are computed when first needed after a change
+    '''
+    def __init__(self, descending=False):
+        self.descending = descending
+        self.prices = []
+        self.amounts = []
+        self.venues = []
+        self._cumulative_amounts = None
+        self._cumulative_totals = None
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        return iter(zip(self.prices, self.amounts, self.venues))
+
+    def replace(self, changed):
+        '''
+        Replaces the levels of venues with new ones
+
+        :param changed: {venue: [(price, amount)] best first}
+        '''
+        rest = [level for level in self if level[2] not in changed]
+        runs = [rest] + [[(price, amount, venue) for price, amount in levels]
+                         for venue, levels in sorted(changed.items())]
+        self.prices, self.amounts, self.venues = _merge(runs,
+                                                        self.descending)
+        self._cumulative_amounts = None
+
+    def _cumulate(self):
+        if self._cumulative_amounts is None:
+            amounts = []
+            totals = []
+            amount = total = Decimal(0)
+            for price, level_amount in zip(self.prices, self.amounts):
+                amount += level_amount
+                total += level_amount * price
+                amounts.append(amount)
+                totals.append(total)
+            self._cumulative_amounts = amounts
+            self._cumulative_totals = totals
+        return self._cumulative_amounts, self._cumulative_totals
+
+    def best(self):
+        '''
+        (price, amount, venue) of the best level, None if the side is empty
+        '''
+        if not self.prices:
+            return None
+        return self.prices[0], self.amounts[0], self.venues[0]
+
+    def total_amount(self):
+        amounts, _ = self._cumulate()
+        return amounts[-1] if amounts else Decimal(0)
+
+    def cost(self, amount):
+        '''
+        Total (in counter currency) of filling amount against all venues,
+        raises ValueError if they are not deep enough together
+        '''
+        amount = Decimal(amount)
+        amounts, totals = self._cumulate()
+        i = bisect_left(amounts, amount)
+        if i == len(amounts):
+            raise ValueError('Not enough depth to fill %s' % amount)
+        if i == 0:
+            return amount * self.prices[0]
+        return totals[i - 1] + (amount - amounts[i - 1]) * self.prices[i]
+
+    def vwap(self, amount):
+        return self.cost(amount) / Decimal(amount)
+
+    def fills(self, amount):
+        '''
+        {venue: (amount, total)} filling amount best price first takes from
+        each venue, raises ValueError if they are not deep enough together
+        '''
+        amount = Decimal(amount)
+        amounts, _ = self._cumulate()
+        i = bisect_left(amounts, amount)
+        if i == len(amounts):
+            raise ValueError('Not enough depth to fill %s' % amount)
+        result = {}
+        for j in range(i + 1):
+            take = self.amounts[j] if j < i else \
+                amount - (amounts[j - 1] if j else 0)
+            venue = self.venues[j]
+            taken, total = result.get(venue, (Decimal(0), Decimal(0)))
+            result[venue] = (taken + take, total + take * self.prices[j])
+        return result
+
+
+class ConsolidatedBook(object):
+    '''
+    :param exchanges: {venue name: cryptex.exchange.Exchange}, or a list of
+        exchanges that are then named after their class
+    :param market: (base, counter) to fetch from every exchange
+    :param markets: {venue name: market} for exchanges that list the market
+        under another name
+    :param depth: levels to fetch per side and exchange, None for the
+        exchange's default
+    :param pool: cryptex.pool.RequestPool to fetch on, by default one with
+        a worker per exchange for each refresh
+
+    :ivar books: {venue name: cryptex.orderbook.OrderBook} last fetched
+    :ivar errors: {venue name: exception} of the last refresh, the book of a
+        venue that failed is kept
+    '''
+    def __init__(self, exchanges, market, markets=None, depth=None,
+                 pool=None):
+        if not isinstance(exchanges, dict):
+            exchanges = dict((type(e).__name__, e) for e in exchanges)
+        self.exchanges = exchanges
+        self.market = tuple(market)
+        markets = markets or {}
+        self.markets = dict((venue, tuple(markets.get(venue, market)))
+                            for venue in exchanges)
+        self.depth = depth
+        self.pool = pool
+        self.books = {}
+        self.errors = {}
+        self.bids = ConsolidatedSide(descending=True)
+        self.asks = ConsolidatedSide()
+
+    def _fetch(self, venue):
+        return self.exchanges[venue].get_order_book(self.markets[venue],
+                                                    self.depth)
+
+    def refresh(self, venues=None):
+        '''
+        Fetches the order books of venues, by default of all exchanges,
+        concurrently and merges those that changed. Returns the set of
+        venues whose book changed.
+        '''
+        venues = sorted(venues if venues is not None else self.exchanges)
+        pool = self.pool or RequestPool(max(len(venues), 1))
+        try:
+            futures = [pool.submit(self._fetch, venue) for venue in venues]
+            outcomes = gather(futures, return_exceptions=True)
+        finally:
+            if self.pool is None:
+                pool.shutdown(wait=False)
+
+        books = {}
+        for venue, outcome in zip(venues, outcomes):
+            if isinstance(outcome, Exception):
+                self.errors[venue] = outcome
+            else:
+                self.errors.pop(venue, None)
+                books[venue] = outcome
+        return self.update(books)
+
+    def update(self, books):
+        '''
+        Merges order books fetched elsewhere, e.g. by a
+        cryptex.watch.Watcher, returns the set of venues whose book changed
+
+        :param books: {venue name: cryptex.orderbook.OrderBook or None to
+            remove the venue}
+        '''
+        bids = {}
+        asks = {}
+        for venue, book in books.items():
+            old = self.books.get(venue)
+            if book is None:
+                if old is None:
+                    continue
+                del self.books[venue]
+                bids[venue] = asks[venue] = []
+                continue
+            new_bids = list(book.bids)
+            new_asks = list(book.asks)
+            if old is None or list(old.bids) != new_bids:
+                bids[venue] = new_bids
+            if old is None or list(old.asks) != new_asks:
+                asks[venue] = new_asks
+            self.books[venue] = book
+        if bids:
+            self.bids.replace(bids)
+        if asks:
+            self.asks.replace(asks)
+        return set(bids) | set(asks)
+
+    def best_bid(self):
+        '''
+        (price, amount, venue) of the highest bid across venues
+        '''
+        return self.bids.best()
+
+    def best_ask(self):
+        '''
+        (price, amount, venue) of the lowest ask across venues
+        '''
+        return self.asks.best()
+
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    def cost_to_buy(self, amount):
+        return self.asks.cost(amount)
+
+    def proceeds_of_sell(self, amount):
+        return self.bids.cost(amount)
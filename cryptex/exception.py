@@ -3,3 +3,15 @@ class APIException(Exception):
 
 class CryptsyException(APIException):
     pass
+
+class RateLimitException(APIException):
+    pass
+
+class CircuitOpenException(APIException):
+    pass
+
+class TimeoutException(APIException):
+    pass
+
+class InvalidResponseException(APIException):
+    pass
@@ -1,3 +1,49 @@
-from cryptex.exchange.exchange import Exchange
-from cryptex.exchange.cryptsy import Cryptsy
-from cryptex.exchange.btce import BTCE
+'''
+The exchange clients. They are imported on first access, so importing
+cryptex.exchange to get at one of them does not load the others.
+'''
+import sys
+import types
+import importlib
+
+# name -> module that defines it
+_EXPORTS = {
+    'Exchange': 'cryptex.exchange.exchange',
+    'BatchResult': 'cryptex.exchange.exchange',
+    'HistoryPage': 'cryptex.exchange.exchange',
+    'Cryptsy': 'cryptex.exchange.cryptsy',
+    'BTCE': 'cryptex.exchange.btce',
+    'SimulatedExchange': 'cryptex.exchange.simulated',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+class _LazyModule(types.ModuleType):
+    '''
+    Stands in for this package in sys.modules and imports the module of an
+    exported name when the name is first looked up
+    '''
+    def __getattr__(self, name):
+        try:
+            module = _EXPORTS[name]
+        except KeyError:
+            raise AttributeError("'module' object has no attribute %r"
+                                 % name)
+        value = getattr(importlib.import_module(module), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_EXPORTS))
+
+
+def _install():
+    module = sys.modules[__name__]
+    lazy = _LazyModule(__name__, __doc__)
+    lazy.__dict__.update(module.__dict__)
+    # the globals of this module are cleared if it is garbage collected
+    lazy._module = module
+    sys.modules[__name__] = lazy
+
+_install()
@@ -0,0 +1,131 @@
+'''
+Non-blocking variants of the exchange clients.
+
+Every API method returns a cryptex.pool.Future immediately and the request
+runs on a bounded pool of worker threads, so many calls can be in flight at
+once:
+
+>>> public = AsyncCryptsyPublic(max_in_flight=16)
+>>> futures = [public.get_market_data(market_id) for market_id in ids]
+>>> market_data = public.gather(futures)
+
+The wrapped synchronous client does all the parsing and formatting, further
+keyword arguments (transport, cache, scheduler, ...) are passed on to it.
+'''
+from cryptex.pool import RequestPool, gather
+from cryptex.exchange.cryptsy import Cryptsy, CryptsyPublic
+from cryptex.exchange.btce import BTCE, BTCEPublic
+from cryptex.exchange.transport import SessionTransport
+
+
+def _deferred(name):
+    def method(self, *args, **kwargs):
+        return self.pool.submit(getattr(self.client, name), *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = 'Non-blocking %s, returns a cryptex.pool.Future' % name
+    return method
+
+
+def _client_kwargs(kwargs, max_in_flight):
+    '''
+    Keyword arguments for the wrapped client, with a connection pool large
+    enough for max_in_flight requests unless a transport is given
+    '''
+    if kwargs.get('transport') is None:
+        kwargs['transport'] = SessionTransport(pool_size=max_in_flight)
+    return kwargs
+
+
+class AsyncClient(object):
+    '''
+    Runs the methods of a synchronous client on a RequestPool
+
+    :param client: the synchronous client to wrap
+    :param max_in_flight: maximum number of concurrent requests
+    :param pool: RequestPool to share with other clients, overrides
+        max_in_flight
+    '''
+    def __init__(self, client, max_in_flight=8, pool=None):
+        self.client = client
+        self.pool = pool or RequestPool(max_in_flight)
+
+    @staticmethod
+    def gather(futures, return_exceptions=False):
+        return gather(futures, return_exceptions)
+
+    def map(self, name, *iterables):
+        '''
+        Calls the method name once per set of arguments, concurrently, and
+        returns the results in order.
+        '''
+        return self.pool.map(getattr(self.client, name), *iterables)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class AsyncExchange(AsyncClient):
+    get_markets = _deferred('get_markets')
+    get_my_open_orders = _deferred('get_my_open_orders')
+    get_my_trades = _deferred('get_my_trades')
+    cancel_order = _deferred('cancel_order')
+    buy = _deferred('buy')
+    sell = _deferred('sell')
+    get_my_transactions = _deferred('get_my_transactions')
+    get_my_funds = _deferred('get_my_funds')
+    place_orders = _deferred('place_orders')
+    cancel_orders = _deferred('cancel_orders')
+    cancel_all = _deferred('cancel_all')
+    get_ticker = _deferred('get_ticker')
+    get_order_book = _deferred('get_order_book')
+    get_recent_trades = _deferred('get_recent_trades')
+
+
+class AsyncCryptsyPublic(AsyncClient):
+    def __init__(self, max_in_flight=8, pool=None, **kwargs):
+        super(AsyncCryptsyPublic, self).__init__(
+            CryptsyPublic(**_client_kwargs(kwargs, max_in_flight)),
+            max_in_flight, pool)
+
+    get_market_data = _deferred('get_market_data')
+    get_order_data = _deferred('get_order_data')
+
+
+class AsyncCryptsy(AsyncExchange):
+    def __init__(self, key, secret, max_in_flight=8, pool=None, **kwargs):
+        super(AsyncCryptsy, self).__init__(
+            Cryptsy(key, secret, **_client_kwargs(kwargs, max_in_flight)),
+            max_in_flight, pool)
+
+    get_market_orders = _deferred('get_market_orders')
+    get_market_trades = _deferred('get_market_trades')
+
+
+class AsyncBTCEPublic(AsyncClient):
+    def __init__(self, max_in_flight=8, pool=None, **kwargs):
+        super(AsyncBTCEPublic, self).__init__(
+            BTCEPublic(**_client_kwargs(kwargs, max_in_flight)),
+            max_in_flight, pool)
+
+    get_info = _deferred('get_info')
+    get_ticker = _deferred('get_ticker')
+    get_depth = _deferred('get_depth')
+    get_trades = _deferred('get_trades')
+
+
+class AsyncBTCE(AsyncExchange):
+    '''
+    The public API is available as self.public and shares the transport,
+    cache, scheduler, instrumentation and the in-flight limit of the trade
+    API.
+    '''
+    def __init__(self, key, secret, max_in_flight=8, pool=None, **kwargs):
+        super(AsyncBTCE, self).__init__(
+            BTCE(key, secret, **_client_kwargs(kwargs, max_in_flight)),
+            max_in_flight, pool)
+        public = self.client.public
+        self.public = AsyncBTCEPublic(pool=self.pool,
+                                      transport=public.transport,
+                                      cache=public.cache,
+                                      scheduler=public.scheduler,
+                                      instrumentation=public.instrumentation)
@@ -0,0 +1,67 @@
+import os
+import time
+import hmac
+import threading
+from hashlib import sha512
+
+
+class NonceGenerator(object):
+    '''
+    Thread-safe source of strictly increasing nonces for signed requests.
+
+    Nonces follow the clock at the given resolution (1000 gives milliseconds)
+    but never repeat, so bursts of requests within one clock tick get
+    consecutive values.
+
+    :param path: file that keeps the nonce across restarts. Only a high-water
+        mark `reserve` nonces ahead is written, so the file is not rewritten
+        for every request.
+    :param resolution: clock ticks per second
+    :param maximum: largest nonce the exchange accepts
+    '''
+    def __init__(self, path=None, resolution=1000, maximum=None, reserve=100,
+                 clock=time.time):
+        self.path = path
+        self.resolution = resolution
+        self.maximum = maximum
+        self.reserve = reserve
+        self.clock = clock
+        self.last = 0
+        self._high_water = 0
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                content = f.read().strip()
+            if content:
+                self.last = self._high_water = int(content)
+
+    def next_nonce(self):
+        with self._lock:
+            nonce = max(self.last + 1, int(self.clock() * self.resolution))
+            if self.maximum is not None and nonce > self.maximum:
+                raise ValueError('Nonce exceeds maximum of %d' % self.maximum)
+            self.last = nonce
+            if self.path is not None and nonce > self._high_water:
+                self._persist(nonce + self.reserve)
+            return nonce
+
+    def _persist(self, high_water):
+        tmp_path = '%s.tmp' % self.path
+        with open(tmp_path, 'w') as f:
+            f.write(str(high_water))
+        os.rename(tmp_path, self.path)
+        self._high_water = high_water
+
+
+class Signer(object):
+    '''
+    Signs request payloads with HMAC-SHA512. The key is processed once, every
+    signature starts from a copy of the keyed state.
+    '''
+    def __init__(self, secret):
+        self._hmac = hmac.new(secret, digestmod=sha512)
+
+    def sign(self, message):
+        h = self._hmac.copy()
+        h.update(message)
+        return h.hexdigest()
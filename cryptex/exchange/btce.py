@@ -1,18 +1,31 @@
-import datetime
-import pytz
+import calendar
 
 from cryptex.exchange import Exchange
-from cryptex.trade import Sell, Buy
+from cryptex.exchange.exchange import PAGE_BY_ID
+from cryptex.trade import Sell, Buy, PublicTrade
+from cryptex.ticker import Ticker
+from cryptex.orderbook import OrderBook
 from cryptex.order import SellOrder, BuyOrder
+from cryptex.batch import TradeBatch, OrderBatch
 from cryptex.transaction import Transaction, Deposit, Withdrawal
 from cryptex.exchange.single_endpoint import SingleEndpoint, SignedSingleEndpoint
+from cryptex.exchange.transport import SessionTransport
+from cryptex.exchange.auth import NonceGenerator, Signer
+from cryptex.timestamp import utc_from_timestamp
 from cryptex.exception import APIException
+from cryptex.fixedpoint import DECIMAL
+from cryptex.instrument import FORMAT_TIME, ERRORS
+from cryptex.exchange import streaming
+from cryptex import ratelimit
 
 class BTCEBase(object):
     @staticmethod
     def _format_timestamp(timestamp):
-        return pytz.utc.localize(datetime.datetime.utcfromtimestamp(
-            timestamp))
+        return utc_from_timestamp(timestamp)
+
+    @staticmethod
+    def _to_timestamp(dt):
+        return calendar.timegm(dt.utctimetuple())
 
     @staticmethod
     def _pair_to_market(pair):
@@ -22,16 +35,48 @@ class BTCEBase(object):
     def _market_to_pair(market):
         return '_'.join((market[0].lower(), market[1].lower()))
 
+    def _ticker(self, pair, ticker):
+        '''
+        Ticker from one pair of a ticker response whose updated timestamp
+        is already converted
+        '''
+        base, counter = BTCEBase._pair_to_market(pair)
+        to_amount = self._to_amount
+        # buy is the price to buy at, vol_cur the volume in base currency
+        return Ticker(base, counter, ticker['updated'],
+                      to_amount(ticker['last']), to_amount(ticker['sell']),
+                      to_amount(ticker['buy']), to_amount(ticker['high']),
+                      to_amount(ticker['low']), to_amount(ticker['vol_cur']))
+
 
 class BTCEPublic(BTCEBase, SingleEndpoint):
     '''
     BTC-e public API https://btc-e.com/api/3/documentation
-    All information is cached for 2 seconds on the server
+    All information is cached for 2 seconds on the server, pass a
+    cryptex.cache.ResponseCache to avoid requesting it more often.
 
-    TODO: Add local caching to prevent frequent requests
     TODO: Format market pairs in output
     '''
     API_ENDPOINT = 'https://btc-e.com/api/3/'
+    CACHE_TTLS = {
+        'info': 60,
+        'ticker': 2,
+        'depth': 2,
+        'trades': 2,
+    }
+    REQUEST_PRIORITIES = {
+        'trades': ratelimit.LOW,
+    }
+
+    def __init__(self, transport=None, cache=None, scheduler=None,
+                 instrumentation=None, retry_policy=None,
+                 circuit_breaker=None):
+        self.transport = transport
+        self.cache = cache
+        self.scheduler = scheduler
+        self.instrumentation = instrumentation
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
 
     def _get_market_info(self, method, markets, limit=0, ignore_invalid=True):
         '''
@@ -57,7 +102,7 @@ class BTCEPublic(BTCEBase, SingleEndpoint):
         the minimum price, maximum price, minimum quantity purchase / sale,
         hidden=1whether the pair and the pair commission.
         '''
-        j = self.perform_get_request('info')
+        j = dict(self.perform_get_request('info'))
         j['server_time'] = BTCEPublic._format_timestamp(j['server_time'])
         return j
 
@@ -70,13 +115,13 @@ class BTCEPublic(BTCEBase, SingleEndpoint):
         All information is provided in the last 24 hours.
         FIXME: What does that mean?
         '''
-        results = self._get_market_info('ticker', markets, ignore_invalid)
-
-        for v in results:
-            if v is dict:
-                v['updated'] = BTCEPublic._format_timestamp(v['updated'])
-
-        return results
+        results = self._get_market_info('ticker', markets,
+                                        ignore_invalid=ignore_invalid)
+        # copies, the response may be shared through the cache
+        return {
+            pair: dict(v, updated=BTCEPublic._format_timestamp(v['updated']))
+            for pair, v in results.items()
+        }
 
     def get_depth(self, market, limit=150):
         '''
@@ -91,17 +136,99 @@ class BTCEPublic(BTCEBase, SingleEndpoint):
         Takes an optional parameter limit which indicates how many orders you want to display (default 150, max 2000).
         '''
         j = self._get_market_info('trades', [market], limit)
-        for t in j:
-            t['timestamp'] = BTCEPublic._format_timestamp(t['timestamp'])
-        return j
+        return {
+            pair: [
+                dict(t, timestamp=BTCEPublic._format_timestamp(t['timestamp']))
+                for t in trades
+            ]
+            for pair, trades in j.items()
+        }
+
+    def iter_market_info(self, method, markets, limit=0):
+        '''
+        Yields (pair, raw json text) of the pairs of a ticker or depth
+        response while it is downloaded, see cryptex.exchange.streaming.
+        Pairs BTC-e does not know are left out.
+        '''
+        params = {'ignore_invalid': 1}
+        if limit:
+            params['limit'] = limit
+        members = self.stream_get_request(
+            '/'.join((method, '-'.join(markets))), params, path=(),
+            scalars=True)
+        for pair, raw in members:
+            # {"success": 0, "error": "..."} instead of the pairs
+            if pair == 'error':
+                self._record(method, ERRORS, 1)
+                raise APIException(streaming.decode(raw))
+            if pair != 'success':
+                yield pair, raw
+
+    def to_ticker(self, pair, data):
+        '''
+        cryptex.ticker.Ticker from the data of one pair of a ticker response
+        '''
+        data = dict(data,
+                    updated=BTCEPublic._format_timestamp(data['updated']))
+        return self._ticker(pair, data)
 
 
 class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
     API_ENDPOINT = 'https://btc-e.com/tapi'
-    def __init__(self, key, secret):
+    # BTC-e nonces are limited to 32 bit, so they can't be milliseconds
+    NONCE_RESOLUTION = 1
+    NONCE_MAXIMUM = 4294967294
+    TRADE_PAGING = PAGE_BY_ID
+    TRANSACTION_PAGING = PAGE_BY_ID
+    REQUEST_PRIORITIES = {
+        'Trade': ratelimit.HIGH,
+        'CancelOrder': ratelimit.HIGH,
+        'TradeHistory': ratelimit.LOW,
+        'TransHistory': ratelimit.LOW,
+    }
+    NON_IDEMPOTENT_METHODS = frozenset(['Trade', 'CancelOrder',
+                                        'WithdrawCoin'])
+
+    def __init__(self, key, secret, transport=None, cache=None,
+                 nonce_generator=None, scheduler=None, numeric=DECIMAL,
+                 instrumentation=None, pool=None, retry_policy=None,
+                 circuit_breaker=None):
+        '''
+        :param transport: cryptex.exchange.transport.Transport shared by the
+            trade and the public API, defaults to a pooled SessionTransport
+        :param cache: cryptex.cache.ResponseCache for the public API
+        :param nonce_generator: cryptex.exchange.auth.NonceGenerator, pass
+            one with a path to keep bursts of requests valid across restarts
+        :param scheduler: cryptex.ratelimit.RequestScheduler shared by the
+            trade and the public API
+        :param numeric: cryptex.fixedpoint.FIXED to get amounts, prices and
+            fees of trades, orders and transactions as integers of 1e-8
+            units instead of Decimal
+        :param instrumentation: recorder of timings, payload sizes and errors
+            of the trade and the public API, see cryptex.instrument
+        :param pool: cryptex.pool.RequestPool for submit and map
+        :param retry_policy: cryptex.retry.RetryPolicy for the idempotent
+            requests of the trade and the public API
+        :param circuit_breaker: cryptex.retry.CircuitBreaker shared by the
+            trade and the public API
+        '''
         self.key = key
+        self.numeric = numeric
+        self.instrumentation = instrumentation
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
         self.secret = secret
-        self.public = BTCEPublic()
+        self.scheduler = scheduler
+        self.signer = Signer(secret)
+        self.nonce_generator = nonce_generator or NonceGenerator(
+            resolution=self.NONCE_RESOLUTION, maximum=self.NONCE_MAXIMUM)
+        self.pool = pool
+        self.transport = transport or SessionTransport()
+        self.public = BTCEPublic(transport=self.transport, cache=cache,
+                                 scheduler=scheduler,
+                                 instrumentation=instrumentation,
+                                 retry_policy=retry_policy,
+                                 circuit_breaker=circuit_breaker)
 
     def perform_request(self, method, data={}):
         try:
@@ -111,30 +238,66 @@ class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
                 return {}
             else:
                 raise e
-    @staticmethod
-    def _format_trade(trade_id, trade):
+    def _trade_row(self, trade_id, trade):
+        '''
+        Trade class and constructor arguments, see cryptex.batch.TradeBatch
+        '''
         base, counter = BTCE._pair_to_market(trade['pair'])
         if trade['type'] == 'buy':
             trade_type = Buy
         else:
             trade_type = Sell
 
-        return trade_type(
-            trade_id = trade_id,
-            base_currency = base.upper(),
-            counter_currency = counter.upper(),
-            datetime = BTCE._format_timestamp(trade['timestamp']),
-            order_id = trade['order_id'],
-            amount = trade['amount'],
-            price = trade['rate'],
+        return (
+            trade_type,
+            trade_id,
+            base.upper(),
+            counter.upper(),
+            BTCE._format_timestamp(trade['timestamp']),
+            trade['order_id'],
+            self._to_amount(trade['amount']),
+            self._to_amount(trade['rate']),
+            None,
+            None,
         )
 
-    def get_my_trades(self):
-        trades = self.perform_request('TradeHistory')
-        return [BTCE._format_trade(t_id, t) for t_id, t in trades.iteritems()]
+    def _format_trade(self, trade_id, trade):
+        row = self._trade_row(trade_id, trade)
+        return row[0](*row[1:])
 
     @staticmethod
-    def _format_order(order_id, order):
+    def _history_params(limit, since, from_id):
+        params = {'count': limit}
+        if since is not None:
+            params['since'] = BTCE._to_timestamp(since)
+        if from_id is not None:
+            params['from_id'] = from_id
+        if since is not None or from_id is not None:
+            # oldest first, so limit does not skip rows after the cursor
+            params['order'] = 'ASC'
+        return params
+
+    def get_my_trades(self, limit=1000, since=None, columnar=False,
+                      from_id=None):
+        '''
+        :param columnar: return a cryptex.batch.TradeBatch instead of a list
+        :param from_id: only trades with this id or a higher one
+        '''
+        params = BTCE._history_params(limit, since, from_id)
+        trades = self.perform_request('TradeHistory', params)
+        return self._timed('TradeHistory', FORMAT_TIME, self._format_trades,
+                           trades, columnar)
+
+    def _format_trades(self, trades, columnar):
+        if columnar:
+            return TradeBatch([self._trade_row(t_id, t)
+                               for t_id, t in trades.iteritems()])
+        return [self._format_trade(t_id, t) for t_id, t in trades.iteritems()]
+
+    def _order_row(self, order_id, order):
+        '''
+        Order class and constructor arguments, see cryptex.batch.OrderBatch
+        '''
         if order['type'] == 'buy':
             order_type = BuyOrder
         else:
@@ -142,18 +305,33 @@ class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
 
         base, counter = BTCE._pair_to_market(order['pair'])
 
-        return order_type(
-            order_id = order_id,
-            base_currency = base.upper(),
-            counter_currency = counter.upper(),
-            datetime = BTCE._format_timestamp(order['timestamp_created']),
-            amount = order['amount'],
-            price = order['rate']
+        return (
+            order_type,
+            order_id,
+            base.upper(),
+            counter.upper(),
+            BTCE._format_timestamp(order['timestamp_created']),
+            self._to_amount(order['amount']),
+            self._to_amount(order['rate']),
         )
 
-    def get_my_open_orders(self):
+    def _format_order(self, order_id, order):
+        row = self._order_row(order_id, order)
+        return row[0](*row[1:])
+
+    def get_my_open_orders(self, columnar=False):
+        '''
+        :param columnar: return a cryptex.batch.OrderBatch instead of a list
+        '''
         orders = self.perform_request('ActiveOrders')
-        return [BTCE._format_order(o_id, o) for o_id, o in orders.iteritems()]
+        return self._timed('ActiveOrders', FORMAT_TIME, self._format_orders,
+                           orders, columnar)
+
+    def _format_orders(self, orders, columnar):
+        if columnar:
+            return OrderBatch([self._order_row(o_id, o)
+                               for o_id, o in orders.iteritems()])
+        return [self._format_order(o_id, o) for o_id, o in orders.iteritems()]
 
     def cancel_order(self, order_id):
         self.perform_request('CancelOrder', {'order_id': order_id})
@@ -169,8 +347,8 @@ class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
         params = {
             'pair': BTCE._market_to_pair(market),
             'type': order_type,
-            'amount': quantity,
-            'rate': price
+            'amount': self._to_param(quantity),
+            'rate': self._to_param(price)
         }
         return self.perform_request('Trade', params)
 
@@ -182,17 +360,26 @@ class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
         response = self._create_order(market, 'sell', quantity, price)
         return response['order_id']
 
-    def get_my_transactions(self, limit=1000):
+    def get_my_transactions(self, limit=1000, since=None, from_id=None):
+        '''
+        :param from_id: only transactions with this id or a higher one
+        '''
+        params = BTCE._history_params(limit, since, from_id)
+        return self._timed('TransHistory', FORMAT_TIME,
+                           self._format_transactions,
+                           self.perform_request('TransHistory', params))
+
+    def _format_transactions(self, history):
         transactions = []
-        for tid, t in self.perform_request('TransHistory', {'count': limit}).iteritems():
+        for tid, t in history.iteritems():
             if t['type'] == 1:
                 # Assume no fees for deopsit
                 transactions.append(Deposit(tid,
                                             self._format_timestamp(t['timestamp']),
                                             t['currency'],
-                                            t['amount'],
+                                            self._to_amount(t['amount']),
                                             '',
-                                            0
+                                            self._to_amount(0)
                                     ))
             elif t['type'] == 2:
                 idx = t['desc'].find('address ')
@@ -204,13 +391,39 @@ class BTCE(BTCEBase, Exchange, SignedSingleEndpoint):
                 transactions.append(Withdrawal(tid,
                                             self._format_timestamp(t['timestamp']),
                                             t['currency'],
-                                            t['amount'],
+                                            self._to_amount(t['amount']),
                                             address
                                     ))
         return transactions
 
+    def get_ticker(self, markets):
+        '''
+        All markets are fetched with a single request
+        '''
+        pairs = [BTCE._market_to_pair(market) for market in markets]
+        if not pairs:
+            return {}
+        tickers = self.public.get_ticker(pairs)
+        return dict((BTCE._pair_to_market(pair), self._ticker(pair, ticker))
+                    for pair, ticker in tickers.items())
+
+    def get_order_book(self, market, depth=None):
+        pair = BTCE._market_to_pair(market)
+        return OrderBook.from_btce_depth(
+            self.public.get_depth(pair, depth or 150)[pair])
+
+    def get_recent_trades(self, market, limit=150):
+        pair = BTCE._market_to_pair(market)
+        base, counter = BTCE._pair_to_market(pair)
+        to_amount = self._to_amount
+        # bid: the buyer took an ask
+        return [PublicTrade(t['tid'], base, counter, t['timestamp'],
+                            'buy' if t['type'] == 'bid' else 'sell',
+                            to_amount(t['amount']), to_amount(t['price']))
+                for t in self.public.get_trades(pair, limit)[pair]]
+
     def get_my_funds(self):
         funds = {}
         for key, value in self.perform_request('getInfo')['funds'].iteritems():
-            funds[key.upper()] = value
+            funds[key.upper()] = self._to_amount(value)
         return funds
@@ -1,26 +1,54 @@
-import datetime
+import threading
+from datetime import timedelta
 from decimal import Decimal, InvalidOperation
-import pytz
 
 import cryptex.common as common
 from cryptex.exception import CryptsyException
-from cryptex.exchange import Exchange
-from cryptex.trade import Sell, Buy
+from cryptex import ratelimit
+from cryptex.fixedpoint import DECIMAL
+from cryptex.instrument import TIMESTAMP_TIME, FORMAT_TIME
+from cryptex.exchange import Exchange, BatchResult
+from cryptex.exchange.exchange import PAGE_BY_DATE, HistoryPage
+from cryptex.trade import Sell, Buy, PublicTrade
+from cryptex.ticker import Ticker
+from cryptex.orderbook import OrderBook
 from cryptex.order import SellOrder, BuyOrder
+from cryptex.batch import TradeBatch, OrderBatch
 from cryptex.transaction import Transaction, Deposit, Withdrawal
 from cryptex.exchange.single_endpoint import SingleEndpoint, SignedSingleEndpoint
+from cryptex.exchange.auth import NonceGenerator, Signer
+from cryptex.exchange.transport import SessionTransport
+from cryptex.timestamp import TimestampConverter
+from cryptex.exchange.market_index import MarketIndex
+from cryptex.exchange import streaming
+from cryptex.exchange.streaming import LazyMapping
+
+ONE_MICROSECOND = timedelta(microseconds=1)
 
 
 class CryptsyBase(object):
-    def __init__(self):
-        '''
-        Can't get servertimezone via public API so hardcode to EST
-        '''
-        self.timezone = pytz.timezone(u'EST')
+    timestamp_converter = None
+    # Can't get servertimezone via public API so hardcode to EST
+    SERVER_TIMEZONE = u'EST'
+
+    def __init__(self, transport=None, cache=None, scheduler=None,
+                 instrumentation=None, retry_policy=None,
+                 circuit_breaker=None):
+        self.timezone = None
+        self._timezone_lock = threading.RLock()
+        self.transport = transport
+        self.cache = cache
+        self.scheduler = scheduler
+        self.instrumentation = instrumentation
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
 
     def _get_info(self):
         raise NotImplementedError
 
+    def _get_server_timezone(self):
+        return self.SERVER_TIMEZONE
+
     def _get_timezone(self):
         """
         Cryptsy seems to return all its timestamps in Eastern Standard Time,
@@ -29,110 +57,294 @@ class CryptsyBase(object):
         timezone then. We'll cache it, too.
         """
         if self.timezone is None:
-            self.timezone = pytz.timezone(self._get_info()['servertimezone'])
+            with self._timezone_lock:
+                if self.timezone is None:
+                    # pytz is loaded on first use
+                    import pytz
+                    self.timezone = pytz.timezone(
+                        self._get_server_timezone())
 
         return self.timezone
 
+    def _get_timestamp_converter(self):
+        if self.timestamp_converter is None:
+            with self._timezone_lock:
+                if self.timestamp_converter is None:
+                    self.timestamp_converter = TimestampConverter(
+                        self._get_timezone())
+        return self.timestamp_converter
+
     def _convert_datetime(self, time_str):
         """
         Convert cryptsy datetime to timezone-aware datetime object in UTC
         """
-        naive_time = datetime.datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-        cryptsy_time = self._get_timezone()
-        aware_time = cryptsy_time.normalize(cryptsy_time.localize(naive_time)).astimezone(pytz.utc)
-        return aware_time
+        return self._get_timestamp_converter().convert(time_str)
+
+    def _convert_datetimes(self, time_strs):
+        return self._get_timestamp_converter().convert_many(time_strs)
+
+    def _ticker(self, market, data):
+        '''
+        Ticker from the market data of one market whose lasttradetime is
+        already converted
+        '''
+        buy_orders = data['buyorders'] or ()
+        sell_orders = data['sellorders'] or ()
+        to_amount = self._to_amount
+        return Ticker(market[0], market[1], data['lasttradetime'],
+                      to_amount(data['lasttradeprice']),
+                      to_amount(buy_orders[0]['price']) if buy_orders else None,
+                      to_amount(sell_orders[0]['price']) if sell_orders else None,
+                      volume=to_amount(data['volume']))
 
 class CryptsyPublic(CryptsyBase, SingleEndpoint):
     API_ENDPOINT = 'http://pubapi.cryptsy.com/api.php'
+    REQUEST_PRIORITIES = {
+        'marketdatav2': ratelimit.LOW,
+        'orderdata': ratelimit.LOW,
+    }
 
     def perform_get_request(self, method='', params={}):
         return super(CryptsyPublic, self).perform_get_request(method, params)
 
-    def get_market_data(self, market_id=None):
+    @staticmethod
+    def _market_data_params(market_id):
+        if market_id:
+            return {'method': 'singlemarketdata', 'marketid': market_id}
+        return {'method': 'marketdatav2'}
+
+    @staticmethod
+    def _order_data_params(market_id):
+        if market_id:
+            return {'method': 'singleorderdata', 'marketid': market_id}
+        return {'method': 'orderdata'}
+
+    def _format_market(self, market):
+        # copy, the response may be shared through the cache
+        market = dict(market)
+        market['lasttradetime'] = self._convert_datetime(market['lasttradetime'])
+        trades = market['recenttrades']
+        times = self._convert_datetimes([t['time'] for t in trades])
+        market['recenttrades'] = [
+            dict(trade, time=time) for trade, time in zip(trades, times)
+        ]
+        return market
+
+    def get_market_data(self, market_id=None, lazy=False):
         '''
         General Market Data
-        '''
-        if market_id:
-            params = {'method': 'singlemarketdata',
-                    'marketid': market_id}
-        else:
-            params = {'method': 'marketdatav2'}
 
+        :param lazy: return a read-only mapping that only decodes the markets
+            that are looked up
+        '''
+        params = self._market_data_params(market_id)
+        if lazy:
+            return LazyMapping(
+                dict(self.stream_get_request(params=params,
+                                             path=('return', 'markets'))),
+                self._format_market)
+
+        markets = self.perform_get_request(params=params)['markets']
+        return self._timed(params['method'], FORMAT_TIME,
+                           self._format_markets, markets)
+
+    def _format_markets(self, markets):
         market_data = {}
-        for key, market in self.perform_get_request(params=params)['markets'].iteritems():
-            market['lasttradetime'] = self._convert_datetime(market['lasttradetime'])
-            for trade in market['recenttrades']:
-                trade['time'] = self._convert_datetime(trade['time'])
-            market_data[key] = market
+        for key, market in markets.iteritems():
+            market_data[key] = self._format_market(market)
         return market_data
 
+    def iter_market_data(self, market_id=None, raw=False):
+        '''
+        Yields (label, market) of the general market data while it is
+        downloaded, without holding the whole response in memory
+
+        :param raw: yield the json text of the markets instead, see
+            to_ticker
+        '''
+        params = self._market_data_params(market_id)
+        for key, text in self.stream_get_request(params=params,
+                                                 path=('return', 'markets')):
+            if raw:
+                yield key, text
+            else:
+                yield key, self._format_market(streaming.decode(text))
+
+    def to_ticker(self, market):
+        '''
+        cryptex.ticker.Ticker from the market data of one market
+        '''
+        market = dict(market, lasttradetime=self._convert_datetime(
+            market['lasttradetime']))
+        return self._ticker((market['primarycode'], market['secondarycode']),
+                            market)
 
-    def get_order_data(self, market_id=None):
+    def get_order_data(self, market_id=None, lazy=False):
         '''
         General Orderbook Data
+
+        :param lazy: return a read-only mapping that only decodes the markets
+            that are looked up
         '''
-        if market_id:
-            params = {'method': 'singleorderdata',
-                    'marketid': market_id}
-        else:
-            params = {'method': 'orderdata'}
+        params = self._order_data_params(market_id)
+        if lazy:
+            return LazyMapping(dict(self.stream_get_request(params=params)))
         return self.perform_get_request(params=params)
 
+    def iter_order_data(self, market_id=None, raw=False):
+        '''
+        Yields (label, orders) of the general orderbook data while it is
+        downloaded
+
+        :param raw: yield the json text of the orders instead
+        '''
+        params = self._order_data_params(market_id)
+        for key, text in self.stream_get_request(params=params):
+            yield key, text if raw else streaming.decode(text)
+
 
 class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
     API_ENDPOINT = 'https://api.cryptsy.com/api'
-    def __init__(self, key, secret):
+    TRADE_PAGING = PAGE_BY_DATE
+    REQUEST_PRIORITIES = {
+        'createorder': ratelimit.HIGH,
+        'cancelorder': ratelimit.HIGH,
+        'cancelallorders': ratelimit.HIGH,
+        'cancelmarketorders': ratelimit.HIGH,
+        'allmytrades': ratelimit.LOW,
+        'mytrades': ratelimit.LOW,
+        'mytransactions': ratelimit.LOW,
+        'markettrades': ratelimit.LOW,
+    }
+    NON_IDEMPOTENT_METHODS = frozenset([
+        'createorder', 'cancelorder', 'cancelallorders',
+        'cancelmarketorders', 'makewithdrawal', 'generatenewaddress'])
+
+    def __init__(self, key, secret, transport=None, nonce_generator=None,
+                 scheduler=None, market_cache=None, market_cache_ttl=86400,
+                 numeric=DECIMAL, instrumentation=None, cache=None,
+                 pool=None, retry_policy=None, circuit_breaker=None):
+        '''
+        :param market_cache: file to keep the market ids in, so new processes
+            don't have to request them before their first call
+        :param market_cache_ttl: seconds after which the market cache is
+            refreshed in the background
+        :param numeric: cryptex.fixedpoint.FIXED to get amounts, prices and
+            fees of trades, orders and transactions as integers of 1e-8
+            units instead of Decimal
+        :param instrumentation: recorder of timings, payload sizes and
+            errors, see cryptex.instrument
+        :param cache: cryptex.cache.ResponseCache for the public API, which
+            is available as self.public and shares the transport, scheduler
+            and instrumentation
+        :param pool: cryptex.pool.RequestPool for submit and map
+        :param retry_policy: cryptex.retry.RetryPolicy for the idempotent
+            requests of the private and the public API
+        :param circuit_breaker: cryptex.retry.CircuitBreaker shared by the
+            private and the public API
+        '''
         self.key = key
+        self.numeric = numeric
+        self.instrumentation = instrumentation
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
         self.secret = secret
-        self.market_currency_map = None
+        self.scheduler = scheduler
+        self.signer = Signer(secret)
+        self.nonce_generator = nonce_generator or NonceGenerator(
+            resolution=self.NONCE_RESOLUTION)
+        self.market_cache = market_cache
+        self.market_cache_ttl = market_cache_ttl
+        self.market_index = None
+        self._market_index_lock = threading.Lock()
         self.timezone = None
+        self._timezone_lock = threading.RLock()
+        self.pool = pool
+        self.transport = transport or SessionTransport()
+        self.public = CryptsyPublic(transport=self.transport, cache=cache,
+                                    scheduler=scheduler,
+                                    instrumentation=instrumentation,
+                                    retry_policy=retry_policy,
+                                    circuit_breaker=circuit_breaker)
 
     def perform_request(self, method, data={}):
         return super(Cryptsy, self).perform_request(method, data)
 
-    def _convert_datetime(self, time_str):
+    def refresh_markets(self):
         """
-        Convert cryptsy timestamp to timezone-aware datetime object in UTC
+        Fetches the markets and replaces the market index (and its cache
+        file, if any)
         """
-        naive_time = datetime.datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-        cryptsy_time = self._get_timezone()
-        aware_time = cryptsy_time.normalize(cryptsy_time.localize(naive_time)).astimezone(pytz.utc)
-        return aware_time
-
-    def _get_market_currency_map(self):
-        if self.market_currency_map is None:
-            markets = self.perform_request('getmarkets')
-            self.market_currency_map = {
-                m['marketid']:
-                (m['primary_currency_code'], m['secondary_currency_code'])
-                for m in markets
-            }
-        return self.market_currency_map
+        markets = self.perform_request('getmarkets')
+        index = MarketIndex(
+            (m['marketid'],
+             (m['primary_currency_code'], m['secondary_currency_code']))
+            for m in markets
+        )
+        if self.market_cache is not None:
+            index.save(self.market_cache)
+        self.market_index = index
+        return index
+
+    def _get_market_index(self):
+        index = self.market_index
+        if index is None:
+            with self._market_index_lock:
+                # another thread may have filled it while this one waited
+                index = self.market_index
+                if index is None:
+                    index = self._load_market_index()
+        return index
+
+    def _load_market_index(self):
+        index = None
+        if self.market_cache is not None:
+            index = MarketIndex.load(self.market_cache)
+        if index is None:
+            return self.refresh_markets()
+        self.market_index = index
+        if index.age() > self.market_cache_ttl:
+            # serve the stale ids while fetching the current ones
+            refresh = threading.Thread(target=self.refresh_markets)
+            refresh.daemon = True
+            refresh.start()
+        return index
 
     def _get_currencies(self, market_id):
         """
         Cryptsy uses references to market_ids which uniquely identify markets.
         Given a market_id, this function returns a two-tuple containing the currencies involved.
         """
-        market_id = self._get_market_id(market_id)
-        return self._get_market_currency_map()[market_id]
+        index = self._get_market_index()
+        if market_id in index:
+            return index.get_pair(market_id)
+        return index.get_pair(self._get_market_id(market_id))
 
     def _get_market_id(self, pair):
-        if pair in self._get_market_currency_map():
+        index = self._get_market_index()
+        if pair in index:
             # looks like this already is a market_id
             return pair
-        market = filter(lambda m: m[1] == pair, self._get_market_currency_map().iteritems())
-        if not market:
+        try:
+            return index.get_id(pair)
+        except (KeyError, TypeError):
             raise CryptsyException('Market not found')
-        return market[0][0]
 
     def _get_info(self):
         return self.perform_request('getinfo')
 
+    def _get_server_timezone(self):
+        return self._get_info()['servertimezone']
+
     def get_markets(self):
-        return [m[1] for m in self._get_market_currency_map().iteritems()]
+        return self._get_market_index().pairs()
 
-    def _format_trade(self, trade):
+    def _trade_row(self, trade, datetime):
+        '''
+        Trade class and constructor arguments, see cryptex.batch.TradeBatch
+
+        :param datetime: the converted datetime of the trade
+        '''
         if trade['tradetype'] == 'Buy':
             trade_type = Buy
         else:
@@ -140,32 +352,110 @@ class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
 
         base, counter = self._get_currencies(trade['marketid'])
 
-        return trade_type(
-            trade_id = trade['tradeid'],
-            base_currency = base,
-            counter_currency = counter,
-            datetime = self._convert_datetime(trade['datetime']),
-            order_id = trade['order_id'],
-            amount = Decimal(trade['quantity']),
-            price = Decimal(trade['tradeprice']),
-            fee = Decimal(trade['fee']),
+        return (
+            trade_type,
+            trade['tradeid'],
+            base,
+            counter,
+            datetime,
+            trade['order_id'],
+            self._to_amount(trade['quantity']),
+            self._to_amount(trade['tradeprice']),
+            self._to_amount(trade['fee']),
             # Cryptsy's fee is always taken from counter_currency
-            fee_currency = counter,
+            counter,
         )
 
-    def get_my_trades(self, limit=200, market=None):
+    def _format_trade(self, trade):
+        row = self._trade_row(trade, self._convert_datetime(trade['datetime']))
+        return row[0](*row[1:])
+
+    def _to_server_date(self, dt):
+        return dt.astimezone(self._get_timezone()).strftime('%Y-%m-%d')
+
+    def _day_start(self, dt):
+        '''
+        Start of the day of dt in the server's timezone
+        '''
+        timezone = self._get_timezone()
+        local = dt.astimezone(timezone).replace(
+            tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        return timezone.localize(local)
+
+    def _date_params(self, limit, since, until):
         params = {'limit': limit}
+        # startdate and enddate are days in the server's timezone, until
+        # itself is not included
+        if since is not None:
+            params['startdate'] = self._to_server_date(since)
+        if until is not None:
+            params['enddate'] = self._to_server_date(until - ONE_MICROSECOND)
+        return params
+
+    def get_my_trades(self, limit=200, market=None, since=None,
+                      columnar=False, until=None):
+        '''
+        Newest first
+
+        :param columnar: return a cryptex.batch.TradeBatch instead of a list
+        :param until: only trades before this datetime, like since it is
+            only sent to the server for all markets
+        '''
         if market is None:
-            trades = self.perform_request('allmytrades', params)
+            params = self._date_params(limit, since, until)
+            api_method = 'allmytrades'
         else:
-            params['marketid'] = self._get_market_id(market)
-            trades = self.perform_request('mytrades', params)
+            params = {'limit': limit,
+                      'marketid': self._get_market_id(market)}
+            api_method = 'mytrades'
+        trades = self.perform_request(api_method, params)
+        if market is not None:
             for index, trade in enumerate(trades):
                 trade['marketid'] = params['marketid']
                 trades[index] = trade
-        return [self._format_trade(t) for t in trades]
+        datetimes = self._timed(api_method, TIMESTAMP_TIME,
+                                self._convert_datetimes,
+                                [t['datetime'] for t in trades])
+        return self._timed(api_method, FORMAT_TIME, self._format_trades,
+                           trades, datetimes, since, until, columnar)
 
-    def _format_order(self, order):
+    def get_my_trade_page(self, limit=200, since=None, until=None):
+        '''
+        Trades of all markets, see Exchange.get_my_trade_page
+        '''
+        trades = self.perform_request('allmytrades',
+                                      self._date_params(limit, since, until))
+        datetimes = self._timed('allmytrades', TIMESTAMP_TIME,
+                                self._convert_datetimes,
+                                [t['datetime'] for t in trades])
+        rows = self._timed('allmytrades', FORMAT_TIME, self._format_trades,
+                           trades, datetimes, since, until, False)
+        if not datetimes:
+            return HistoryPage(rows)
+        oldest = min(datetimes)
+        # limit is what the server was asked for, before since and until
+        # were applied to the days it sent
+        return HistoryPage(rows, len(trades) >= limit, oldest,
+                           self._day_start(oldest))
+
+    def _format_trades(self, trades, datetimes, since, until, columnar):
+        rows = [self._trade_row(trade, datetime)
+                for trade, datetime in zip(trades, datetimes)]
+        # row[4] is the datetime of the trade
+        if since is not None:
+            rows = [row for row in rows if row[4] >= since]
+        if until is not None:
+            rows = [row for row in rows if row[4] < until]
+        if columnar:
+            return TradeBatch(rows)
+        return [row[0](*row[1:]) for row in rows]
+
+    def _order_row(self, order, datetime):
+        '''
+        Order class and constructor arguments, see cryptex.batch.OrderBatch
+
+        :param datetime: the converted creation datetime of the order
+        '''
         if order['ordertype'] == 'Buy':
             order_type = BuyOrder
         else:
@@ -173,27 +463,47 @@ class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
 
         base, counter = self._get_currencies(order['marketid'])
 
-        return order_type(
-            order_id = order['orderid'],
-            order_type = order_type,
-            base_currency = base,
-            counter_currency = counter,
-            datetime = self._convert_datetime(order['created']),
-            amount = Decimal(order['quantity']),
-            price = Decimal(order['price'])
+        return (
+            order_type,
+            order['orderid'],
+            base,
+            counter,
+            datetime,
+            self._to_amount(order['quantity']),
+            self._to_amount(order['price']),
         )
 
-    def get_my_open_orders(self, market=None):
+    def _format_order(self, order):
+        row = self._order_row(order, self._convert_datetime(order['created']))
+        return row[0](*row[1:])
+
+    def _format_orders(self, orders, datetimes, columnar):
+        rows = [self._order_row(order, datetime)
+                for order, datetime in zip(orders, datetimes)]
+        if columnar:
+            return OrderBatch(rows)
+        return [row[0](*row[1:]) for row in rows]
+
+    def get_my_open_orders(self, market=None, columnar=False):
+        '''
+        :param columnar: return a cryptex.batch.OrderBatch instead of a list
+        '''
         if market:
             market_id = self._get_market_id(market)
-            orders = self.perform_request('myorders', {'marketid': market_id})
+            api_method = 'myorders'
+            orders = self.perform_request(api_method, {'marketid': market_id})
             # response does not contain market_id
             for index, order in enumerate(orders):
                 order[u'marketid'] = market_id
                 orders[index] = order
         else:
-            orders = self.perform_request('allmyorders')
-        return [self._format_order(o) for o in orders]
+            api_method = 'allmyorders'
+            orders = self.perform_request(api_method)
+        datetimes = self._timed(api_method, TIMESTAMP_TIME,
+                                self._convert_datetimes,
+                                [o['created'] for o in orders])
+        return self._timed(api_method, FORMAT_TIME, self._format_orders,
+                           orders, datetimes, columnar)
 
     def get_market_orders(self, market):
         market_id = self._get_market_id(market)
@@ -202,22 +512,95 @@ class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
     def get_market_trades(self, market):
         market_id = self._get_market_id(market)
         trades = self.perform_request('markettrades', {'marketid': market_id})
-        for index, trade in enumerate(trades):
-            trade['datetime'] = self._convert_datetime(trade['datetime'])
-            trades[index] = trade
+        datetimes = self._timed('markettrades', TIMESTAMP_TIME,
+                                self._convert_datetimes,
+                                [t['datetime'] for t in trades])
+        for trade, datetime in zip(trades, datetimes):
+            trade['datetime'] = datetime
         return trades
 
+    def get_ticker(self, markets):
+        '''
+        A single market is fetched with singlemarketdata, several are picked
+        from one marketdatav2 response
+        '''
+        markets = [tuple(market) for market in markets]
+        if not markets:
+            return {}
+        if len(markets) == 1:
+            try:
+                market_id = self._get_market_index().get_id(markets[0])
+            except KeyError:
+                return {}
+            data = self.public.get_market_data(market_id)
+        else:
+            # decoding all of it at once is faster than the lazy mapping
+            data = self.public.get_market_data()
+        tickers = {}
+        for market in markets:
+            market_data = data.get('%s/%s' % market)
+            if market_data is not None:
+                tickers[market] = self._ticker(market, market_data)
+        return tickers
+
+    def get_order_book(self, market, depth=None):
+        orders = self.get_market_orders(market)
+        if depth is not None:
+            orders = {'buyorders': (orders['buyorders'] or [])[:depth],
+                      'sellorders': (orders['sellorders'] or [])[:depth]}
+        return OrderBook.from_cryptsy_orders(orders)
+
+    def get_recent_trades(self, market):
+        base, counter = self._get_currencies(self._get_market_id(market))
+        to_amount = self._to_amount
+        return [PublicTrade(t['tradeid'], base, counter, t['datetime'],
+                            t['initiate_ordertype'].lower(),
+                            to_amount(t['quantity']),
+                            to_amount(t['tradeprice']))
+                for t in self.get_market_trades(market)]
+
     def cancel_order(self, order_id):
         self.perform_request('cancelorder', {'orderid': order_id})
         return None
 
+    def cancel_all(self, market=None, max_in_flight=None):
+        '''
+        Cancels the orders with a single cancelallorders or
+        cancelmarketorders request instead of one request per order.
+
+        The bulk response does not tell which orders it cancelled, so the
+        open orders are listed again afterwards. Orders that were open before
+        and are gone are reported as cancelled (an order that filled in the
+        meantime can not be told apart). Orders that are still open, e.g.
+        because the bulk request failed, are cancelled one by one with
+        cancel_orders.
+        '''
+        orders = self.get_my_open_orders(market)
+        if not orders:
+            return []
+        try:
+            if market is None:
+                self.perform_request('cancelallorders')
+            else:
+                self.perform_request('cancelmarketorders',
+                                     {'marketid': self._get_market_id(market)})
+        except Exception:
+            # what is still open is cancelled one by one below
+            pass
+        still_open = set(o.order_id for o in self.get_my_open_orders(market))
+        retried = dict(
+            (r.request, r) for r in self.cancel_orders(
+                [o.order_id for o in orders if o.order_id in still_open],
+                max_in_flight))
+        return [retried.get(o.order_id) or BatchResult(o.order_id)
+                for o in orders]
 
     def _create_order(self, market_id, order_type, quantity, price):
         params = {
             'marketid': market_id,
             'ordertype': order_type,
-            'quantity': quantity,
-            'price': price
+            'quantity': self._to_param(quantity),
+            'price': self._to_param(price)
         }
         return self.perform_request('createorder', params)
 
@@ -231,9 +614,18 @@ class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
         response = self._create_order(market_id, 'Sell', quantity, price)
         return response['orderid']
 
-    def get_my_transactions(self, limit=None):
+    def get_my_transactions(self, limit=None, since=None):
+        history = self.perform_request('mytransactions')
+        datetimes = self._timed('mytransactions', TIMESTAMP_TIME,
+                                self._convert_datetimes,
+                                [t['datetime'] for t in history])
+        return self._timed('mytransactions', FORMAT_TIME,
+                           self._format_transactions, history, datetimes,
+                           since)
+
+    def _format_transactions(self, history, datetimes, since):
         transactions = []
-        for t in self.perform_request('mytransactions'):
+        for t, datetime in zip(history, datetimes):
             tx_type = None
             if t['type'] == 'Withdrawal':
                 tx_type = Withdrawal
@@ -245,13 +637,18 @@ class Cryptsy(CryptsyBase, Exchange, SignedSingleEndpoint):
                     tx_type = Deposit
             if tx_type:
                 transactions.append(tx_type(t['trxid'],
-                                            self._convert_datetime(t['datetime']),
+                                            datetime,
                                             t['currency'],
-                                            t['amount'],
+                                            self._to_amount(t['amount']),
                                             t['address'],
-                                            t['fee'],
+                                            self._to_amount(t['fee']),
                                     ))
+        if since is not None:
+            # mytransactions can't be filtered on the server
+            transactions = [t for t in transactions if t.datetime >= since]
         return transactions
 
     def get_my_funds(self):
-        return self._get_info()['balances_available']
+        return dict((currency.upper(), self._to_amount(amount))
+                    for currency, amount
+                    in self._get_info()['balances_available'].iteritems())
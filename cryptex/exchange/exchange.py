@@ -1,4 +1,91 @@
+import threading
+
+from cryptex.pool import RequestPool, gather
+
+# guards the creation of the shared pool of an exchange
+_POOL_LOCK = threading.Lock()
+
+# How get_my_trades and get_my_transactions page through the history of an
+# account, see cryptex.ledger.Ledger.
+# from_id selects the rows from that (integer) id on, oldest first
+PAGE_BY_ID = 'id'
+# get_my_trade_page and get_my_transaction_page return a HistoryPage of the
+# rows between since and until, the server selects whole days and sends
+# the newest rows first
+PAGE_BY_DATE = 'date'
+# the whole history comes with a single request
+UNPAGED = 'unpaged'
+
+
+class BatchResult(object):
+    '''
+    Outcome of one request of a batch, see Exchange.place_orders
+
+    :param request: what was requested, e.g. an order id to cancel
+    :param result: what the request returned, None if it failed
+    :param error: the exception the request failed with, None if it
+        succeeded
+    '''
+    __slots__ = ('request', 'result', 'error')
+
+    def __init__(self, request, result=None, error=None):
+        self.request = request
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return '<BatchResult %r: %r>' % (self.request, self.result)
+        return '<BatchResult %r failed: %r>' % (self.request, self.error)
+
+
+class HistoryPage(object):
+    '''
+    Trades or transactions of one request of an exchange that pages by
+    date, see PAGE_BY_DATE
+
+    :param rows: the rows between since and until, newest first
+    :param truncated: whether the server sent as many rows as were asked
+        for, so older rows of the range may be missing
+    :param oldest: datetime of the oldest row the server sent, which may be
+        outside of since and until, None if it sent none
+    :param oldest_day: start of the day of oldest in the timezone of the
+        server
+    '''
+    __slots__ = ('rows', 'truncated', 'oldest', 'oldest_day')
+
+    def __init__(self, rows, truncated=False, oldest=None, oldest_day=None):
+        self.rows = rows
+        self.truncated = truncated
+        self.oldest = oldest
+        self.oldest_day = oldest_day
+
+    def __repr__(self):
+        return '<HistoryPage of %d rows%s>' % (
+            len(self.rows), ', truncated' if self.truncated else '')
+
+
 class Exchange(object):
+    """
+    An exchange instance can be shared by several threads: nonces, the
+    transport and the scheduler are thread-safe, and lazily fetched data
+    (market ids, the server timezone) is fetched once by the first thread
+    that needs it while the others wait for it.
+    """
+    # cryptex.pool.RequestPool behind submit and map, created with
+    # POOL_SIZE workers on first use unless the exchange was given one
+    pool = None
+    POOL_SIZE = 8
+
+    # paging of get_my_trades and get_my_transactions, one of PAGE_BY_ID,
+    # PAGE_BY_DATE and UNPAGED
+    TRADE_PAGING = UNPAGED
+    TRANSACTION_PAGING = UNPAGED
+
     def get_markets(self):
         """
         Returns a list of tuples of the form ('XXX', 'YYY') representing the 
@@ -14,10 +101,10 @@ class Exchange(object):
         """
         raise NotImplementedError
 
-    def get_my_trades(self):
+    def get_my_trades(self, since=None):
         """
         Returns a list of exchanges.trade.Trade that represent all the user's 
-        trades.
+        trades, or only those at or after the datetime since.
         """
         raise NotImplementedError
 
@@ -34,7 +121,26 @@ class Exchange(object):
     def sell(self, market, quantity, price):
         raise NotImplementedError
 
-    def get_my_transactions(self, limit=None):
+    def get_my_transactions(self, limit=None, since=None):
+        """
+        Returns a list of cryptex.transaction.Transaction, only those at or
+        after the datetime since if given.
+        """
+        raise NotImplementedError
+
+    def get_my_trade_page(self, limit, since=None, until=None):
+        """
+        Returns a HistoryPage of at most limit trades at or after the
+        datetime since and before the datetime until, for exchanges with
+        TRADE_PAGING PAGE_BY_DATE.
+        """
+        raise NotImplementedError
+
+    def get_my_transaction_page(self, limit, since=None, until=None):
+        """
+        Like get_my_trade_page, for exchanges with TRANSACTION_PAGING
+        PAGE_BY_DATE.
+        """
         raise NotImplementedError
 
     def get_my_funds(self):
@@ -42,3 +148,112 @@ class Exchange(object):
         Returns a dict that represent all the user's funds (not on orders) as {'CURRENCY': Decimal(<Value>), ...}.
         """
         raise NotImplementedError
+
+    def get_ticker(self, markets):
+        """
+        Returns {(base, counter): cryptex.ticker.Ticker} for the given
+        markets, fetched with as few requests as the exchange allows.
+        Markets the exchange does not know are left out.
+        """
+        raise NotImplementedError
+
+    def get_order_book(self, market, depth=None):
+        """
+        Returns a cryptex.orderbook.OrderBook of market with at most depth
+        levels per side.
+        """
+        raise NotImplementedError
+
+    def get_recent_trades(self, market):
+        """
+        Returns a list of cryptex.trade.PublicTrade, the latest trades of
+        all users in market.
+        """
+        raise NotImplementedError
+
+    # Number of requests of a batch that are in flight at once, further
+    # limited by the scheduler of the exchange, if any
+    BATCH_IN_FLIGHT = 4
+
+    def _run_batch(self, calls, max_in_flight=None):
+        """
+        Runs (request, function, args) calls concurrently and returns a
+        BatchResult per call, in order.
+        """
+        if not calls:
+            return []
+        pool = RequestPool(min(max_in_flight or self.BATCH_IN_FLIGHT,
+                               len(calls)))
+        try:
+            outcomes = gather([pool.submit(function, *args)
+                               for _, function, args in calls],
+                              return_exceptions=True)
+        finally:
+            pool.shutdown(wait=False)
+        return [BatchResult(request, error=outcome)
+                if isinstance(outcome, Exception)
+                else BatchResult(request, result=outcome)
+                for (request, _, _), outcome in zip(calls, outcomes)]
+
+    def _place_order(self, side, market, quantity, price):
+        if side == 'buy':
+            return self.buy(market, quantity, price)
+        if side == 'sell':
+            return self.sell(market, quantity, price)
+        raise ValueError('Unknown side %r' % side)
+
+    def place_orders(self, orders, max_in_flight=None):
+        """
+        Places several orders concurrently. orders is a list of
+        (side, market, quantity, price) tuples with side 'buy' or 'sell'.
+
+        Returns a BatchResult per order, in order, with the id of the new
+        order as result. Failed orders don't stop the others.
+        """
+        return self._run_batch(
+            [(order, self._place_order, tuple(order)) for order in orders],
+            max_in_flight)
+
+    def cancel_orders(self, order_ids, max_in_flight=None):
+        """
+        Cancels several orders concurrently. Returns a BatchResult per
+        order id, in order.
+        """
+        return self._run_batch(
+            [(order_id, self.cancel_order, (order_id,))
+             for order_id in order_ids],
+            max_in_flight)
+
+    def cancel_all(self, market=None, max_in_flight=None):
+        """
+        Cancels all open orders, or those of market only. Returns a
+        BatchResult per cancelled order id.
+        """
+        orders = self.get_my_open_orders()
+        if market is not None:
+            market = tuple(market)
+            orders = [o for o in orders
+                      if (o.base_currency, o.counter_currency) == market]
+        return self.cancel_orders([o.order_id for o in orders],
+                                  max_in_flight)
+
+    def _get_pool(self):
+        if self.pool is None:
+            with _POOL_LOCK:
+                if self.pool is None:
+                    self.pool = RequestPool(self.POOL_SIZE)
+        return self.pool
+
+    def submit(self, name, *args, **kwargs):
+        """
+        Calls the method name on the pool of the exchange and returns a
+        cryptex.pool.Future of its result.
+        """
+        return self._get_pool().submit(getattr(self, name), *args, **kwargs)
+
+    def map(self, name, *iterables):
+        """
+        Calls the method name once per set of arguments, concurrently on the
+        pool of the exchange, and returns the results in order.
+        """
+        return self._get_pool().map(getattr(self, name), *iterables)
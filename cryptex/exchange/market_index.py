@@ -0,0 +1,66 @@
+import os
+import json
+import time
+
+
+class MarketIndex(object):
+    '''
+    Bidirectional mapping between exchange market ids and
+    (base_currency, counter_currency) pairs with constant time lookups
+    '''
+    def __init__(self, markets=(), updated=None):
+        '''
+        :param markets: iterable of (market_id, (base, counter))
+        :param updated: unix time the markets were fetched
+        '''
+        self.by_id = {}
+        self.by_pair = {}
+        for market_id, pair in markets:
+            pair = tuple(pair)
+            self.by_id[market_id] = pair
+            self.by_pair[pair] = market_id
+        self.updated = time.time() if updated is None else updated
+
+    def __contains__(self, market_id):
+        return market_id in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get_pair(self, market_id):
+        return self.by_id[market_id]
+
+    def get_id(self, pair):
+        return self.by_pair[tuple(pair)]
+
+    def pairs(self):
+        return list(self.by_id.values())
+
+    def age(self):
+        return time.time() - self.updated
+
+    def save(self, path):
+        '''
+        Writes the index to path, atomically replacing an older copy
+        '''
+        tmp_path = '%s.tmp' % path
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'updated': self.updated,
+                'markets': [[market_id, list(pair)]
+                            for market_id, pair in self.by_id.items()],
+            }, f)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Reads an index written by save, returns None if there is no usable
+        file at path
+        '''
+        try:
+            with open(path) as f:
+                content = json.load(f)
+            return cls(content['markets'], content['updated'])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
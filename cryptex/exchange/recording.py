@@ -0,0 +1,298 @@
+'''
+Recording of API traffic to segment files, and replaying it.
+
+>>> transport = RecordingTransport(SessionTransport(), 'traffic/')
+>>> exchange = BTCE(key, secret, transport=transport)
+...
+>>> exchange = BTCE(key, secret, transport=ReplayTransport('traffic/'))
+
+A segment is a file that starts with MAGIC, followed by frames that are
+appended as responses arrive. It is rolled over once it reaches
+segment_size bytes. Every frame is
+
+    FRAME.pack(meta length, body length)
+    meta    json of [verb, url, params, time, status code]
+    body    zlib compressed response body
+
+so a reader can index the requests of a memory-mapped segment without
+decompressing or copying the responses. The nonce of signed requests is
+recorded, their headers, which hold the key and signature, are not.
+'''
+import os
+import json
+import time
+import mmap
+import zlib
+import struct
+import threading
+
+from cryptex.exchange.transport import Transport, FakeResponse
+
+MAGIC = b'CXREC1\n'
+FRAME = struct.Struct('>II')
+SEGMENT_PREFIX = 'traffic-'
+SEGMENT_SUFFIX = '.rec'
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+# parameters that differ between otherwise equal requests, they are not
+# matched on replay
+VOLATILE_PARAMS = frozenset(['nonce'])
+
+
+class Frame(object):
+    '''
+    One recorded request and its response, whose body stays in the segment
+    until content is read
+    '''
+    __slots__ = ('verb', 'url', 'params', 'time', 'status_code', '_data',
+                 '_start', '_end')
+
+    def __init__(self, verb, url, params, time, status_code, data, start,
+                 end):
+        self.verb = verb
+        self.url = url
+        self.params = params
+        self.time = time
+        self.status_code = status_code
+        self._data = data
+        self._start = start
+        self._end = end
+
+    @property
+    def content(self):
+        '''
+        The response body, decompressed on every access
+        '''
+        return zlib.decompress(self._data[self._start:self._end])
+
+    def route(self):
+        return _route(self.verb, self.url, self.params)
+
+    def __repr__(self):
+        return '<Frame %s %s %r>' % (self.verb, self.url, self.params)
+
+
+def _route(verb, url, params):
+    return (verb, url, tuple(sorted(
+        (key, u'%s' % value) for key, value in (params or {}).items()
+        if key not in VOLATILE_PARAMS)))
+
+
+def segment_paths(directory):
+    '''
+    Segment files in directory, oldest first
+    '''
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(SEGMENT_PREFIX) and
+                   name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _segment_number(path):
+    name = os.path.basename(path)
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+class _RecordedStream(object):
+    '''
+    Response of a streamed request that records its body once it was read.
+    A reader that stops early, e.g. at the end of the json object, makes it
+    download the rest, so the recorded body is complete.
+    '''
+    def __init__(self, response, record):
+        self.response = response
+        self.status_code = response.status_code
+        self._record = record
+
+    def iter_content(self, chunk_size=1):
+        chunks = []
+        content = self.response.iter_content(chunk_size)
+        try:
+            for chunk in content:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            chunks.extend(content)
+            self._record(b''.join(chunks))
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+class RecordingTransport(Transport):
+    '''
+    Passes requests on to transport and appends every response to the
+    current segment in directory. Thread-safe if transport is.
+
+    :param segment_size: bytes after which a new segment is started
+    :param level: zlib compression level of the response bodies
+    '''
+    def __init__(self, transport, directory, segment_size=SEGMENT_SIZE,
+                 level=6, clock=time.time):
+        self.transport = transport
+        self.directory = directory
+        self.segment_size = segment_size
+        self.level = level
+        self.clock = clock
+        self._file = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        paths = segment_paths(directory)
+        # never append to a segment of an earlier recording
+        self._number = _segment_number(paths[-1]) if paths else 0
+
+    def _open_segment(self):
+        self._number += 1
+        path = os.path.join(self.directory, '%s%06d%s' % (
+            SEGMENT_PREFIX, self._number, SEGMENT_SUFFIX))
+        self._file = open(path, 'ab')
+        self._file.write(MAGIC)
+        self._file.flush()
+
+    def record(self, verb, url, params, status_code, content):
+        '''
+        Appends a frame to the current segment
+        '''
+        meta = json.dumps([verb, url, params or {}, self.clock(),
+                           status_code], default=str).encode('utf-8')
+        body = zlib.compress(content, self.level)
+        frame = FRAME.pack(len(meta), len(body)) + meta + body
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.segment_size:
+                if self._file is not None:
+                    self._file.close()
+                self._open_segment()
+            # one write per frame, so a crash leaves at most the last frame
+            # incomplete, which readers skip
+            self._file.write(frame)
+            self._file.flush()
+
+    def get(self, url, params=None, stream=False):
+        r = self.transport.get(url, params=params, stream=stream)
+        if stream:
+            return _RecordedStream(r, lambda content: self.record(
+                'GET', url, params, r.status_code, content))
+        self.record('GET', url, params, r.status_code, r.content)
+        return r
+
+    def post(self, url, data=None, headers=None):
+        r = self.transport.post(url, data=data, headers=headers)
+        self.record('POST', url, data, r.status_code, r.content)
+        return r
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.transport.close()
+
+
+class Segment(object):
+    '''
+    Read-only memory map of a segment file; frames are sliced from the map
+    and only their meta is decoded
+    '''
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if size else b''
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('Not a recorded segment: %s' % path)
+
+    def __iter__(self):
+        data = self._map
+        offset = len(MAGIC)
+        end = len(data)
+        header = FRAME.size
+        while offset + header <= end:
+            meta_size, body_size = FRAME.unpack_from(data, offset)
+            start = offset + header
+            offset = start + meta_size + body_size
+            if offset > end:
+                # the recorder was stopped while writing this frame
+                break
+            meta = json.loads(data[start:start + meta_size].decode('utf-8'))
+            verb, url, params, timestamp, status_code = meta
+            yield Frame(verb, url, params, timestamp, status_code, data,
+                        start + meta_size, offset)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+def iter_frames(directory):
+    '''
+    Yields the frames of all segments in directory in recording order,
+    e.g. to parse days of recorded market data offline. The content of a
+    frame can be read until the iteration moves on to the next segment.
+    '''
+    for path in segment_paths(directory):
+        segment = Segment(path)
+        try:
+            for frame in segment:
+                yield frame
+        finally:
+            segment.close()
+
+
+class ReplayTransport(Transport):
+    '''
+    Serves the responses recorded in directory without touching the network
+    or waiting.
+
+    Requests are matched by verb, url and params, leaving out
+    VOLATILE_PARAMS. Equal requests get the recorded responses in the order
+    they were recorded; once those are used up the last one is served again
+    if repeat is true, otherwise LookupError is raised like FakeTransport
+    does for unknown requests. Thread-safe.
+    '''
+    def __init__(self, directory, repeat=False):
+        self.repeat = repeat
+        self.segments = [Segment(path)
+                         for path in segment_paths(directory)]
+        self.frames = {}
+        for segment in self.segments:
+            for frame in segment:
+                self.frames.setdefault(frame.route(), []).append(frame)
+        self._served = {}
+        self._lock = threading.Lock()
+
+    def _respond(self, verb, url, params):
+        route = _route(verb, url, params)
+        with self._lock:
+            frames = self.frames.get(route)
+            if not frames:
+                raise LookupError('No recorded response for %s %s %r'
+                                  % (verb, url, params))
+            index = self._served.get(route, 0)
+            if index >= len(frames):
+                if not self.repeat:
+                    raise LookupError('Recorded responses for %s %s %r '
+                                      'used up' % (verb, url, params))
+                index = len(frames) - 1
+            self._served[route] = index + 1
+        frame = frames[index]
+        return FakeResponse(frame.content, frame.status_code)
+
+    def get(self, url, params=None, stream=False):
+        return self._respond('GET', url, params)
+
+    def post(self, url, data=None, headers=None):
+        return self._respond('POST', url, data)
+
+    def rewind(self):
+        '''
+        Serves the recorded responses from the start again
+        '''
+        with self._lock:
+            self._served.clear()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
@@ -0,0 +1,408 @@
+'''
+Paper trading against an in-memory matching engine.
+
+>>> exchange = SimulatedExchange(funds={'BTC': '10'})
+>>> exchange.seed(('LTC', 'BTC'), OrderBook.from_btce_depth(depth))
+>>> order_id = exchange.buy(('LTC', 'BTC'), '5', '0.0250')
+>>> exchange.get_my_trades()[0]
+
+Orders are matched by price-time priority against the seeded depth and the
+account's own resting orders. A trade executes at the price of the resting
+order, the part of an order that does not fill rests in the book until it is
+cancelled or matched. Seeded liquidity that is taken stays taken until the
+market is seeded again.
+
+Amounts are integers of 1e-8 units internally (see cryptex.fixedpoint) and
+are returned in the numeric mode of the exchange, as Buy, Sell, BuyOrder and
+SellOrder like the real clients return them.
+'''
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+
+from cryptex import fixedpoint
+from cryptex.fixedpoint import DECIMAL, Units, to_fixed
+from cryptex.exception import APIException
+from cryptex.exchange import Exchange
+from cryptex.exchange.exchange import PAGE_BY_ID
+from cryptex.trade import Buy, Sell, PublicTrade
+from cryptex.order import BuyOrder, SellOrder
+from cryptex.orderbook import OrderBook
+from cryptex.ticker import Ticker
+from cryptex.batch import TradeBatch, OrderBatch
+from cryptex.transaction import Deposit
+from cryptex.timestamp import utc_from_timestamp
+
+# trades kept for get_recent_trades per market
+RECENT_TRADES = 150
+
+
+class _Side(object):
+    '''
+    Resting orders of one side of a market: a FIFO queue of
+    [order id, remaining units, reserved units] per price level and a heap
+    of the level keys, best first. Cancelled orders are zeroed in place and
+    dropped when they reach the front of their queue.
+    '''
+    __slots__ = ('levels', 'keys', 'descending')
+
+    def __init__(self, descending):
+        self.levels = {}
+        self.keys = []
+        self.descending = descending
+
+    def add(self, price, entry):
+        queue = self.levels.get(price)
+        if queue is None:
+            queue = self.levels[price] = deque()
+            heapq.heappush(self.keys, -price if self.descending else price)
+        queue.append(entry)
+
+    def best_price(self):
+        '''
+        Price of the best level with volume, dropping emptied levels
+        '''
+        keys = self.keys
+        while keys:
+            price = -keys[0] if self.descending else keys[0]
+            queue = self.levels[price]
+            while queue and not queue[0][1]:
+                queue.popleft()
+            if queue:
+                return price
+            heapq.heappop(keys)
+            del self.levels[price]
+        return None
+
+    def depth(self, limit=None):
+        '''
+        [(price, amount)] best first, in units
+        '''
+        prices = sorted(self.levels, reverse=self.descending)
+        levels = []
+        for price in prices:
+            amount = sum(entry[1] for entry in self.levels[price])
+            if amount:
+                levels.append((price, amount))
+                if limit is not None and len(levels) == limit:
+                    break
+        return levels
+
+
+class _Market(object):
+    __slots__ = ('bids', 'asks', 'last', 'recent')
+
+    def __init__(self):
+        self.bids = _Side(descending=True)
+        self.asks = _Side(descending=False)
+        self.last = None
+        self.recent = deque(maxlen=RECENT_TRADES)
+
+
+class SimulatedExchange(Exchange):
+    '''
+    :param funds: {currency: amount} the account starts with
+    :param fee: fraction of every trade that is paid as fee, in the
+        currency received like on BTC-e
+    :param numeric: cryptex.fixedpoint.FIXED to get amounts as integers of
+        1e-8 units instead of Decimal
+    :param clock: source of the times of orders and trades
+    '''
+    TRADE_PAGING = PAGE_BY_ID
+    TRANSACTION_PAGING = PAGE_BY_ID
+
+    def __init__(self, funds=None, fee='0.002', numeric=DECIMAL,
+                 clock=time.time):
+        self.numeric = numeric
+        self.fee = to_fixed(fee)
+        self.clock = clock
+        self.markets = {}
+        self._available = {}
+        # order id -> (order class, market, time, price, entry)
+        self._orders = {}
+        # (trade class, trade id, market, time, order id, amount, price, fee)
+        self._trades = []
+        self._transactions = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        for currency, amount in (funds or {}).items():
+            self.deposit(currency, amount)
+
+    def _out(self, units):
+        if self.numeric == DECIMAL:
+            return fixedpoint.to_decimal(units)
+        return Units(units)
+
+    def seed(self, market, book=None):
+        '''
+        Replaces the liquidity of market, which is created if needed, with
+        the levels of a cryptex.orderbook.OrderBook. The account's resting
+        orders are kept.
+        '''
+        market = tuple(market)
+        with self._lock:
+            old = self.markets.get(market)
+            state = self.markets[market] = _Market()
+            if book is not None:
+                # seeded orders have no id and reserve no funds
+                for side, levels in ((state.bids, book.bids),
+                                     (state.asks, book.asks)):
+                    for price, amount in levels:
+                        side.add(to_fixed(price), [None, to_fixed(amount), 0])
+            if old is not None:
+                state.last = old.last
+                state.recent = old.recent
+                # in the order they were placed
+                for order_id in sorted(self._orders):
+                    order_type, order_market, _, price, entry = \
+                        self._orders[order_id]
+                    if order_market == market:
+                        side = state.bids if order_type is BuyOrder \
+                            else state.asks
+                        side.add(price, entry)
+
+    def deposit(self, currency, amount):
+        '''
+        Adds amount to the available funds of currency
+        '''
+        currency = currency.upper()
+        units = to_fixed(amount)
+        with self._lock:
+            self._available[currency] = \
+                self._available.get(currency, 0) + units
+            transaction_id = next(self._ids)
+            self._transactions.append((transaction_id, self.clock(),
+                                       currency, units))
+
+    def _take(self, currency, units):
+        available = self._available.get(currency, 0)
+        if units > available:
+            raise APIException('Insufficient funds')
+        self._available[currency] = available - units
+
+    def _credit(self, currency, units):
+        self._available[currency] = self._available.get(currency, 0) + units
+
+    def _fill(self, market, is_buy, entry, limit, price, fill, now):
+        '''
+        Books a fill of fill units at price for the order of entry, which
+        is the incoming order or one of the account's resting orders, with
+        limit price limit
+        '''
+        base, counter = market
+        fee = fixedpoint.multiply(fill if is_buy else
+                                  fixedpoint.multiply(fill, price), self.fee)
+        if is_buy:
+            # funds were reserved at the limit price, the last fill
+            # releases what is left so rounding does not leak
+            released = entry[2] if fill == entry[1] \
+                else fixedpoint.multiply(fill, limit)
+            entry[2] -= released
+            self._credit(counter, released - fixedpoint.multiply(fill, price))
+            self._credit(base, fill - fee)
+            trade_type = Buy
+        else:
+            entry[2] -= fill
+            self._credit(counter, fixedpoint.multiply(fill, price) - fee)
+            trade_type = Sell
+        entry[1] -= fill
+        self._trades.append((trade_type, next(self._ids), market, now,
+                             entry[0], fill, price, fee))
+
+    def _place(self, is_buy, market, quantity, price):
+        market = tuple(market)
+        amount = to_fixed(quantity)
+        price = to_fixed(price)
+        if amount <= 0 or price <= 0:
+            raise APIException('Invalid amount or price')
+        base, counter = market
+        with self._lock:
+            state = self.markets.get(market)
+            if state is None:
+                raise APIException('Market not found')
+            if is_buy:
+                reserved = fixedpoint.multiply(amount, price)
+                self._take(counter, reserved)
+                own, book = state.bids, state.asks
+            else:
+                reserved = amount
+                self._take(base, reserved)
+                own, book = state.asks, state.bids
+            order_id = next(self._ids)
+            now = self.clock()
+            entry = [order_id, amount, reserved]
+            order_type = BuyOrder if is_buy else SellOrder
+            self._orders[order_id] = (order_type, market, now, price, entry)
+
+            while entry[1]:
+                best = book.best_price()
+                if best is None or (best > price if is_buy else best < price):
+                    break
+                queue = book.levels[best]
+                while entry[1] and queue:
+                    resting = queue[0]
+                    fill = min(entry[1], resting[1])
+                    if fill:
+                        self._fill(market, is_buy, entry, price, best, fill,
+                                   now)
+                        if resting[0] is None:
+                            resting[1] -= fill
+                        else:
+                            self._fill(market, not is_buy, resting, best,
+                                       best, fill, now)
+                        state.last = best
+                        state.recent.append((next(self._ids), now,
+                                             'buy' if is_buy else 'sell',
+                                             fill, best))
+                    if not resting[1]:
+                        queue.popleft()
+                        if fill and resting[0] is not None:
+                            del self._orders[resting[0]]
+
+            if entry[1]:
+                own.add(price, entry)
+            else:
+                del self._orders[order_id]
+        return order_id
+
+    def buy(self, market, quantity, price):
+        return self._place(True, market, quantity, price)
+
+    def sell(self, market, quantity, price):
+        return self._place(False, market, quantity, price)
+
+    def cancel_order(self, order_id):
+        with self._lock:
+            try:
+                order_type, market, _, _, entry = self._orders.pop(order_id)
+            except KeyError:
+                raise APIException('Order not found')
+            base, counter = market
+            self._credit(counter if order_type is BuyOrder else base,
+                         entry[2])
+            # dropped from its queue when it reaches the front
+            entry[1] = entry[2] = 0
+        return None
+
+    def get_markets(self):
+        return list(self.markets)
+
+    def get_my_funds(self):
+        with self._lock:
+            return dict((currency, self._out(units))
+                        for currency, units in self._available.items())
+
+    def get_my_open_orders(self, market=None, columnar=False):
+        '''
+        :param columnar: return a cryptex.batch.OrderBatch instead of a list
+        '''
+        out = self._out
+        # entries are changed by matching, so they are read under the lock
+        with self._lock:
+            rows = [(order_type, order_id, m[0], m[1], t, entry[1], price)
+                    for order_id, (order_type, m, t, price, entry)
+                    in sorted(self._orders.items())
+                    if market is None or m == tuple(market)]
+        rows = [(order_type, order_id, base, counter, utc_from_timestamp(t),
+                 out(remaining), out(price))
+                for order_type, order_id, base, counter, t, remaining, price
+                in rows]
+        if columnar:
+            return OrderBatch(rows)
+        return [row[0](*row[1:]) for row in rows]
+
+    def get_my_trades(self, limit=None, since=None, columnar=False,
+                      from_id=None):
+        '''
+        Newest first, or oldest first from since or from_id on like BTC-e,
+        so limit does not skip trades after them
+
+        :param columnar: return a cryptex.batch.TradeBatch instead of a list
+        :param from_id: only trades with this id or a higher one
+        '''
+        with self._lock:
+            trades = list(self._trades)
+        if since is not None:
+            trades = [t for t in trades if utc_from_timestamp(t[3]) >= since]
+        if from_id is not None:
+            trades = [t for t in trades if t[1] >= from_id]
+        if since is None and from_id is None:
+            trades.reverse()
+        if limit is not None:
+            trades = trades[:limit]
+        out = self._out
+        rows = [(trade_type, trade_id, market[0], market[1],
+                 utc_from_timestamp(t), order_id, out(amount), out(price),
+                 out(fee), market[0] if trade_type is Buy else market[1])
+                for trade_type, trade_id, market, t, order_id, amount, price,
+                fee in trades]
+        if columnar:
+            return TradeBatch(rows)
+        return [row[0](*row[1:]) for row in rows]
+
+    def get_my_transactions(self, limit=None, since=None, from_id=None):
+        '''
+        Newest first, or oldest first from since or from_id on like
+        get_my_trades
+        '''
+        with self._lock:
+            transactions = list(self._transactions)
+        transactions = [Deposit(transaction_id, utc_from_timestamp(t),
+                                currency, self._out(units), '', self._out(0))
+                        for transaction_id, t, currency, units in transactions]
+        if since is not None:
+            transactions = [t for t in transactions if t.datetime >= since]
+        if from_id is not None:
+            transactions = [t for t in transactions
+                            if t.transaction_id >= from_id]
+        if since is None and from_id is None:
+            transactions.reverse()
+        if limit is not None:
+            transactions = transactions[:limit]
+        return transactions
+
+    def _get_market(self, market):
+        state = self.markets.get(tuple(market))
+        if state is None:
+            raise APIException('Market not found')
+        return state
+
+    def get_ticker(self, markets):
+        tickers = {}
+        out = self._out
+        with self._lock:
+            for market in markets:
+                market = tuple(market)
+                state = self.markets.get(market)
+                if state is None:
+                    continue
+                bid = state.bids.best_price()
+                ask = state.asks.best_price()
+                tickers[market] = Ticker(
+                    market[0], market[1], utc_from_timestamp(self.clock()),
+                    None if state.last is None else out(state.last),
+                    None if bid is None else out(bid),
+                    None if ask is None else out(ask))
+        return tickers
+
+    def get_order_book(self, market, depth=None):
+        to_decimal = fixedpoint.to_decimal
+        with self._lock:
+            state = self._get_market(market)
+            bids = state.bids.depth(depth)
+            asks = state.asks.depth(depth)
+        return OrderBook(
+            [(to_decimal(p), to_decimal(a)) for p, a in bids],
+            [(to_decimal(p), to_decimal(a)) for p, a in asks])
+
+    def get_recent_trades(self, market):
+        market = tuple(market)
+        out = self._out
+        with self._lock:
+            recent = list(self._get_market(market).recent)
+        return [PublicTrade(trade_id, market[0], market[1],
+                            utc_from_timestamp(t), side, out(amount),
+                            out(price))
+                for trade_id, t, side, amount, price in reversed(recent)]
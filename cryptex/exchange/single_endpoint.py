@@ -1,25 +1,247 @@
-import time
-import hmac
-from hashlib import sha512
-from urllib import urlencode
+import json
+import threading
 from urlparse import urljoin
 from decimal import Decimal
+from timeit import default_timer as clock
 
-import requests
+from cryptex.exception import APIException, InvalidResponseException
+from cryptex.exchange.transport import SessionTransport
+from cryptex.exchange.auth import NonceGenerator, Signer
+from cryptex.exchange.streaming import iter_members, UnexpectedResponse
+from cryptex.ratelimit import NORMAL
+from cryptex import fixedpoint
+from cryptex.retry import NO_RETRY
+from cryptex.instrument import (REQUEST_TIME, DECODE_TIME, PAYLOAD_BYTES,
+                                ERRORS, RETRIES)
 
-from cryptex.exception import APIException
+STREAM_CHUNK_SIZE = 64 * 1024
 
-class SingleEndpoint(object):
+# guards the creation of default transports, nonce generators and signers,
+# so threads sharing an endpoint end up with the same ones
+_DEFAULTS_LOCK = threading.Lock()
+
+class Endpoint(object):
+    '''
+    Base for endpoints, owns the transport used to talk to the exchange
+
+    Subclasses define API_ENDPOINT, which can be overridden per instance to
+    talk to a stand-in server (see benchmarks/).
+    '''
+    transport = None
+    # cryptex.ratelimit.RequestScheduler pacing the requests, if any
+    scheduler = None
+    # Priority of API methods when waiting for the scheduler, methods not
+    # listed have priority cryptex.ratelimit.NORMAL
+    REQUEST_PRIORITIES = {}
+    # Representation of amounts, prices and fees: cryptex.fixedpoint.DECIMAL
+    # for Decimal, or cryptex.fixedpoint.FIXED for integers of 1e-8 units
+    numeric = fixedpoint.DECIMAL
+    # Recorder of timings, payload sizes and errors, see cryptex.instrument
+    instrumentation = None
+    # cryptex.retry.RetryPolicy for idempotent requests, None sends every
+    # request once and waits for the transport
+    retry_policy = None
+    # cryptex.retry.CircuitBreaker that fails requests fast while the
+    # exchange is down, if any
+    circuit_breaker = None
+
+    def _get_parse_float(self):
+        if self.numeric == fixedpoint.FIXED:
+            return fixedpoint.parse
+        return Decimal
+
+    def _to_amount(self, value):
+        '''
+        Amount, price or fee from a response in the numeric mode of the
+        endpoint
+        '''
+        if self.numeric == fixedpoint.FIXED:
+            return fixedpoint.to_fixed(value)
+        if isinstance(value, Decimal):
+            return value
+        return Decimal(value)
+
+    def _to_param(self, value):
+        '''
+        Amount or price for the parameters of a request, fixed-point
+        amounts are sent as Decimal so they count coins again
+        '''
+        if isinstance(value, fixedpoint.Units):
+            return fixedpoint.to_decimal(value)
+        return value
+
+    def _record(self, api_method, metric, value):
+        if self.instrumentation is not None:
+            self.instrumentation.record(api_method, metric, value)
+
+    def _timed(self, api_method, metric, function, *args):
+        '''
+        function(*args), recording how long it took as metric
+        '''
+        if self.instrumentation is None:
+            return function(*args)
+        start = clock()
+        result = function(*args)
+        self.instrumentation.record(api_method, metric, clock() - start)
+        return result
+
+    @staticmethod
+    def _decode(r, parse_float):
+        try:
+            return r.json(parse_float=parse_float)
+        except ValueError as e:
+            # e.g. an html error page of a proxy, worth another attempt
+            raise InvalidResponseException('Response is not json: %s' % e)
+
+    def _request_json(self, api_method, parse_float, request, *args, **kwargs):
+        '''
+        Decoded json response of request(*args, **kwargs)
+        '''
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._decode(request(*args, **kwargs), parse_float)
+        start = clock()
+        try:
+            r = request(*args, **kwargs)
+            received = clock()
+            content = self._decode(r, parse_float)
+        except Exception:
+            instrumentation.record(api_method, ERRORS, 1)
+            raise
+        decoded = clock()
+        instrumentation.record(api_method, REQUEST_TIME, received - start)
+        instrumentation.record(api_method, DECODE_TIME, decoded - received)
+        instrumentation.record(api_method, PAYLOAD_BYTES, len(r.content))
+        return content
+
+    def _guarded(self, budget, api_method, function, args, idempotent=True,
+                 hedge=True):
+        '''
+        function(*args) under the circuit breaker and, if the request is
+        idempotent, the retry policy. Every attempt waits for the scheduler
+        in the calling thread first, so waiting is neither timed out nor
+        hedged and is not taken for a failure of the exchange.
+        '''
+        if self.retry_policy is None and self.circuit_breaker is None:
+            self._throttle(budget, api_method)
+            return function(*args)
+        policy = self.retry_policy if idempotent else None
+        return (policy or NO_RETRY).call(
+            lambda: function(*args), self.circuit_breaker,
+            on_retry=lambda: self._record(api_method, RETRIES, 1),
+            key=api_method, hedge=hedge,
+            before_attempt=lambda: self._throttle(budget, api_method))
+
+    def _count_bytes(self, api_method, chunks):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            # also when the caller stops reading early
+            self._record(api_method, PAYLOAD_BYTES, size)
+
+    def _throttle(self, budget, api_method):
+        if self.scheduler is not None:
+            self.scheduler.throttle(
+                budget, self.REQUEST_PRIORITIES.get(api_method, NORMAL))
+
+    def _get_transport(self):
+        if self.transport is None:
+            with _DEFAULTS_LOCK:
+                if self.transport is None:
+                    self.transport = SessionTransport()
+        return self.transport
+
+class SingleEndpoint(Endpoint):
     ''' Simple enpoint for performing any kind of get request '''
+    # cryptex.cache.ResponseCache shared by all get requests, if any
+    cache = None
+    # Time to live of cached responses per API method
+    CACHE_TTLS = {}
+
+    @staticmethod
+    def _get_api_method(method, params):
+        '''
+        Name of the API method, used to look up its cache time to live and
+        its priority
+        '''
+        return params.get('method') or method.split('/')[0]
+
     def perform_get_request(self, method='', params={}):
-        request_url = type(self).API_ENDPOINT
+        if self.cache is None:
+            return self._perform_get_request(method, params)
+
+        api_method = self._get_api_method(method, params)
+        ttl = self.cache.ttl_for(api_method, self.CACHE_TTLS.get(api_method))
+        if not ttl:
+            return self._perform_get_request(method, params)
+        key = (self.API_ENDPOINT, method, tuple(sorted(params.items())))
+        return self.cache.get(
+            key, lambda: self._perform_get_request(method, params), ttl)
+
+    def _get_request_url(self, method):
+        request_url = self.API_ENDPOINT
         if method:
             if not request_url.endswith('/'):
                 request_url += '/'
             request_url = urljoin(request_url, method)
-        r = requests.get(request_url, params=params)
-        content = r.json(parse_float=Decimal)
+        return request_url
+
+    def _get_json(self, api_method, method, params):
+        return self._request_json(api_method, Decimal,
+                                  self._get_transport().get,
+                                  self._get_request_url(method),
+                                  params=params)
+
+    def _perform_get_request(self, method, params):
+        api_method = self._get_api_method(method, params)
+        content = self._guarded('public', api_method, self._get_json,
+                                (api_method, method, params))
+        try:
+            return self._get_content(content)
+        except APIException:
+            self._record(api_method, ERRORS, 1)
+            raise
+
+    def stream_get_request(self, method='', params={}, path=('return',),
+                           scalars=False):
+        '''
+        Like perform_get_request, but yields (key, raw json text) for each
+        member of the object at path while the response is downloaded, see
+        cryptex.exchange.streaming. Responses are not cached.
 
+        :param scalars: also yield members that are no objects or arrays
+        '''
+        api_method = self._get_api_method(method, params)
+        # only opening the response is retried, not reading it
+        r = self._guarded('public', api_method, self._open_stream,
+                          (api_method, method, params), hedge=False)
+        chunks = r.iter_content(STREAM_CHUNK_SIZE)
+        if self.instrumentation is not None:
+            chunks = self._count_bytes(api_method, chunks)
+        try:
+            for member in iter_members(chunks, path, scalars):
+                yield member
+        except UnexpectedResponse as e:
+            self._record(api_method, ERRORS, 1)
+            self._get_content(json.loads(e.args[0], parse_float=Decimal))
+            raise APIException('Unexpected response')
+
+    def _open_stream(self, api_method, method, params):
+        start = clock()
+        try:
+            r = self._get_transport().get(self._get_request_url(method),
+                                          params=params, stream=True)
+        except Exception:
+            self._record(api_method, ERRORS, 1)
+            raise
+        self._record(api_method, REQUEST_TIME, clock() - start)
+        return r
+
+    @staticmethod
+    def _get_content(content):
         if not content:
             raise APIException('Empty response')
 
@@ -31,36 +253,87 @@ class SingleEndpoint(object):
         else:
             return content
 
-class SignedSingleEndpoint(object):
+class SignedSingleEndpoint(Endpoint):
     """
     BTC-e and Cryptsy both employ the same API auth scheme and format.  There 
     exists a single endpoint. Different actions are performed by passing a 
     "method" parameter.  All requests are POST. All reponses are json, 
     returing an object with keys "success" and "return" (if successful).
+
+    Nonces come from a NonceGenerator, so several requests per second and
+    requests from several threads get distinct nonces. Exchanges reject a
+    nonce that arrives after a larger one; such requests were not executed,
+    so they are signed again with a fresh nonce up to NONCE_RETRIES times.
     """
+    # cryptex.exchange.auth.NonceGenerator and Signer, created on first use
+    # if the exchange did not set them
+    nonce_generator = None
+    signer = None
+    NONCE_RESOLUTION = 1000
+    NONCE_MAXIMUM = None
+    NONCE_RETRIES = 2
+    # API methods that must not be sent twice, so they are never retried,
+    # hedged or timed out by the retry policy
+    NON_IDEMPOTENT_METHODS = frozenset()
+
+    def _get_nonce_generator(self):
+        if self.nonce_generator is None:
+            with _DEFAULTS_LOCK:
+                if self.nonce_generator is None:
+                    self.nonce_generator = NonceGenerator(
+                        resolution=self.NONCE_RESOLUTION,
+                        maximum=self.NONCE_MAXIMUM)
+        return self.nonce_generator
+
+    def _get_signer(self):
+        if self.signer is None:
+            with _DEFAULTS_LOCK:
+                if self.signer is None:
+                    self.signer = Signer(self.secret)
+        return self.signer
+
     def get_request_params(self, method, data):
+        # urllib pulls in socket and ssl, it is imported on the first signed
+        # request instead of with the module
+        from urllib import urlencode
         payload = {
             'method': method,
-            'nonce': int(time.time())
+            'nonce': self._get_nonce_generator().next_nonce()
         }
         payload.update(data)
-        signature = hmac.new(self.secret, urlencode(payload), 
-            sha512).hexdigest()
-        
+        signature = self._get_signer().sign(urlencode(payload))
+
         headers = {
             'Sign': signature, 
             'Key': self.key
         }
         return (payload, headers)
 
-    def perform_request(self, method, data={}):
+    @staticmethod
+    def _is_nonce_error(error):
+        return 'nonce' in unicode(error).lower()
+
+    def _post_signed(self, method, data):
         payload, headers = self.get_request_params(method, data)
-        r = requests.post(type(self).API_ENDPOINT, data=payload, headers=headers)
-        content = r.json(parse_float=Decimal)
+        return self._request_json(method, self._get_parse_float(),
+                                  self._get_transport().post,
+                                  self.API_ENDPOINT, data=payload,
+                                  headers=headers)
+
+    def perform_request(self, method, data={}):
+        idempotent = method not in self.NON_IDEMPOTENT_METHODS
+        for attempt in range(self.NONCE_RETRIES + 1):
+            content = self._guarded('private', method, self._post_signed,
+                                    (method, data), idempotent)
 
-        # Cryptsy returns success as a string, BTC-e as a int
-        if int(content['success']) != 1:
-            raise APIException(content['error'])
+            # Cryptsy returns success as a string, BTC-e as a int
+            if int(content['success']) == 1:
+                break
+            self._record(method, ERRORS, 1)
+            if (attempt == self.NONCE_RETRIES or
+                    not self._is_nonce_error(content['error'])):
+                raise APIException(content['error'])
+            self._record(method, RETRIES, 1)
 
         # Cryptsy's createorder response is stupidly broken
         if method == 'createorder':
@@ -0,0 +1,179 @@
+'''
+Incremental decoding of large json responses.
+
+Only the structure of the response is scanned while it is downloaded. The
+members of the object at a given path (e.g. every market in
+{"return": {"markets": {...}}}) are cut out as raw json text one at a time,
+so they can be decoded as soon as they arrive, or only when they are needed.
+'''
+import re
+import json
+from decimal import Decimal
+
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+_WHITESPACE = re.compile(r'\s*')
+# everything up to the next bracket, skipping complete strings
+_SKIP = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.S)
+
+
+class UnexpectedResponse(Exception):
+    pass
+
+
+class _Scanner(object):
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        # offset of the first character that must be kept in the buffer,
+        # None while everything is kept
+        self.keep = None
+        # number of characters dropped from the buffer by the last fill
+        self.dropped = 0
+
+    def fill(self):
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            self.dropped = self.keep or 0
+            if self.dropped:
+                self.buf = self.buf[self.dropped:]
+                self.pos -= self.dropped
+                self.keep = 0
+            self.buf += chunk
+            return True
+        return False
+
+
+def iter_members(chunks, path, scalars=False):
+    '''
+    Yields (key, raw json text) for every member of the object at path, in
+    the order they appear. Members whose values are not objects or arrays
+    are skipped, unless scalars is true.
+
+    If there is no object at path, UnexpectedResponse is raised with the
+    whole response text as its argument, so the caller can report errors the
+    exchange returned instead.
+
+    :param chunks: iterable of str chunks of the response
+    :param path: keys leading to the object, e.g. ('return', 'markets')
+    '''
+    scanner = _Scanner(chunks)
+    path = list(path)
+    target_depth = len(path) + 1
+    # one [opening character, name, last key] per open container
+    stack = []
+    found = False
+    member_key = None
+    value_start = None
+
+    while True:
+        buf = scanner.buf
+        if len(stack) > target_depth:
+            # inside a member value, only brackets matter
+            scanner.pos = _SKIP.match(buf, scanner.pos).end()
+        match = _STRUCTURE.search(buf, scanner.pos)
+        if match is None:
+            scanner.pos = len(buf)
+            if not scanner.fill():
+                break
+            if value_start is not None:
+                value_start -= scanner.dropped
+            continue
+        char = match.group()
+        start = match.start()
+
+        if char == '"':
+            end = _STRING_END.match(buf, start + 1)
+            colon = end and _WHITESPACE.match(buf, end.end()).end()
+            if end is None or colon == len(buf):
+                # the string or what follows it is not downloaded yet
+                scanner.pos = start
+                if not scanner.fill():
+                    break
+                if value_start is not None:
+                    value_start -= scanner.dropped
+                continue
+            scanner.pos = end.end()
+            if buf[colon] == ':' and stack and len(stack) <= target_depth:
+                key = json.loads(buf[start:end.end()])
+                stack[-1][2] = key
+                if found and len(stack) == target_depth:
+                    if scalars and value_start is not None:
+                        # the previous value was no object or array
+                        yield member_key, \
+                            buf[value_start:start].rstrip().rstrip(',').strip()
+                    member_key = key
+                    value_start = colon + 1
+                    scanner.keep = value_start
+        elif char in '{[':
+            name = None
+            if stack and stack[-1][0] == '{':
+                name = stack[-1][2]
+            stack.append([char, name, None])
+            scanner.pos = start + 1
+            if (not found and char == '{' and len(stack) == target_depth and
+                    [name for _, name, _ in stack[1:]] == path):
+                found = True
+                scanner.keep = scanner.pos
+        else:
+            stack.pop()
+            scanner.pos = start + 1
+            if found:
+                if len(stack) == target_depth and value_start is not None:
+                    yield member_key, buf[value_start:start + 1]
+                    value_start = None
+                    scanner.keep = scanner.pos
+                elif len(stack) < target_depth:
+                    if scalars and value_start is not None:
+                        yield member_key, buf[value_start:start].strip()
+                    return
+
+    if not found:
+        raise UnexpectedResponse(scanner.buf)
+
+
+def decode(raw):
+    return json.loads(raw, parse_float=Decimal)
+
+
+class LazyMapping(object):
+    '''
+    Read-only mapping of raw json members that are decoded, and passed
+    through convert, on first access only
+    '''
+    def __init__(self, raw_members, convert=None):
+        self._raw = raw_members
+        self._decoded = {}
+        self._convert = convert
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            value = decode(self._raw[key])
+            if self._convert is not None:
+                value = self._convert(value)
+            self._decoded[key] = value
+            return value
+
+    def get(self, key, default=None):
+        if key not in self._raw:
+            return default
+        return self[key]
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def keys(self):
+        return list(self._raw)
+
+    def items(self):
+        return [(key, self[key]) for key in self._raw]
@@ -0,0 +1,116 @@
+import json
+
+
+class Transport(object):
+    '''
+    Performs the HTTP requests of an endpoint. An exchange instance owns one
+    transport, which may be shared with the other endpoints of the same
+    exchange (e.g. BTCE and its BTCEPublic).
+    '''
+    def get(self, url, params=None, stream=False):
+        '''
+        :param stream: return before the body is downloaded, the response
+            must then provide iter_content(chunk_size)
+        '''
+        raise NotImplementedError
+
+    def post(self, url, data=None, headers=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SessionTransport(Transport):
+    '''
+    Pooled keep-alive transport backed by a requests.Session
+
+    :param pool_size: maximum number of connections kept open per host
+    :param timeout: seconds (or a (connect, read) tuple) to wait for the
+        server, None waits forever
+    :param gzip: negotiate compressed responses
+    '''
+    def __init__(self, pool_size=10, timeout=10, gzip=True):
+        # requests is imported by the first transport, not by cryptex
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if gzip:
+            self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        else:
+            self.session.headers['Accept-Encoding'] = 'identity'
+
+    def get(self, url, params=None, stream=False):
+        return self.session.get(url, params=params, timeout=self.timeout,
+                                stream=stream)
+
+    def post(self, url, data=None, headers=None):
+        return self.session.post(url, data=data, headers=headers,
+                                 timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class FakeResponse(object):
+    '''
+    Minimal stand-in for requests.Response
+    '''
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class FakeTransport(Transport):
+    '''
+    Serves canned responses without touching the network.
+
+    Responses are registered per route, which is the "method" parameter of
+    the request if there is one (e.g. 'getmarkets' or 'marketdatav2') and the
+    full url otherwise (e.g. 'https://btc-e.com/api/3/ticker/btc_usd').
+    Every request is appended to self.requests as (verb, url, params).
+    '''
+    def __init__(self, responses=None):
+        self.responses = {}
+        self.requests = []
+        for route, content in (responses or {}).items():
+            self.add_response(route, content)
+
+    def add_response(self, route, content):
+        '''
+        :param content: raw response body, or an object that is serialized
+            to json
+        '''
+        if not isinstance(content, (str, bytes, type(u''))):
+            content = json.dumps(content)
+        self.responses[route] = content
+
+    def _respond(self, verb, url, params):
+        params = params or {}
+        self.requests.append((verb, url, params))
+        route = params.get('method', url)
+        if route not in self.responses:
+            route = url
+        try:
+            return FakeResponse(self.responses[route])
+        except KeyError:
+            raise LookupError('No fake response for %r' % route)
+
+    def get(self, url, params=None, stream=False):
+        return self._respond('GET', url, params)
+
+    def post(self, url, data=None, headers=None):
+        return self._respond('POST', url, data)
@@ -0,0 +1,85 @@
+'''
+Fixed-point amounts: integers counting units of 1e-8, the precision of
+cryptex.common.DECIMAL_PRECISION.
+
+Endpoints created with numeric=FIXED decode the private API with parse() and
+fill Trade, Order and Transaction amounts, prices and fees with such
+integers. Arithmetic on them is plain integer arithmetic; to_decimal()
+converts back without loss.
+'''
+import decimal
+
+DECIMAL = 'decimal'
+FIXED = 'fixed'
+
+PLACES = 8
+SCALE = 10 ** PLACES
+
+_CONTEXT = decimal.Context(prec=60, rounding=decimal.ROUND_DOWN,
+                           traps=[decimal.InvalidOperation])
+
+try:
+    _integer = long
+except NameError:
+    _integer = int
+
+
+class Units(_integer):
+    '''
+    Integer decoded from a json number with a fraction or exponent. Keeps
+    decoded amounts apart from json integers, which count whole coins.
+    '''
+    __slots__ = ()
+
+
+def _parse(text):
+    if 'e' in text or 'E' in text:
+        return to_fixed(decimal.Decimal(text))
+    negative = text.startswith('-')
+    if negative:
+        text = text[1:]
+    whole, _, fraction = text.partition('.')
+    # digits beyond PLACES are rounded down, like cryptex.common.quantize
+    units = int(whole or '0') * SCALE + int((fraction + '0' * PLACES)[:PLACES])
+    return -units if negative else units
+
+
+def parse(text):
+    '''
+    parse_float hook for json decoding
+    '''
+    return Units(_parse(text))
+
+
+def to_fixed(value):
+    '''
+    Units of value, which may be a Decimal, a numeric string, a float, an
+    integer number of coins or already Units
+    '''
+    if isinstance(value, Units):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return Units(value.scaleb(PLACES, _CONTEXT).to_integral_value(
+            decimal.ROUND_DOWN, _CONTEXT))
+    if isinstance(value, float):
+        return Units(_parse(repr(value)))
+    if isinstance(value, (int, _integer)):
+        return Units(value * SCALE)
+    return Units(_parse(value.strip()))
+
+
+def to_decimal(units):
+    '''
+    Exact Decimal of units
+    '''
+    return decimal.Decimal(units).scaleb(-PLACES, _CONTEXT)
+
+
+def multiply(a, b):
+    '''
+    Product of two fixed-point values as Units, rounded towards zero
+    '''
+    product = a * b
+    if product < 0:
+        return Units(-(-product // SCALE))
+    return Units(product // SCALE)
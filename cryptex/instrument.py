@@ -0,0 +1,118 @@
+'''
+Instrumentation of the requests made by the exchanges.
+
+Endpoints report metrics to their `instrumentation`, an object with a
+record(api_method, metric, value) method. It is None by default, which
+costs a single attribute check per request.
+
+>>> registry = HistogramRegistry()
+>>> exchange = BTCE(key, secret, instrumentation=registry)
+>>> exchange.get_my_trades()
+>>> registry.snapshot()[('TradeHistory', DECODE_TIME)]['mean']
+'''
+import math
+import threading
+
+# seconds until the response was downloaded
+REQUEST_TIME = 'request_time'
+# seconds spent decoding the json response
+DECODE_TIME = 'decode_time'
+# seconds spent converting exchange timestamps to datetimes
+TIMESTAMP_TIME = 'timestamp_time'
+# seconds spent building Trade, Order, ... objects from the response
+FORMAT_TIME = 'format_time'
+# size of the response body in bytes
+PAYLOAD_BYTES = 'payload_bytes'
+# 1 per failed request, whether the transport or the exchange failed
+ERRORS = 'errors'
+# 1 per request that is repeated after a failure
+RETRIES = 'retries'
+
+
+class CallbackInstrumentation(object):
+    '''
+    Passes every metric to callback(api_method, metric, value)
+    '''
+    def __init__(self, callback):
+        self.record = callback
+
+
+class Histogram(object):
+    '''
+    Count, sum, extremes and power of two buckets of the recorded values
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        # exponent -> number of values in [2 ** (exponent - 1), 2 ** exponent)
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        exponent = math.frexp(value)[1]
+        self.buckets[exponent] = self.buckets.get(exponent, 0) + 1
+
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / float(self.count)
+
+    def percentile(self, fraction):
+        '''
+        Upper estimate of the value below which fraction of the values lie
+        '''
+        if not self.count:
+            return None
+        remaining = fraction * self.count
+        for exponent in sorted(self.buckets):
+            remaining -= self.buckets[exponent]
+            if remaining <= 0:
+                return min(math.ldexp(1, exponent), self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean(),
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+        }
+
+
+class HistogramRegistry(object):
+    '''
+    Thread-safe in-memory Histogram per (api_method, metric)
+    '''
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_method, metric, value):
+        key = (api_method, metric)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(value)
+
+    def snapshot(self):
+        '''
+        {(api_method, metric): Histogram.as_dict()}
+        '''
+        with self._lock:
+            return dict((key, histogram.as_dict())
+                        for key, histogram in self.histograms.items())
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
@@ -0,0 +1,361 @@
+import calendar
+import datetime
+import sqlite3
+import threading
+import warnings
+from decimal import Decimal
+
+import pytz
+
+import cryptex.common as common
+from cryptex.exchange.exchange import PAGE_BY_ID, PAGE_BY_DATE
+from cryptex.trade import Buy, Sell
+from cryptex.transaction import Transaction, Deposit, Withdrawal
+
+TRADE_TYPES = {cls.trade_type: cls for cls in (Buy, Sell)}
+TRANSACTION_TYPES = {cls.transaction_type: cls
+                     for cls in (Transaction, Deposit, Withdrawal)}
+
+ONE_SECOND = datetime.timedelta(seconds=1)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS trades (
+    exchange TEXT NOT NULL,
+    trade_id TEXT NOT NULL,
+    trade_type INTEGER NOT NULL,
+    base_currency TEXT NOT NULL,
+    counter_currency TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    order_id TEXT,
+    amount TEXT NOT NULL,
+    price TEXT NOT NULL,
+    fee TEXT,
+    fee_currency TEXT,
+    PRIMARY KEY (exchange, trade_id)
+);
+CREATE INDEX IF NOT EXISTS trades_market_time
+    ON trades (exchange, base_currency, counter_currency, time);
+CREATE INDEX IF NOT EXISTS trades_time ON trades (exchange, time);
+CREATE TABLE IF NOT EXISTS transactions (
+    exchange TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    transaction_type INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    address TEXT,
+    fee TEXT,
+    PRIMARY KEY (exchange, transaction_id)
+);
+CREATE INDEX IF NOT EXISTS transactions_currency_time
+    ON transactions (exchange, currency, time);
+CREATE TABLE IF NOT EXISTS backfills (
+    exchange TEXT NOT NULL,
+    history TEXT NOT NULL,
+    floor INTEGER,
+    PRIMARY KEY (exchange, history)
+);
+'''
+
+
+def _to_timestamp(dt):
+    return calendar.timegm(dt.utctimetuple())
+
+
+def _from_timestamp(timestamp):
+    return pytz.utc.localize(datetime.datetime.utcfromtimestamp(timestamp))
+
+
+def _to_text(value):
+    return None if value is None else str(value)
+
+
+def _amount_to_text(value):
+    # fixed-point amounts are stored as their Decimal text as well
+    return None if value is None else str(common.as_decimal(value))
+
+
+def _to_decimal(value):
+    return None if value is None else Decimal(value)
+
+
+class Ledger(object):
+    '''
+    Local SQLite copy of the trade and transaction history of an exchange.
+
+    sync() only asks the exchange for what happened after the newest stored
+    trade and transaction, queries are answered from the local indexes. How
+    the history is paged depends on the exchange, see
+    cryptex.exchange.exchange.PAGE_BY_ID:
+
+    - by id, it is read oldest first from the id after the highest stored
+      one, so the first sync reads the whole history
+    - by date, it is read newest first down to the newest stored row. Once
+      the history was read back to its beginning, or to floor, older rows
+      are not asked for again; until then every sync goes on reading back
+      from the oldest stored row, so an interrupted first sync is resumed.
+      A day with more rows than a page can't be paged through, the rows of
+      that day that don't fit are skipped with a warning.
+
+    >>> ledger = Ledger('history.db', exchange)
+    >>> ledger.sync()
+    >>> ledger.get_trades(market=('LTC', 'BTC'), start=last_week)
+
+    :param path: sqlite database file, several exchanges can share one
+    :param exchange: cryptex.exchange.Exchange to sync from
+    :param name: key of the exchange in the database, defaults to the class
+        name of the exchange
+    :param floor: datetime before which the history of exchanges that page
+        by date is not read
+    '''
+    def __init__(self, path, exchange, name=None, floor=None):
+        self.exchange = exchange
+        self.name = name or type(exchange).__name__
+        self.floor = floor
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _latest(self, table):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MAX(time) FROM %s WHERE exchange = ?' % table,
+                (self.name,)).fetchone()
+        return None if row[0] is None else _from_timestamp(row[0])
+
+    def _oldest(self, table):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MIN(time) FROM %s WHERE exchange = ?' % table,
+                (self.name,)).fetchone()
+        return None if row[0] is None else _from_timestamp(row[0])
+
+    def _is_backfilled(self, table):
+        '''
+        Whether the history was read back to its beginning, or to floor
+        '''
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT floor FROM backfills WHERE exchange = ? '
+                'AND history = ?', (self.name, table)).fetchone()
+        if row is None:
+            return False
+        return row[0] is None or (self.floor is not None and
+                                  row[0] <= _to_timestamp(self.floor))
+
+    def _set_backfilled(self, table):
+        floor = None if self.floor is None else _to_timestamp(self.floor)
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO backfills VALUES (?, ?, ?)',
+                (self.name, table, floor))
+
+    def _next_id(self, table, column):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MAX(CAST(%s AS INTEGER)) FROM %s WHERE exchange = ?'
+                % (column, table), (self.name,)).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def sync(self, page_size=1000):
+        '''
+        Fetches new trades and transactions, returns the number of new
+        (trades, transactions).
+        '''
+        return self.sync_trades(page_size), self.sync_transactions(page_size)
+
+    def sync_trades(self, page_size=1000):
+        with self._lock:
+            return self._sync('trades', 'trade_id',
+                              self.exchange.TRADE_PAGING,
+                              self.exchange.get_my_trades,
+                              self.exchange.get_my_trade_page,
+                              self.add_trades, page_size)
+
+    def sync_transactions(self, page_size=1000):
+        with self._lock:
+            return self._sync('transactions', 'transaction_id',
+                              self.exchange.TRANSACTION_PAGING,
+                              self.exchange.get_my_transactions,
+                              self.exchange.get_my_transaction_page,
+                              self.add_transactions, page_size)
+
+    def _sync(self, table, column, paging, fetch, fetch_page, add,
+              page_size):
+        if paging == PAGE_BY_ID:
+            return self._sync_by_id(table, column, fetch, add, page_size)
+        if paging == PAGE_BY_DATE:
+            return self._sync_by_date(table, fetch_page, add, page_size)
+        return add(fetch())
+
+    def _sync_by_id(self, table, column, fetch, add, page_size):
+        total = 0
+        from_id = self._next_id(table, column)
+        while True:
+            rows = fetch(limit=page_size, from_id=from_id)
+            total += add(rows)
+            if len(rows) < page_size:
+                return total
+            last_id = max(int(getattr(row, column)) for row in rows)
+            if last_id < from_id:
+                # the exchange did not move past the cursor
+                return total
+            from_id = last_id + 1
+
+    def _sync_by_date(self, table, fetch_page, add, page_size):
+        total = 0
+        latest = self._latest(table)
+        if latest is not None:
+            # stored together, so an interrupted sync leaves no gap behind
+            # the newest stored row
+            total += add([row for rows in self._pages_back(
+                fetch_page, page_size, latest, None) for row in rows])
+        if not self._is_backfilled(table):
+            oldest = self._oldest(table)
+            until = None if oldest is None else oldest + ONE_SECOND
+            for rows in self._pages_back(fetch_page, page_size, self.floor,
+                                         until):
+                total += add(rows)
+            self._set_backfilled(table)
+        return total
+
+    def _pages_back(self, fetch_page, page_size, since, until):
+        '''
+        Yields the rows at or after since and before until, newest first, a
+        page at a time
+        '''
+        previous = None
+        while since is None or until is None or until > since:
+            page = fetch_page(page_size, since=since, until=until)
+            yield page.rows
+            if not page.truncated or (since is not None and
+                                      page.oldest < since):
+                return
+            if previous is not None and page.oldest >= previous:
+                # the page is filled by rows of a single day that were
+                # read already, the server can't be asked for older ones
+                warnings.warn('Skipping rows of %s older than %s on the same '
+                              'day, the day holds more than %d'
+                              % (self.name, page.oldest, page_size))
+                previous = None
+                until = page.oldest_day
+                continue
+            previous = page.oldest
+            # the rows of the second of the oldest one are read again, a
+            # second may hold more rows than were sent
+            until = page.oldest + ONE_SECOND
+
+    def add_trades(self, trades):
+        '''
+        Stores trades, ignoring those already known. Returns the number of
+        new trades.
+        '''
+        with self._lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO trades VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(self.name, str(t.trade_id), t.trade_type, t.base_currency,
+                  t.counter_currency, _to_timestamp(t.datetime),
+                  _to_text(t.order_id), _amount_to_text(t.amount),
+                  _amount_to_text(t.price), _amount_to_text(t.fee),
+                  t.fee_currency)
+                 for t in trades])
+            return self.connection.total_changes - before
+
+    def add_transactions(self, transactions):
+        '''
+        Stores transactions, ignoring those already known. Returns the number
+        of new transactions.
+        '''
+        with self._lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO transactions VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?)',
+                [(self.name, str(t.transaction_id), t.transaction_type,
+                  _to_timestamp(t.datetime), t.currency,
+                  _amount_to_text(t.amount), t.address,
+                  _amount_to_text(t.fee))
+                 for t in transactions])
+            return self.connection.total_changes - before
+
+    @staticmethod
+    def _where(conditions, start, end):
+        clauses = ['%s = ?' % column for column, _ in conditions]
+        params = [value for _, value in conditions]
+        if start is not None:
+            clauses.append('time >= ?')
+            params.append(_to_timestamp(start))
+        if end is not None:
+            clauses.append('time < ?')
+            params.append(_to_timestamp(end))
+        return ' AND '.join(clauses), params
+
+    def get_trades(self, market=None, start=None, end=None):
+        '''
+        Stored trades, oldest first
+
+        :param market: (base_currency, counter_currency) tuple
+        :param start: only trades at or after this datetime
+        :param end: only trades before this datetime
+        '''
+        conditions = [('exchange', self.name)]
+        if market is not None:
+            conditions.append(('base_currency', market[0]))
+            conditions.append(('counter_currency', market[1]))
+        where, params = self._where(conditions, start, end)
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT trade_id, trade_type, base_currency, counter_currency, '
+                'time, order_id, amount, price, fee, fee_currency FROM trades '
+                'WHERE %s ORDER BY time, trade_id' % where, params).fetchall()
+        return [
+            TRADE_TYPES[trade_type](
+                trade_id=trade_id,
+                base_currency=base,
+                counter_currency=counter,
+                datetime=_from_timestamp(time),
+                order_id=order_id,
+                amount=Decimal(amount),
+                price=Decimal(price),
+                fee=_to_decimal(fee),
+                fee_currency=fee_currency,
+            )
+            for (trade_id, trade_type, base, counter, time, order_id,
+                 amount, price, fee, fee_currency) in rows
+        ]
+
+    def get_transactions(self, currency=None, start=None, end=None):
+        '''
+        Stored transactions, oldest first
+
+        :param currency: only transactions of this currency
+        :param start: only transactions at or after this datetime
+        :param end: only transactions before this datetime
+        '''
+        conditions = [('exchange', self.name)]
+        if currency is not None:
+            conditions.append(('currency', currency))
+        where, params = self._where(conditions, start, end)
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT transaction_id, transaction_type, time, currency, '
+                'amount, address, fee FROM transactions '
+                'WHERE %s ORDER BY time, transaction_id' % where,
+                params).fetchall()
+        return [
+            TRANSACTION_TYPES[transaction_type](
+                transaction_id,
+                _from_timestamp(time),
+                currency,
+                Decimal(amount),
+                address,
+                _to_decimal(fee),
+            )
+            for (transaction_id, transaction_type, time, currency, amount,
+                 address, fee) in rows
+        ]
@@ -2,6 +2,8 @@ class Order(object):
     '''
     Basic order
     '''
+    __slots__ = ('order_id', 'base_currency', 'counter_currency', 'datetime',
+                 'amount', 'price')
     order_type = 0
     def __init__(self, order_id, base_currency, counter_currency,
                 datetime, amount, price):
@@ -15,11 +17,16 @@ class Order(object):
     def type(self):
         return self.__class__.__name__
 
+    def as_dict(self):
+        return {name: getattr(self, name) for name in Order.__slots__}
+
     def __str__(self):
-        return repr(self.__dict__)
+        return repr(self.as_dict())
 
 class BuyOrder(Order):
+    __slots__ = ()
     order_type = 1
 
 class SellOrder(Order):
+    __slots__ = ()
     order_type = 2
@@ -0,0 +1,224 @@
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+
+
+def _collapse(levels):
+    '''
+    {price: amount} of (price, amount) levels, adding up the amounts of a
+    price that is listed several times (Cryptsy lists single orders) and
+    leaving out empty levels
+    '''
+    collapsed = {}
+    for price, amount in levels:
+        price = Decimal(price)
+        collapsed[price] = collapsed.get(price, 0) + Decimal(amount)
+    return dict((p, a) for p, a in collapsed.items() if a)
+
+
+class BookSide(object):
+    '''
+    One side of an order book as parallel arrays of prices and amounts,
+    best price first. Cumulative amounts and totals are kept alongside and
+    recomputed lazily from the first changed level, so fill queries are
+    binary searches.
+    '''
+    def __init__(self, levels=(), descending=False):
+        self.descending = descending
+        self._load(_collapse(levels))
+
+    def _load(self, levels):
+        '''
+        Replaces the side with the levels of a {price: amount} dict
+        '''
+        levels = sorted(levels.items())
+        if self.descending:
+            levels.reverse()
+        self.prices = [p for p, _ in levels]
+        self.amounts = [a for _, a in levels]
+        self._keys = [self._key(p) for p in self.prices]
+        self._cumulative_amounts = []
+        self._cumulative_totals = []
+        self._valid = 0
+
+    def _key(self, price):
+        return -price if self.descending else price
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        return iter(zip(self.prices, self.amounts))
+
+    def best(self):
+        '''
+        (price, amount) of the best level, None if the side is empty
+        '''
+        if not self.prices:
+            return None
+        return self.prices[0], self.amounts[0]
+
+    def set(self, price, amount):
+        '''
+        Sets the amount at a price level, an amount of 0 removes the level
+        '''
+        price = Decimal(price)
+        amount = Decimal(amount)
+        key = self._key(price)
+        i = bisect_left(self._keys, key)
+        exists = i < len(self._keys) and self._keys[i] == key
+        if exists:
+            if amount:
+                self.amounts[i] = amount
+            else:
+                del self.prices[i], self.amounts[i], self._keys[i]
+        elif amount:
+            self.prices.insert(i, price)
+            self.amounts.insert(i, amount)
+            self._keys.insert(i, key)
+        else:
+            return
+        self._valid = min(self._valid, i)
+
+    def merge(self, levels):
+        '''
+        Replaces the side with a new snapshot, only touching the levels that
+        changed. Returns the number of changed levels.
+        '''
+        new = _collapse(levels)
+        changes = [(p, 0) for p in self.prices if p not in new]
+        current = dict(zip(self.prices, self.amounts))
+        changes.extend((p, a) for p, a in new.items() if current.get(p) != a)
+        if len(changes) > len(new) // 2:
+            # cheaper to rebuild than to insert level by level
+            self._load(new)
+        else:
+            for price, amount in changes:
+                self.set(price, amount)
+        return len(changes)
+
+    def _cumulate(self):
+        amounts = self._cumulative_amounts
+        totals = self._cumulative_totals
+        del amounts[self._valid:], totals[self._valid:]
+        amount = amounts[-1] if amounts else Decimal(0)
+        total = totals[-1] if totals else Decimal(0)
+        for i in range(self._valid, len(self.prices)):
+            amount += self.amounts[i]
+            total += self.amounts[i] * self.prices[i]
+            amounts.append(amount)
+            totals.append(total)
+        self._valid = len(self.prices)
+
+    def total_amount(self):
+        self._cumulate()
+        return self._cumulative_amounts[-1] if self.prices else Decimal(0)
+
+    def amount_within(self, price):
+        '''
+        Cumulative amount offered at prices equal to or better than price
+        '''
+        self._cumulate()
+        i = bisect_right(self._keys, self._key(Decimal(price)))
+        return self._cumulative_amounts[i - 1] if i else Decimal(0)
+
+    def cost(self, amount):
+        '''
+        Total (in counter currency) of filling amount against this side,
+        raises ValueError if the side is not deep enough
+        '''
+        amount = Decimal(amount)
+        self._cumulate()
+        i = bisect_left(self._cumulative_amounts, amount)
+        if i == len(self.prices):
+            raise ValueError('Not enough depth to fill %s' % amount)
+        if i == 0:
+            return amount * self.prices[0]
+        return (self._cumulative_totals[i - 1] +
+                (amount - self._cumulative_amounts[i - 1]) * self.prices[i])
+
+    def vwap(self, amount):
+        '''
+        Volume weighted average price of filling amount against this side
+        '''
+        return self.cost(amount) / Decimal(amount)
+
+
+class OrderBook(object):
+    '''
+    Sorted in-memory order book.
+
+    Levels are (price, amount) pairs, bids are kept highest price first and
+    asks lowest price first.
+
+    >>> book = OrderBook.from_btce_depth(btce.public.get_depth('ltc_btc')['ltc_btc'])
+    >>> book.best_ask()
+    (Decimal('0.02311'), Decimal('1.2'))
+    >>> book.asks.vwap(10)
+    Decimal('0.023172')
+    '''
+    def __init__(self, bids=(), asks=()):
+        self.bids = BookSide(bids, descending=True)
+        self.asks = BookSide(asks)
+
+    @classmethod
+    def from_btce_depth(cls, depth):
+        '''
+        From the depth of one pair as returned by BTCEPublic.get_depth
+        '''
+        return cls(depth['bids'], depth['asks'])
+
+    @staticmethod
+    def _cryptsy_levels(orders, price_key):
+        return [(o.get('price', o.get(price_key)), o['quantity'])
+                for o in orders or ()]
+
+    @classmethod
+    def from_cryptsy_orders(cls, orders):
+        '''
+        From Cryptsy.get_market_orders or one market of
+        CryptsyPublic.get_order_data
+        '''
+        return cls(cls._cryptsy_levels(orders['buyorders'], 'buyprice'),
+                   cls._cryptsy_levels(orders['sellorders'], 'sellprice'))
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    def cost_to_buy(self, amount):
+        return self.asks.cost(amount)
+
+    def proceeds_of_sell(self, amount):
+        return self.bids.cost(amount)
+
+    def update(self, bids=(), asks=()):
+        '''
+        Applies incremental (price, amount) changes, an amount of 0 removes
+        the level
+        '''
+        for price, amount in bids:
+            self.bids.set(price, amount)
+        for price, amount in asks:
+            self.asks.set(price, amount)
+
+    def merge(self, bids, asks):
+        '''
+        Merges a new snapshot of both sides, returns the number of changed
+        levels
+        '''
+        return self.bids.merge(bids) + self.asks.merge(asks)
+
+    def merge_btce_depth(self, depth):
+        return self.merge(depth['bids'], depth['asks'])
+
+    def merge_cryptsy_orders(self, orders):
+        return self.merge(
+            self._cryptsy_levels(orders['buyorders'], 'buyprice'),
+            self._cryptsy_levels(orders['sellorders'], 'sellprice'))
@@ -0,0 +1,141 @@
+import sys
+import threading
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+
+class Future(object):
+    '''
+    Result of a call submitted to a RequestPool
+    '''
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        '''
+        Waits for the call to finish and returns its result, re-raising the
+        exception if the call failed.
+        '''
+        if not self._event.wait(timeout):
+            raise RuntimeError('Timed out waiting for result')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._event.wait(timeout):
+            raise RuntimeError('Timed out waiting for result')
+        return self._exception
+
+    def add_done_callback(self, fn):
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class RequestPool(object):
+    '''
+    Bounded pool of worker threads for running API calls concurrently.
+    At most max_workers calls are in flight at any time, further calls are
+    queued. Worker threads are started on demand.
+    '''
+    def __init__(self, max_workers=8):
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self.max_workers = max_workers
+        self._queue = Queue()
+        self._workers = []
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        '''
+        Schedules fn(*args, **kwargs) and returns a Future
+        '''
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Pool has been shut down')
+            self._queue.put((future, fn, args, kwargs))
+            if self._queue.qsize() > self._idle and \
+                    len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work)
+                worker.daemon = True
+                self._workers.append(worker)
+                worker.start()
+        return future
+
+    def map(self, fn, *iterables):
+        '''
+        Like the builtin map, but runs the calls concurrently. Returns the
+        results in order and raises the first exception encountered.
+        '''
+        return gather([self.submit(fn, *args) for args in zip(*iterables)])
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            item = self._queue.get()
+            with self._lock:
+                self._idle -= 1
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception:
+                future.set_exception(sys.exc_info()[1])
+
+
+def gather(futures, return_exceptions=False):
+    '''
+    Waits for all futures and returns their results in order.
+
+    :param return_exceptions: return exceptions in place of results instead
+        of raising the first one
+    '''
+    results = []
+    for future in futures:
+        exception = future.exception()
+        if exception is not None and not return_exceptions:
+            raise exception
+        results.append(exception if exception is not None else future.result())
+    return results
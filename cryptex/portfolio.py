@@ -0,0 +1,118 @@
+'''
+One view of the funds, open orders and markets held on several exchanges.
+
+>>> portfolio = Portfolio({'cryptsy': cryptsy, 'btce': btce})
+>>> snapshot = portfolio.snapshot()
+>>> snapshot.totals['BTC']
+Decimal('1.52300000')
+
+The exchanges are queried concurrently, so a snapshot takes about as long as
+the slowest exchange. An exchange that fails does not fail the snapshot, its
+exception is kept in Snapshot.errors.
+'''
+import cryptex.common as common
+from cryptex.pool import RequestPool, gather
+
+
+class Snapshot(object):
+    '''
+    Consolidated state of the exchanges of a Portfolio
+
+    :ivar balances: {exchange name: {currency: Decimal}}
+    :ivar totals: {currency: Decimal} summed over all exchanges
+    :ivar orders: [(exchange name, cryptex.order.Order)] with Decimal amounts
+        and prices
+    :ivar markets: {(base, counter): [exchange names]}
+    :ivar errors: {(exchange name, method name): exception}
+    '''
+    def __init__(self):
+        self.balances = {}
+        self.totals = {}
+        self.orders = []
+        self.markets = {}
+        self.errors = {}
+
+
+def _normalize_funds(funds):
+    return dict((currency.upper(), common.as_decimal(amount))
+                for currency, amount in funds.items())
+
+
+def _normalize_order(order):
+    amount = common.as_decimal(order.amount)
+    price = common.as_decimal(order.price)
+    if amount is order.amount and price is order.price:
+        return order
+    return type(order)(order.order_id, order.base_currency,
+                       order.counter_currency, order.datetime, amount, price)
+
+
+class Portfolio(object):
+    '''
+    :param exchanges: {name: cryptex.exchange.Exchange}, or a list of
+        exchanges that are then named after their class
+    :param pool: cryptex.pool.RequestPool to run the requests on, by default
+        one with a worker per request of a snapshot
+    '''
+    def __init__(self, exchanges, pool=None):
+        if not isinstance(exchanges, dict):
+            exchanges = dict((type(e).__name__, e) for e in exchanges)
+        self.exchanges = exchanges
+        self.pool = pool
+
+    def _fan_out(self, method_names):
+        '''
+        Calls every method on every exchange concurrently, returns
+        {(exchange name, method name): result or exception}
+        '''
+        calls = [(name, method_name)
+                 for name in sorted(self.exchanges)
+                 for method_name in method_names]
+        pool = self.pool or RequestPool(max(len(calls), 1))
+        try:
+            futures = [pool.submit(getattr(self.exchanges[name], method_name))
+                       for name, method_name in calls]
+            outcomes = gather(futures, return_exceptions=True)
+        finally:
+            if self.pool is None:
+                pool.shutdown(wait=False)
+        return dict(zip(calls, outcomes))
+
+    def snapshot(self, funds=True, orders=True, markets=True):
+        '''
+        Fetches the selected parts of all exchanges concurrently
+        '''
+        method_names = []
+        if funds:
+            method_names.append('get_my_funds')
+        if orders:
+            method_names.append('get_my_open_orders')
+        if markets:
+            method_names.append('get_markets')
+
+        snapshot = Snapshot()
+        for (name, method_name), outcome in sorted(
+                self._fan_out(method_names).items()):
+            if isinstance(outcome, Exception):
+                snapshot.errors[(name, method_name)] = outcome
+            elif method_name == 'get_my_funds':
+                balances = snapshot.balances[name] = _normalize_funds(outcome)
+                for currency, amount in balances.items():
+                    snapshot.totals[currency] = \
+                        snapshot.totals.get(currency, 0) + amount
+            elif method_name == 'get_my_open_orders':
+                snapshot.orders.extend((name, _normalize_order(order))
+                                       for order in outcome)
+            else:
+                for pair in outcome:
+                    snapshot.markets.setdefault(tuple(pair), []).append(name)
+        return snapshot
+
+    def get_balances(self):
+        return self.snapshot(orders=False, markets=False)
+
+    def get_open_orders(self):
+        return self.snapshot(funds=False, markets=False)
+
+    def get_markets(self):
+        return self.snapshot(funds=False, orders=False)
@@ -0,0 +1,144 @@
+import time
+import heapq
+import threading
+import itertools
+from contextlib import contextmanager
+
+from cryptex.exception import RateLimitException
+
+# Request priorities, lower values are served first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+
+class TokenBucket(object):
+    '''
+    Allows `rate` requests per second on average and bursts of up to
+    `capacity` requests. Not thread-safe on its own, RequestScheduler
+    guards it.
+    '''
+    def __init__(self, rate, capacity=None, clock=time.time):
+        self.rate = float(rate)
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.last = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def try_take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        '''
+        Seconds until the next token is available
+        '''
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RequestScheduler(object):
+    '''
+    Paces the requests of one exchange instance with a token bucket for the
+    public and one for the private API. When requests have to wait, those
+    with a higher priority (e.g. placing and cancelling orders) are served
+    before bulk reads.
+
+    :param public: TokenBucket for the public API, None for no limit
+    :param private: TokenBucket for the private API, None for no limit
+    :param timeout: default number of seconds to wait for a token, None
+        waits as long as needed
+    '''
+    def __init__(self, public=None, private=None, timeout=None):
+        self.buckets = {'public': public, 'private': private}
+        self.timeout = timeout
+        self._waiters = {'public': [], 'private': []}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def try_acquire(self, budget, priority=NORMAL):
+        '''
+        Takes a token if one is available right away and no request with
+        a higher or equal priority is waiting. Never blocks.
+        '''
+        bucket = self.buckets[budget]
+        if bucket is None:
+            return True
+        with self._condition:
+            waiters = self._waiters[budget]
+            if waiters and waiters[0][0] <= priority:
+                return False
+            return bucket.try_take()
+
+    def acquire(self, budget, priority=NORMAL, blocking=None, timeout=None):
+        '''
+        Waits for a token of the given budget ('public' or 'private').
+        Returns False if no token could be taken within the timeout, or
+        right away if not blocking.
+
+        :param blocking: defaults to False inside a nonblocking() block and
+            True otherwise
+        '''
+        if blocking is None:
+            blocking = not getattr(self._local, 'nonblocking', False)
+        if not blocking:
+            return self.try_acquire(budget, priority)
+        bucket = self.buckets[budget]
+        if bucket is None:
+            return True
+
+        if timeout is None:
+            timeout = self.timeout
+        deadline = None if timeout is None else time.time() + timeout
+        waiters = self._waiters[budget]
+        waiter = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(waiters, waiter)
+            try:
+                while True:
+                    if waiters[0] == waiter:
+                        if bucket.try_take():
+                            return True
+                        wait = bucket.wait_time()
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                waiters.remove(waiter)
+                heapq.heapify(waiters)
+                self._condition.notify_all()
+
+    @contextmanager
+    def nonblocking(self):
+        '''
+        Within this block requests of the current thread fail with a
+        RateLimitException instead of waiting for a token.
+        '''
+        previous = getattr(self._local, 'nonblocking', False)
+        self._local.nonblocking = True
+        try:
+            yield
+        finally:
+            self._local.nonblocking = previous
+
+    def throttle(self, budget, priority=NORMAL):
+        '''
+        Acquires a token or raises a RateLimitException
+        '''
+        if not self.acquire(budget, priority):
+            raise RateLimitException('Rate limit exceeded')
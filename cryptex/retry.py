@@ -0,0 +1,263 @@
+'''
+Retries, hedged requests and circuit breaking for the requests of an
+endpoint.
+
+>>> policy = RetryPolicy(attempts=3, timeout=5, hedge_percentile=0.95)
+>>> exchange = BTCE(key, secret, retry_policy=policy,
+...                 circuit_breaker=CircuitBreaker())
+
+Only idempotent requests are retried, timed out or hedged: public requests
+and private reads. Requests that place, cancel or withdraw are sent exactly
+once, see SignedSingleEndpoint.NON_IDEMPOTENT_METHODS. A request is retried
+when it fails with one of RETRY_ON, i.e. when the transport failed or the
+response was not json, not when the exchange returned an error.
+'''
+import time
+import random
+import threading
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+from cryptex.exception import (CircuitOpenException, TimeoutException,
+                               InvalidResponseException)
+from cryptex.instrument import Histogram
+from cryptex.pool import RequestPool
+
+# requests.RequestException and socket errors are IOErrors, responses that
+# are not json raise InvalidResponseException. Other errors, e.g. the
+# ValueError of an exhausted nonce generator, fail on every attempt.
+RETRY_ON = (IOError, InvalidResponseException)
+
+# latencies observed per API method before hedge_percentile is used
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitBreaker(object):
+    '''
+    Fails fast with CircuitOpenException once failure_threshold requests in
+    a row failed, for reset_timeout seconds. Then a single trial request is
+    let through, which closes the circuit if it succeeds and opens it again
+    if it fails. Thread-safe.
+    '''
+    def __init__(self, failure_threshold=5, reset_timeout=30,
+                 clock=time.time):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        with self._lock:
+            return self.opened_at is not None
+
+    def before(self):
+        '''
+        Raises CircuitOpenException if no request may be sent now
+        '''
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self._trial or \
+                    self.clock() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenException('Circuit open')
+            self._trial = True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+    def cancel(self):
+        '''
+        The request let through by before() was not sent
+        '''
+        with self._lock:
+            self._trial = False
+
+
+class RetryPolicy(object):
+    '''
+    :param attempts: maximum number of attempts per request
+    :param backoff: seconds to wait before the first retry, doubled for
+        every further retry up to max_backoff
+    :param jitter: fraction of the wait that is randomly left out, so
+        clients that failed together don't retry together
+    :param timeout: seconds after which a request, including its retries,
+        fails with TimeoutException, None waits for the transport
+    :param hedge_after: seconds after which a duplicate of a request that
+        did not complete yet is sent, the first response wins
+    :param hedge_percentile: send the duplicate once a request takes longer
+        than this fraction of the requests of its API method took, e.g.
+        0.95. hedge_after applies until enough requests were observed.
+    :param pool_size: worker threads for timed out and hedged requests
+    '''
+    def __init__(self, attempts=3, backoff=0.1, max_backoff=2.0, jitter=0.5,
+                 timeout=None, hedge_after=None, hedge_percentile=None,
+                 pool_size=16, retry_on=RETRY_ON, clock=time.time,
+                 sleep=time.sleep, random=random.random):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.pool_size = pool_size
+        self.retry_on = retry_on
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random
+        # API method -> Histogram of the seconds successful attempts took
+        self.latencies = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def backoff_delay(self, retry):
+        '''
+        Seconds to wait before retry number retry, counting from 0
+        '''
+        delay = min(self.max_backoff, self.backoff * 2 ** retry)
+        return delay * (1 - self.jitter * self.random())
+
+    def hedge_delay(self, key):
+        '''
+        Seconds after which a duplicate request is sent, None for none
+        '''
+        if self.hedge_percentile is not None:
+            with self._lock:
+                histogram = self.latencies.get(key)
+                if histogram is not None and \
+                        histogram.count >= HEDGE_MIN_SAMPLES:
+                    return histogram.percentile(self.hedge_percentile)
+        return self.hedge_after
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = RequestPool(self.pool_size)
+            return self._pool
+
+    def _observed(self, function, key):
+        start = self.clock()
+        result = function()
+        elapsed = self.clock() - start
+        with self._lock:
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = Histogram()
+            histogram.add(elapsed)
+        return result
+
+    def _attempt(self, function, key, deadline, hedge):
+        '''
+        function() once, or twice concurrently if it is hedged, waiting no
+        longer than until deadline
+        '''
+        delay = self.hedge_delay(key) if hedge else None
+        if delay is None and deadline is None:
+            return self._observed(function, key)
+
+        done = Queue()
+        pool = self._get_pool()
+        pool.submit(self._observed, function, key).add_done_callback(done.put)
+        running = 1
+        hedge_at = None if delay is None else self.clock() + delay
+        while True:
+            until = [t for t in (deadline, hedge_at) if t is not None]
+            try:
+                if until:
+                    future = done.get(
+                        timeout=max(0, min(until) - self.clock()))
+                else:
+                    future = done.get()
+            except Empty:
+                if hedge_at is not None and self.clock() >= hedge_at:
+                    hedge_at = None
+                    pool.submit(self._observed, function, key) \
+                        .add_done_callback(done.put)
+                    running += 1
+                elif deadline is not None and self.clock() >= deadline:
+                    raise TimeoutException('Request timed out')
+                continue
+            running -= 1
+            error = future.exception()
+            if error is None:
+                return future.result()
+            if not running:
+                # not hedged (yet) or both failed, up to the retries
+                raise error
+
+    def call(self, function, breaker=None, on_retry=None, key=None,
+             hedge=True, before_attempt=None):
+        '''
+        Calls function() until it succeeds or the attempts, or the timeout,
+        are used up
+
+        :param breaker: CircuitBreaker to consult before every attempt
+        :param on_retry: called before every retry
+        :param key: API method to keep the latencies for hedging under
+        :param hedge: whether duplicates of the request may be sent
+        :param before_attempt: called in the calling thread before every
+            attempt, e.g. to wait for the rate limiter. The time it takes
+            does not count against the timeout, its errors are not failures
+            of the exchange and a hedged duplicate does not call it again.
+        '''
+        deadline = None
+        if self.timeout is not None:
+            deadline = self.clock() + self.timeout
+        for attempt in range(self.attempts):
+            if breaker is not None:
+                breaker.before()
+            if before_attempt is not None:
+                start = self.clock()
+                try:
+                    before_attempt()
+                except Exception:
+                    if breaker is not None:
+                        breaker.cancel()
+                    raise
+                if deadline is not None:
+                    deadline += self.clock() - start
+            try:
+                result = self._attempt(function, key, deadline, hedge)
+            except self.retry_on:
+                if breaker is not None:
+                    breaker.failure()
+                wait = self.backoff_delay(attempt)
+                if attempt + 1 == self.attempts or (
+                        deadline is not None and
+                        self.clock() + wait >= deadline):
+                    raise
+                if on_retry is not None:
+                    on_retry()
+                self.sleep(wait)
+                continue
+            except TimeoutException:
+                if breaker is not None:
+                    breaker.failure()
+                raise
+            except Exception:
+                # e.g. a rate limit, the exchange was not involved
+                if breaker is not None:
+                    breaker.cancel()
+                raise
+            if breaker is not None:
+                breaker.success()
+            return result
+
+
+# for requests that must not be sent twice
+NO_RETRY = RetryPolicy(attempts=1)
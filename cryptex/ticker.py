@@ -0,0 +1,32 @@
+class Ticker(object):
+    '''
+    Latest prices and volume of a market
+    '''
+    __slots__ = ('base_currency', 'counter_currency', 'datetime', 'last',
+                 'bid', 'ask', 'high', 'low', 'volume')
+    def __init__(self, base_currency, counter_currency, datetime, last,
+                 bid, ask, high=None, low=None, volume=None):
+        '''
+        :param datetime: time of the data in UTC
+        :param last: price of the last trade
+        :param bid: highest buy price
+        :param ask: lowest sell price
+        :param high: highest price of the last 24 hours, if known
+        :param low: lowest price of the last 24 hours, if known
+        :param volume: amount of base_currency traded in the last 24 hours
+        '''
+        self.base_currency = base_currency
+        self.counter_currency = counter_currency
+        self.datetime = datetime
+        self.last = last
+        self.bid = bid
+        self.ask = ask
+        self.high = high
+        self.low = low
+        self.volume = volume
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in Ticker.__slots__}
+
+    def __str__(self):
+        return repr(self.as_dict())
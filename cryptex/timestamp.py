@@ -0,0 +1,73 @@
+import datetime
+
+# pytz is imported on first use, see get_epoch
+_epoch = None
+
+
+def get_epoch():
+    '''
+    The unix epoch as a timezone-aware datetime in UTC
+    '''
+    global _epoch
+    if _epoch is None:
+        import pytz
+        _epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+    return _epoch
+
+
+def utc_from_timestamp(timestamp):
+    '''
+    Timezone-aware datetime in UTC from a unix timestamp
+    '''
+    return (_epoch or get_epoch()) + datetime.timedelta(seconds=timestamp)
+
+
+class TimestampConverter(object):
+    '''
+    Converts "YYYY-MM-DD HH:MM:SS" timestamps in a server timezone to
+    timezone-aware datetimes in UTC.
+
+    The string is parsed by position instead of with strptime, and the UTC
+    offset of the timezone is looked up once per hour of local time and
+    cached, which is exact for timezones that change their offset on the
+    hour.
+    '''
+    def __init__(self, timezone):
+        self.timezone = timezone
+        self.utc = get_epoch().tzinfo
+        self._offsets = {}
+
+    def _offset(self, year, month, day, hour):
+        key = (year, month, day, hour)
+        try:
+            return self._offsets[key]
+        except KeyError:
+            local = self.timezone.localize(
+                datetime.datetime(year, month, day, hour))
+            offset = self._offsets[key] = local.utcoffset()
+            return offset
+
+    def convert(self, time_str):
+        year = int(time_str[0:4])
+        month = int(time_str[5:7])
+        day = int(time_str[8:10])
+        hour = int(time_str[11:13])
+        utc_time = datetime.datetime(year, month, day, hour,
+                                     int(time_str[14:16]),
+                                     int(time_str[17:19]),
+                                     tzinfo=self.utc)
+        return utc_time - self._offset(year, month, day, hour)
+
+    def convert_many(self, time_strs):
+        '''
+        Converts a list of timestamps, converting repeated timestamps once
+        '''
+        converted = {}
+        convert = self.convert
+        result = []
+        for time_str in time_strs:
+            value = converted.get(time_str)
+            if value is None:
+                value = converted[time_str] = convert(time_str)
+            result.append(value)
+        return result
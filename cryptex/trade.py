@@ -4,6 +4,8 @@ class Trade(object):
     '''
     Basic trade
     '''
+    __slots__ = ('trade_id', 'base_currency', 'counter_currency', 'datetime',
+                 'order_id', 'amount', 'price', 'fee', 'fee_currency')
     trade_type = 0
     def __init__(self, trade_id, base_currency, counter_currency,
                 datetime, order_id, amount, price, fee=None, fee_currency=None):
@@ -17,7 +19,12 @@ class Trade(object):
         :param price: price at which the trade was made
         :param fee: anmount of fee payed to the exchange
         :param fee_currency: the currency the fee was payed in (base_currency or counter_currency)
+
+        amount, price and fee are either Decimal or, for exchanges in
+        cryptex.fixedpoint.FIXED mode, integers of 1e-8 units
         '''
+        if fee and fee_currency not in (base_currency, counter_currency):
+            raise ValueError('Wrong fee_currency "%r"' % fee_currency)
         self.trade_id = trade_id
         self.base_currency = base_currency
         self.counter_currency = counter_currency
@@ -28,33 +35,32 @@ class Trade(object):
         self.fee = fee
         self.fee_currency = fee_currency
 
-    def __setattr__(self, name, value):
-        if name == 'fee_currency' and self.fee and \
-                value not in (self.base_currency, self.counter_currency):
-            raise ValueError('Wrong fee_currency "%r"' % value)
-        super(Trade, self).__setattr__(name, value)
-
     def type(self):
         return self.__class__.__name__
 
+    def as_dict(self):
+        return {name: getattr(self, name) for name in Trade.__slots__}
+
     def __str__(self):
         return '<%s of %.8f %s>' % (self.type(),
-                                    self.amount,
+                                    common.as_decimal(self.amount),
                                     self.base_currency)
 
 
 class Buy(Trade):
+    __slots__ = ()
     trade_type = 1
 
     def netto_amount(self):
         if self.fee is not None:
-            return common.quantize(self.amount - self.fee)
+            return common.subtract(self.amount, self.fee)
         return self.amount
 
     def netto_total(self):
-        return common.quantize(self.amount * self.price)
+        return common.multiply(self.amount, self.price)
 
 class Sell(Trade):
+    __slots__ = ()
     trade_type = 2
 
     def netto_amount(self):
@@ -62,5 +68,35 @@ class Sell(Trade):
 
     def netto_total(self):
         if self.fee is not None:
-            return common.quantize((self.amount * self.price) - self.fee)
-        return common.quantize(self.amount * self.price)
+            return common.subtract(common.multiply(self.amount, self.price),
+                                   self.fee)
+        return common.multiply(self.amount, self.price)
+
+
+class PublicTrade(object):
+    '''
+    Trade of any user of the exchange, as in the recent trades of a market
+    '''
+    __slots__ = ('trade_id', 'base_currency', 'counter_currency', 'datetime',
+                 'side', 'amount', 'price')
+    def __init__(self, trade_id, base_currency, counter_currency, datetime,
+                 side, amount, price):
+        '''
+        :param side: 'buy' if the buyer took the order of the seller, 'sell'
+            otherwise
+        '''
+        self.trade_id = trade_id
+        self.base_currency = base_currency
+        self.counter_currency = counter_currency
+        self.datetime = datetime
+        self.side = side
+        self.amount = amount
+        self.price = price
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in PublicTrade.__slots__}
+
+    def __str__(self):
+        return '<%s trade of %.8f %s>' % (self.side,
+                                          common.as_decimal(self.amount),
+                                          self.base_currency)
@@ -1,8 +1,12 @@
+import cryptex.common as common
+
 class Transaction(object):
     '''
     Transaction that is neither deopsit nor withdrawal
     Used for CryptsyPoint credit
     '''
+    __slots__ = ('transaction_id', 'datetime', 'currency', 'amount', 'address',
+                 'fee')
     transaction_type = 0
     def __init__(self, transaction_id, datetime, currency, amount, address, fee=None):
         self.transaction_id = transaction_id
@@ -15,12 +19,17 @@ class Transaction(object):
     def type(self):
         return self.__class__.__name__
 
+    def as_dict(self):
+        return {name: getattr(self, name) for name in Transaction.__slots__}
+
     def __str__(self):
         return '<%s transaction of %.8f %s>' % (self.type(),
-                                                self.amount,
+                                                common.as_decimal(self.amount),
                                                 self.currency)
 class Deposit(Transaction):
+    __slots__ = ()
     transaction_type = 1
 
 class Withdrawal(Transaction):
+    __slots__ = ()
     transaction_type = 2
@@ -0,0 +1,260 @@
+'''
+Polling of tickers and order books that only reports what changed.
+
+>>> for change in watch(btce.public, [('LTC', 'BTC'), ('BTC', 'USD')]):
+...     print change.market, change.value.last
+
+Every market is polled at its own interval. It starts at the window the
+exchange caches the data for (2 seconds on BTC-e), grows while the market is
+quiet, up to max_interval, and shrinks back while it changes. Markets that
+are due at about the same time are fetched with a single request where the
+API allows it.
+
+Responses are compared before they are decoded: the raw json of a market is
+hashed while it is downloaded, and only markets whose hash changed are
+decoded and then compared by their best prices first.
+'''
+import time
+
+from cryptex.exchange.btce import BTCEPublic
+from cryptex.exchange.cryptsy import CryptsyPublic
+from cryptex.exchange import streaming
+from cryptex.orderbook import OrderBook
+from cryptex.exception import APIException
+
+TICKER = 'ticker'
+DEPTH = 'depth'
+
+# seconds between polls of an API that does not tell how long it caches
+DEFAULT_INTERVAL = 5
+
+
+class Change(object):
+    '''
+    New ticker or order book of a market
+
+    :ivar market: the market as it was passed to the Watcher
+    :ivar value: cryptex.ticker.Ticker or cryptex.orderbook.OrderBook
+    :ivar previous: the value reported before, None on the first poll
+    '''
+    __slots__ = ('market', 'value', 'previous')
+
+    def __init__(self, market, value, previous=None):
+        self.market = market
+        self.value = value
+        self.previous = previous
+
+    def __repr__(self):
+        return '<Change of %r>' % (self.market,)
+
+
+def _ticker_fields(ticker):
+    # the time of the data changes on every refresh of the server cache
+    return (ticker.last, ticker.bid, ticker.ask, ticker.high, ticker.low,
+            ticker.volume)
+
+
+def _same(a, b):
+    if isinstance(a, OrderBook):
+        if a.best_bid() != b.best_bid() or a.best_ask() != b.best_ask():
+            return False
+        return (a.bids.prices == b.bids.prices and
+                a.bids.amounts == b.bids.amounts and
+                a.asks.prices == b.asks.prices and
+                a.asks.amounts == b.asks.amounts)
+    return _ticker_fields(a) == _ticker_fields(b)
+
+
+class _BTCESource(object):
+    '''
+    All due pairs are fetched with one request
+    '''
+    def __init__(self, public, kind, depth):
+        self.public = public
+        self.kind = kind
+        self.depth = depth
+        self.interval = public.CACHE_TTLS.get(kind, DEFAULT_INTERVAL)
+
+    def key(self, market):
+        if isinstance(market, tuple):
+            return BTCEPublic._market_to_pair(market)
+        return market
+
+    def fetch(self, pairs):
+        return self.public.iter_market_info(self.kind, pairs, self.depth)
+
+    def convert(self, pair, raw):
+        data = streaming.decode(raw)
+        if self.kind == DEPTH:
+            return OrderBook.from_btce_depth(data)
+        return self.public.to_ticker(pair, data)
+
+
+class _CryptsySource(object):
+    '''
+    Every due market is fetched with its own singlemarketdata or
+    singleorderdata request, markets are identified by their market id
+    '''
+    def __init__(self, public, kind, depth, get_market_id=None):
+        self.public = public
+        self.kind = kind
+        self.depth = depth
+        self.get_market_id = get_market_id
+        self.interval = DEFAULT_INTERVAL
+
+    def key(self, market):
+        if self.get_market_id is not None:
+            return self.get_market_id(market)
+        return market
+
+    def fetch(self, market_ids):
+        for market_id in market_ids:
+            if self.kind == DEPTH:
+                members = self.public.iter_order_data(market_id, raw=True)
+            else:
+                members = self.public.iter_market_data(market_id, raw=True)
+            for _, raw in members:
+                yield market_id, raw
+
+    def convert(self, market_id, raw):
+        data = streaming.decode(raw)
+        if self.kind == DEPTH:
+            if self.depth is not None:
+                data = {'buyorders': (data['buyorders'] or [])[:self.depth],
+                        'sellorders': (data['sellorders'] or [])[:self.depth]}
+            return OrderBook.from_cryptsy_orders(data)
+        return self.public.to_ticker(data)
+
+
+class _Market(object):
+    __slots__ = ('market', 'interval', 'due', 'digest', 'value')
+
+    def __init__(self, market, interval, due):
+        self.market = market
+        self.interval = interval
+        self.due = due
+        self.digest = None
+        self.value = None
+
+
+class Watcher(object):
+    '''
+    :param public: BTCEPublic or CryptsyPublic, or an exchange whose public
+        API to use
+    :param markets: (base, counter) pairs or BTC-e pairs like "ltc_btc", for
+        CryptsyPublic market ids
+    :param kind: TICKER for cryptex.ticker.Ticker values, DEPTH for
+        cryptex.orderbook.OrderBook values
+    :param depth: number of levels per side of the order books
+    :param min_interval: shortest interval between two polls of a market,
+        by default the time the exchange caches the data for
+    :param max_interval: longest interval between two polls of a market
+
+    :ivar errors: number of polls that failed. Iterating over the watcher
+        goes on after a failed poll, the markets it was to fetch are polled
+        again after their interval grew as if they had not changed.
+    '''
+    # factors applied to the interval of a market after each poll
+    SPEEDUP = 0.5
+    SLOWDOWN = 1.5
+
+    def __init__(self, public, markets, kind=TICKER, depth=None,
+                 min_interval=None, max_interval=60, clock=time.time,
+                 sleep=time.sleep):
+        endpoint = getattr(public, 'public', public)
+        if isinstance(endpoint, BTCEPublic):
+            self.source = _BTCESource(endpoint, kind, depth)
+        elif isinstance(endpoint, CryptsyPublic):
+            self.source = _CryptsySource(
+                endpoint, kind, depth, getattr(public, '_get_market_id', None))
+        else:
+            raise TypeError('Can not watch %s' % type(public).__name__)
+        self.min_interval = min_interval or self.source.interval
+        self.max_interval = max(max_interval, self.min_interval)
+        self.clock = clock
+        self.sleep = sleep
+        self.errors = 0
+        now = clock()
+        self.markets = dict(
+            (self.source.key(market), _Market(market, self.min_interval, now))
+            for market in markets)
+
+    def _reschedule(self, market, changed, now):
+        if changed:
+            market.interval = max(self.min_interval,
+                                  market.interval * self.SPEEDUP)
+        else:
+            market.interval = min(self.max_interval,
+                                  market.interval * self.SLOWDOWN)
+        market.due = now + market.interval
+
+    def poll(self):
+        '''
+        Fetches the markets that are due, returns a list of Change for those
+        that changed since they were last reported
+        '''
+        now = self.clock()
+        # markets due within half an interval are fetched along
+        horizon = now + self.min_interval / 2.0
+        due = set(key for key, market in self.markets.items()
+                  if market.due <= horizon)
+        if not due:
+            return []
+
+        changes = []
+        try:
+            for key, raw in self.source.fetch(sorted(due)):
+                if key not in due:
+                    continue
+                due.discard(key)
+                market = self.markets[key]
+                changed = False
+                digest = hash(raw)
+                if digest != market.digest:
+                    market.digest = digest
+                    value = self.source.convert(key, raw)
+                    if market.value is None or \
+                            not _same(market.value, value):
+                        changes.append(
+                            Change(market.market, value, market.value))
+                        market.value = value
+                        changed = True
+                self._reschedule(market, changed, now)
+        except Exception:
+            # back off the markets that were not fetched
+            self.errors += 1
+            for key in due:
+                self._reschedule(self.markets[key], False, now)
+            raise
+        # not in the response, e.g. pairs BTC-e does not know
+        for key in due:
+            self._reschedule(self.markets[key], False, now)
+        return changes
+
+    def wait_time(self):
+        '''
+        Seconds until the next market is due
+        '''
+        if not self.markets:
+            return self.max_interval
+        due = min(market.due for market in self.markets.values())
+        return max(0, due - self.clock())
+
+    def __iter__(self):
+        while True:
+            try:
+                changes = self.poll()
+            except (APIException, IOError, ValueError):
+                # counted and backed off by poll, the next one may succeed
+                changes = []
+            for change in changes:
+                yield change
+            self.sleep(self.wait_time())
+
+
+def watch(public, markets, **kwargs):
+    '''
+    Yields a Change whenever the ticker (or with kind=DEPTH the order book)
+    of one of the markets changes, see Watcher for the arguments
+    '''
+    return iter(Watcher(public, markets, **kwargs))
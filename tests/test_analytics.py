@@ -0,0 +1,51 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+import pytz
+
+from cryptex.analytics import analyze
+from cryptex.batch import TradeBatch
+from cryptex.trade import Buy, Sell
+
+MARKET = ('LTC', 'BTC')
+SECOND = datetime.datetime(2014, 1, 6, 12, 0, 0)
+
+
+def history(buy_id, sell_id):
+    '''
+    A buy and the sell it funded in the same second, newest first
+    '''
+    return [
+        (Sell, sell_id, 'LTC', 'BTC', SECOND, 2, Decimal('2'),
+         Decimal('0.03'), None, None),
+        (Buy, buy_id, 'LTC', 'BTC', SECOND, 1, Decimal('2'),
+         Decimal('0.025'), None, None),
+    ]
+
+
+class SameSecondTest(unittest.TestCase):
+    def assertMatched(self, trades):
+        stats, = analyze(trades).values()
+        self.assertEqual(stats.unmatched, 0)
+        self.assertEqual(stats.realized_pnl, Decimal('0.01'))
+        self.assertEqual(stats.position, 0)
+
+    def test_numeric_ids(self):
+        self.assertMatched([row[0](*row[1:]) for row in history(9, 10)])
+
+    def test_numeric_ids_in_batch(self):
+        self.assertMatched(TradeBatch(history('9', '10')))
+
+    def test_other_ids_are_ordered_as_text(self):
+        self.assertMatched(TradeBatch(history('a-1', 'b-2')))
+        self.assertMatched(TradeBatch(history('a-1', 'b-2')[::-1]))
+
+    def test_naive_datetimes_are_utc(self):
+        trades = TradeBatch(history(9, 10))
+        stats, = analyze(trades, bucket=datetime.timedelta(days=1)).values()
+        self.assertEqual(stats.start,
+                         datetime.datetime(2014, 1, 6, tzinfo=pytz.utc))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from cryptex.exception import CryptsyException
+from cryptex.exchange.cryptsy import Cryptsy
+from cryptex.exchange.market_index import MarketIndex
+from cryptex.exchange.transport import FakeTransport
+from cryptex.order import BuyOrder
+from cryptex.ticker import Ticker
+
+NOW = datetime.datetime(2014, 1, 1)
+
+
+def order(order_id):
+    return BuyOrder(order_id, 'LTC', 'BTC', NOW, Decimal(1), Decimal('0.02'))
+
+
+class ScriptedCryptsy(Cryptsy):
+    '''
+    Serves the open orders listed in turn and records the requests
+    '''
+    def __init__(self, listings, failing=()):
+        super(ScriptedCryptsy, self).__init__('key', 'secret',
+                                              transport=FakeTransport())
+        self.listings = list(listings)
+        self.failing = set(failing)
+        self.requests = []
+
+    def get_my_open_orders(self, market=None, columnar=False):
+        return [order(order_id) for order_id in self.listings.pop(0)]
+
+    def perform_request(self, method, data={}):
+        self.requests.append((method, data.get('orderid')))
+        if method in self.failing or data.get('orderid') in self.failing:
+            raise CryptsyException('Failed')
+        return {}
+
+
+class CancelAllTest(unittest.TestCase):
+    def outcomes(self, results):
+        return [(r.request, r.ok) for r in results]
+
+    def test_reports_orders_that_are_gone(self):
+        exchange = ScriptedCryptsy([[1, 2], [3]])
+        self.assertEqual(self.outcomes(exchange.cancel_all()),
+                         [(1, True), (2, True)])
+        self.assertEqual(exchange.requests, [('cancelallorders', None)])
+
+    def test_orders_left_open_are_cancelled_one_by_one(self):
+        exchange = ScriptedCryptsy([[1, 2, 3], [2, 3]], failing=[3])
+        self.assertEqual(self.outcomes(exchange.cancel_all()),
+                         [(1, True), (2, True), (3, False)])
+        self.assertEqual(sorted(exchange.requests[1:]),
+                         [('cancelorder', 2), ('cancelorder', 3)])
+
+    def test_failed_bulk_request_falls_back(self):
+        exchange = ScriptedCryptsy([[1], [1]], failing=['cancelallorders'])
+        self.assertEqual(self.outcomes(exchange.cancel_all()), [(1, True)])
+        self.assertEqual(exchange.requests[1:], [('cancelorder', 1)])
+
+    def test_nothing_open(self):
+        exchange = ScriptedCryptsy([[]])
+        self.assertEqual(exchange.cancel_all(), [])
+        self.assertEqual(exchange.requests, [])
+
+
+def market_data(market_id, price):
+    return {'marketid': market_id, 'label': 'LTC/BTC',
+            'lasttradeprice': price, 'volume': '10',
+            'lasttradetime': '2014-01-01 00:00:00', 'recenttrades': [],
+            'buyorders': [{'price': price}], 'sellorders': None}
+
+
+class TickerTest(unittest.TestCase):
+    def exchange(self):
+        transport = FakeTransport({
+            'singlemarketdata': {'success': 1, 'return': {'markets': {
+                'LTC/BTC': market_data('3', '0.025')}}},
+            'marketdatav2': {'success': 1, 'return': {'markets': {
+                'LTC/BTC': market_data('3', '0.025')}}},
+        })
+        exchange = Cryptsy('key', 'secret', transport=transport)
+        exchange.market_index = MarketIndex([('3', ('LTC', 'BTC'))])
+        return exchange
+
+    def test_single_unknown_market_is_left_out(self):
+        exchange = self.exchange()
+        self.assertEqual(exchange.get_ticker([('XXX', 'BTC')]), {})
+        self.assertEqual(exchange.transport.requests, [])
+
+    def test_unknown_markets_are_left_out(self):
+        exchange = self.exchange()
+        tickers = exchange.get_ticker([('LTC', 'BTC'), ('XXX', 'BTC')])
+        self.assertEqual(list(tickers), [('LTC', 'BTC')])
+        ticker = tickers[('LTC', 'BTC')]
+        self.assertIsInstance(ticker, Ticker)
+        self.assertEqual(ticker.bid, Decimal('0.025'))
+        self.assertIsNone(ticker.ask)
+
+
+if __name__ == '__main__':
+    unittest.main()
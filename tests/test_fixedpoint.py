@@ -0,0 +1,49 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from cryptex import common, fixedpoint
+from cryptex.fixedpoint import FIXED, Units, to_fixed
+from cryptex.exchange.btce import BTCE
+from cryptex.exchange.transport import FakeTransport
+from cryptex.trade import Buy, Sell
+
+NOW = datetime.datetime(2014, 1, 1)
+
+
+class ArithmeticTest(unittest.TestCase):
+    def test_multiply_returns_units(self):
+        product = fixedpoint.multiply(to_fixed('2.5'), to_fixed('0.02'))
+        self.assertIsInstance(product, Units)
+        self.assertEqual(to_fixed(product), to_fixed('0.05'))
+
+    def test_netto_amounts_stay_units(self):
+        buy = Buy(1, 'LTC', 'BTC', NOW, 1, to_fixed('2.5'), to_fixed('0.02'),
+                  to_fixed('0.005'), 'LTC')
+        sell = Sell(2, 'LTC', 'BTC', NOW, 2, to_fixed('2.5'),
+                    to_fixed('0.02'), to_fixed('0.0001'), 'BTC')
+        self.assertEqual(to_fixed(buy.netto_amount()), to_fixed('2.495'))
+        self.assertEqual(to_fixed(buy.netto_total()), to_fixed('0.05'))
+        self.assertEqual(to_fixed(sell.netto_total()), to_fixed('0.0499'))
+
+    def test_mixed_amounts_raise(self):
+        buy = Buy(1, 'LTC', 'BTC', NOW, 1, to_fixed('2.5'), Decimal('0.02'))
+        self.assertRaises(TypeError, buy.netto_total)
+        self.assertRaises(TypeError, common.subtract, Decimal('2.5'),
+                          to_fixed('0.005'))
+
+
+class OrderParamsTest(unittest.TestCase):
+    def test_units_are_sent_as_coins(self):
+        transport = FakeTransport({
+            'Trade': {'success': 1, 'return': {'order_id': 7}}})
+        exchange = BTCE('key', 'secret', transport=transport, numeric=FIXED)
+        self.assertEqual(exchange.buy(('LTC', 'BTC'), Units(250000000),
+                                      to_fixed('0.025')), 7)
+        params = transport.requests[-1][2]
+        self.assertEqual(Decimal(params['amount']), Decimal('2.5'))
+        self.assertEqual(Decimal(params['rate']), Decimal('0.025'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import datetime
+import unittest
+import warnings
+
+import pytz
+
+from cryptex.exchange import Exchange
+from cryptex.exchange.exchange import PAGE_BY_DATE, HistoryPage
+from cryptex.exchange.simulated import SimulatedExchange
+from cryptex.ledger import Ledger
+from cryptex.orderbook import OrderBook
+from cryptex.trade import Buy
+
+MARKET = ('LTC', 'BTC')
+
+
+class DatePagedExchange(Exchange):
+    '''
+    Serves trades like Cryptsy's allmytrades: the whole days (UTC here)
+    from since to until, newest first and at most limit of them, which are
+    then narrowed down to since and until
+    '''
+    TRADE_PAGING = PAGE_BY_DATE
+
+    def __init__(self, trades):
+        self.trades = list(trades)
+        self.requests = 0
+
+    def get_my_trade_page(self, limit, since=None, until=None):
+        self.requests += 1
+        sent = sorted(self.trades, key=lambda t: (t.datetime, t.trade_id),
+                      reverse=True)
+        if since is not None:
+            sent = [t for t in sent if t.datetime.date() >= since.date()]
+        if until is not None:
+            last_day = (until - datetime.timedelta(microseconds=1)).date()
+            sent = [t for t in sent if t.datetime.date() <= last_day]
+        sent = sent[:limit]
+        rows = [t for t in sent
+                if (since is None or t.datetime >= since) and
+                (until is None or t.datetime < until)]
+        if not sent:
+            return HistoryPage(rows)
+        oldest = sent[-1].datetime
+        return HistoryPage(rows, len(sent) >= limit, oldest,
+                           oldest.replace(hour=0, minute=0, second=0))
+
+
+START = pytz.utc.localize(datetime.datetime(2014, 3, 1))
+
+
+def buy(trade_id, days_ago, hour=12):
+    return Buy(trade_id, 'LTC', 'BTC',
+               START - datetime.timedelta(days=days_ago) +
+               datetime.timedelta(hours=hour), None, 1, 1)
+
+
+def days(first_id, days_ago, per_day=1):
+    return [buy(first_id + i * per_day + n, day, hour=n)
+            for i, day in enumerate(days_ago) for n in range(per_day)]
+
+
+class LedgerTest(unittest.TestCase):
+    def test_sync_by_id_reads_every_page(self):
+        # all in the same second, so only the trade ids tell pages apart
+        exchange = SimulatedExchange(funds={'BTC': '100'}, fee='0',
+                                     clock=lambda: 1388534400)
+        exchange.seed(MARKET, OrderBook([], [('0.025', '1000')]))
+        for _ in range(25):
+            exchange.buy(MARKET, '1', '0.025')
+        ledger = Ledger(':memory:', exchange)
+
+        self.assertEqual(ledger.sync_trades(page_size=10), 25)
+        self.assertEqual(ledger.sync_trades(page_size=10), 0)
+        exchange.buy(MARKET, '1', '0.025')
+        self.assertEqual(ledger.sync_trades(page_size=10), 1)
+        self.assertEqual(len(ledger.get_trades()), 26)
+
+    def assertSynced(self, exchange, expected, page_size=5):
+        ledger = Ledger(':memory:', exchange)
+        self.assertEqual(ledger.sync_trades(page_size=page_size), expected)
+        self.assertEqual(ledger.sync_trades(page_size=page_size), 0)
+        return ledger
+
+    def test_sync_by_date_reads_history_older_than_a_week(self):
+        self.assertSynced(DatePagedExchange(days(0, range(10, 22))), 12)
+
+    def test_sync_by_date_reads_past_quiet_weeks(self):
+        trades = days(0, [0, 1, 2]) + days(3, range(20, 26))
+        self.assertSynced(DatePagedExchange(trades), 9)
+
+    def test_sync_by_date_pages_through_whole_days(self):
+        # every request is filled up by the newer rows of its last day
+        exchange = DatePagedExchange(days(0, range(6), per_day=4))
+        ledger = self.assertSynced(exchange, 24)
+
+        exchange.trades += [buy(24, 0, hour=20), buy(25, 0, hour=21)]
+        self.assertEqual(ledger.sync_trades(page_size=5), 2)
+        self.assertEqual(len(ledger.get_trades()), 26)
+
+    def test_sync_by_date_skips_a_day_that_does_not_fit_with_a_warning(self):
+        trades = days(0, [3], per_day=7) + days(7, [0, 5, 6])
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            ledger = self.assertSynced(DatePagedExchange(trades), 8)
+        self.assertEqual(len(caught), 1)
+        # the two oldest trades of the crowded day are left out
+        self.assertEqual(
+            sorted(int(t.trade_id) for t in ledger.get_trades())[:3],
+            [2, 3, 4])
+
+    def test_sync_by_date_stops_at_floor(self):
+        exchange = DatePagedExchange(days(0, range(20)))
+        ledger = Ledger(':memory:', exchange,
+                        floor=START - datetime.timedelta(days=9, hours=12))
+        self.assertEqual(ledger.sync_trades(page_size=5), 10)
+        self.assertEqual(ledger.sync_trades(page_size=5), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from decimal import Decimal
+
+from cryptex.orderbook import OrderBook
+
+# two orders at the same price, as Cryptsy lists them
+ORDERS = {'buyorders': [{'price': '0.025', 'quantity': '2'},
+                        {'price': '0.025', 'quantity': '3'},
+                        {'price': '0.024', 'quantity': '1'}],
+          'sellorders': []}
+
+
+class DuplicateLevelsTest(unittest.TestCase):
+    def test_loaded_and_merged_books_agree(self):
+        loaded = OrderBook.from_cryptsy_orders(ORDERS)
+        merged = OrderBook()
+        merged.merge_cryptsy_orders(ORDERS)
+
+        expected = [(Decimal('0.025'), Decimal(5)),
+                    (Decimal('0.024'), Decimal(1))]
+        self.assertEqual(list(loaded.bids), expected)
+        self.assertEqual(list(merged.bids), expected)
+        self.assertEqual(loaded.bids.amount_within('0.025'), Decimal(5))
+        self.assertEqual(merged.bids.amount_within('0.025'), Decimal(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from cryptex.exception import (RateLimitException, TimeoutException,
+                               InvalidResponseException)
+from cryptex.exchange.btce import BTCEPublic
+from cryptex.exchange.transport import FakeTransport
+from cryptex.ratelimit import RequestScheduler, TokenBucket
+from cryptex.retry import RetryPolicy, CircuitBreaker
+
+TICKER_URL = 'https://btc-e.com/api/3/ticker/btc_usd'
+TICKER = {'btc_usd': {'last': 1, 'sell': 1, 'buy': 1, 'high': 1, 'low': 1,
+                      'vol_cur': 1, 'updated': 0}}
+
+
+class ThrottleTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport({TICKER_URL: TICKER})
+        self.breaker = CircuitBreaker(failure_threshold=1)
+        self.scheduler = RequestScheduler(public=TokenBucket(1, capacity=1))
+        self.exchange = BTCEPublic(
+            transport=self.transport, scheduler=self.scheduler,
+            retry_policy=RetryPolicy(timeout=5, hedge_after=0.001),
+            circuit_breaker=self.breaker)
+
+    def test_nonblocking_applies_to_timed_requests(self):
+        self.exchange.get_ticker(['btc_usd'])
+        with self.scheduler.nonblocking():
+            self.assertRaises(RateLimitException,
+                              self.exchange.get_ticker, ['btc_usd'])
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertFalse(self.breaker.is_open())
+
+    def test_throttle_wait_is_not_timed(self):
+        clock = [0.0]
+
+        def before_attempt():
+            clock[0] += 10
+
+        policy = RetryPolicy(timeout=5, clock=lambda: clock[0])
+        result = policy.call(lambda: 'ok', self.breaker,
+                             before_attempt=before_attempt)
+        self.assertEqual(result, 'ok')
+        self.assertFalse(self.breaker.is_open())
+
+    def test_timeout_opens_breaker(self):
+        policy = RetryPolicy(timeout=0)
+        self.assertRaises(TimeoutException, policy.call,
+                          lambda: __import__('time').sleep(0.05),
+                          self.breaker)
+        self.assertTrue(self.breaker.is_open())
+
+
+class RetryOnTest(unittest.TestCase):
+    def test_response_that_is_not_json_is_retried(self):
+        transport = FakeTransport({TICKER_URL: '<html>Bad gateway</html>'})
+        exchange = BTCEPublic(transport=transport, retry_policy=RetryPolicy(
+            attempts=3, sleep=lambda seconds: None))
+        self.assertRaises(InvalidResponseException,
+                          exchange.get_ticker, ['btc_usd'])
+        self.assertEqual(len(transport.requests), 3)
+
+    def test_other_value_errors_are_not_retried(self):
+        calls = []
+
+        def exhausted():
+            calls.append(1)
+            raise ValueError('Nonce exceeds maximum')
+
+        policy = RetryPolicy(attempts=3, sleep=lambda seconds: None)
+        self.assertRaises(ValueError, policy.call, exhausted)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
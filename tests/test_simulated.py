@@ -0,0 +1,118 @@
+import unittest
+from decimal import Decimal
+
+from cryptex.exception import APIException
+from cryptex.exchange.simulated import SimulatedExchange
+from cryptex.order import BuyOrder, SellOrder
+from cryptex.orderbook import OrderBook
+from cryptex.trade import Buy, Sell
+
+MARKET = ('LTC', 'BTC')
+
+
+class SimulatedExchangeTest(unittest.TestCase):
+    def exchange(self, fee='0', asks=(), bids=(), **funds):
+        exchange = SimulatedExchange(funds=funds, fee=fee,
+                                     clock=lambda: 1388534400)
+        exchange.seed(MARKET, OrderBook(bids, asks))
+        return exchange
+
+    def assertFunds(self, exchange, **funds):
+        self.assertEqual(exchange.get_my_funds(),
+                         dict((c, Decimal(a)) for c, a in funds.items()))
+
+    def test_partial_fill_rests_remainder(self):
+        exchange = self.exchange(asks=[('0.025', '2')], BTC='1')
+        order_id = exchange.buy(MARKET, '5', '0.025')
+
+        trade, = exchange.get_my_trades()
+        self.assertIsInstance(trade, Buy)
+        self.assertEqual((trade.order_id, trade.amount, trade.price),
+                         (order_id, Decimal(2), Decimal('0.025')))
+        order, = exchange.get_my_open_orders()
+        self.assertIsInstance(order, BuyOrder)
+        self.assertEqual((order.order_id, order.amount),
+                         (order_id, Decimal(3)))
+        # the remainder stays reserved at the limit price
+        self.assertFunds(exchange, BTC='0.875', LTC='2')
+        self.assertEqual(list(exchange.get_order_book(MARKET).asks), [])
+
+    def test_better_price_releases_reservation(self):
+        exchange = self.exchange(fee='0.002', asks=[('0.025', '2')],
+                                 BTC='1')
+        exchange.buy(MARKET, '2', '0.03')
+
+        self.assertEqual(exchange.get_my_open_orders(), [])
+        # reserved 0.06, paid 0.05, the fee is taken from the LTC received
+        self.assertFunds(exchange, BTC='0.95', LTC='1.996')
+
+    def test_cancel_refunds_reservation(self):
+        exchange = self.exchange(BTC='1')
+        order_id = exchange.buy(MARKET, '5', '0.02')
+        self.assertFunds(exchange, BTC='0.9')
+
+        exchange.cancel_order(order_id)
+        self.assertFunds(exchange, BTC='1')
+        self.assertEqual(exchange.get_my_open_orders(), [])
+        self.assertEqual(list(exchange.get_order_book(MARKET).bids), [])
+        self.assertRaises(APIException, exchange.cancel_order, order_id)
+
+    def test_cancel_after_partial_fill_refunds_remainder(self):
+        exchange = self.exchange(LTC='10', BTC='1')
+        sell_id = exchange.sell(MARKET, '4', '0.025')
+        exchange.buy(MARKET, '1', '0.025')
+
+        order, = exchange.get_my_open_orders()
+        self.assertEqual((order.order_id, order.amount),
+                         (sell_id, Decimal(3)))
+        exchange.cancel_order(sell_id)
+        self.assertFunds(exchange, LTC='10', BTC='1')
+
+    def test_self_match_books_both_sides(self):
+        exchange = self.exchange(fee='0.002', LTC='10', BTC='1')
+        sell_id = exchange.sell(MARKET, '4', '0.025')
+        buy_id = exchange.buy(MARKET, '4', '0.03')
+
+        # newest first, the incoming order is booked before the resting one
+        sell, buy = exchange.get_my_trades()
+        self.assertIsInstance(buy, Buy)
+        self.assertIsInstance(sell, Sell)
+        self.assertEqual((buy.order_id, sell.order_id), (buy_id, sell_id))
+        # the incoming order trades at the price of the resting one
+        self.assertEqual(buy.price, Decimal('0.025'))
+        self.assertEqual(sell.price, Decimal('0.025'))
+        self.assertEqual(buy.fee, Decimal('0.008'))
+        self.assertEqual(sell.fee, Decimal('0.0002'))
+        self.assertEqual(exchange.get_my_open_orders(), [])
+        # only the fees are lost
+        self.assertFunds(exchange, LTC='9.992', BTC='0.9998')
+
+    def test_insufficient_funds(self):
+        exchange = self.exchange(asks=[('0.025', '2')], BTC='0.01')
+        self.assertRaises(APIException, exchange.buy, MARKET, '1', '0.025')
+        self.assertFunds(exchange, BTC='0.01')
+        self.assertEqual(exchange.get_my_trades(), [])
+
+    def test_open_orders_by_market(self):
+        exchange = self.exchange(LTC='10')
+        exchange.seed(('LTC', 'USD'))
+        exchange.sell(MARKET, '1', '0.03')
+        order_id = exchange.sell(('LTC', 'USD'), '1', '5')
+
+        order, = exchange.get_my_open_orders(('LTC', 'USD'))
+        self.assertIsInstance(order, SellOrder)
+        self.assertEqual(order.order_id, order_id)
+        self.assertEqual(len(exchange.get_my_open_orders()), 2)
+
+    def test_transactions_limit(self):
+        exchange = self.exchange(BTC='1', LTC='2')
+        exchange.deposit('BTC', '3')
+
+        transaction, = exchange.get_my_transactions(limit=1)
+        self.assertEqual((transaction.currency, transaction.amount),
+                         ('BTC', Decimal(3)))
+        self.assertEqual(len(exchange.get_my_transactions()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from cryptex.exchange.streaming import (iter_members, decode,
+                                        UnexpectedResponse)
+
+RESPONSE = '{"success": 1, "return": {"a": {"x": [1, "}"]}, "b": [2]}}'
+ERROR = '{"success" : 0 , "error": "Invalid pair, \\"x\\""}'
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class IterMembersTest(unittest.TestCase):
+    def test_members_in_any_chunking(self):
+        for size in (1, 3, len(RESPONSE)):
+            members = iter_members(chunked(RESPONSE, size), ('return',))
+            self.assertEqual([(key, decode(raw)) for key, raw in members],
+                             [('a', {'x': [1, '}']}), ('b', [2])])
+
+    def test_scalars_are_skipped(self):
+        self.assertEqual(list(iter_members([ERROR], ())), [])
+
+    def test_scalars(self):
+        for size in (1, 3, len(ERROR)):
+            self.assertEqual(
+                list(iter_members(chunked(ERROR, size), (), scalars=True)),
+                [('success', '0'), ('error', '"Invalid pair, \\"x\\""')])
+
+    def test_missing_path(self):
+        self.assertRaises(UnexpectedResponse, list,
+                          iter_members([ERROR], ('return',)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from cryptex.exception import APIException
+from cryptex.exchange.btce import BTCEPublic
+from cryptex.exchange.transport import FakeTransport
+from cryptex.watch import Watcher
+
+TICKER_URL = 'https://btc-e.com/api/3/ticker/btc_usd-ltc_btc'
+TICKER = {'last': 1, 'sell': 1, 'buy': 1, 'high': 1, 'low': 1,
+          'vol_cur': 1, 'updated': 1388534400}
+
+
+class BTCEWatcherTest(unittest.TestCase):
+    def watcher(self, response, clock=lambda: 0, sleep=None):
+        public = BTCEPublic(transport=FakeTransport({TICKER_URL: response}))
+        return Watcher(public, [('LTC', 'BTC'), ('BTC', 'USD')],
+                       clock=clock, sleep=sleep)
+
+    def test_first_poll_reports_all_markets(self):
+        watcher = self.watcher({'ltc_btc': TICKER,
+                                'btc_usd': dict(TICKER, last=800)})
+        changes = dict((c.market, c.value.last) for c in watcher.poll())
+        self.assertEqual(changes, {('LTC', 'BTC'): 1, ('BTC', 'USD'): 800})
+
+    def test_error_response_raises(self):
+        watcher = self.watcher({'success': 0, 'error': 'Invalid pair name'})
+        self.assertRaises(APIException, watcher.poll)
+        self.assertEqual(watcher.errors, 1)
+
+    def test_iteration_goes_on_after_an_error(self):
+        now = [0]
+
+        def sleep(seconds):
+            now[0] += seconds
+            watcher.source.public.transport.add_response(
+                TICKER_URL, {'ltc_btc': TICKER})
+
+        watcher = self.watcher({'success': 0, 'error': 'Try again'},
+                               clock=lambda: now[0], sleep=sleep)
+        change = next(iter(watcher))
+        self.assertEqual(change.market, ('LTC', 'BTC'))
+        self.assertEqual(watcher.errors, 1)
+        # backed off from the minimal interval of 2 seconds
+        self.assertEqual(now[0], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()